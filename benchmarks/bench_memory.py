@@ -0,0 +1,120 @@
+"""Бенчмарк памяти, занимаемой состоянием арендаторов.
+
+Создаёт арендаторов, прогоняет для каждого ответ API с несколькими
+работами через сравнение с известными статусами (как при первом
+опросе), заполняет валидаторы условных запросов и измеряет
+tracemalloc память на арендатора: отдельно сам объект Tenant с его
+служебными объектами и состояние после опроса. Ответы API после
+обработки отбрасываются, так что в памяти остаётся только то, что бот
+хранит между опросами. Результаты дописываются в
+benchmarks/memory_results.jsonl.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_memory --tenants 10000 --homeworks 5
+"""
+import argparse
+import gc
+import hashlib
+import json
+import os
+import time
+import tracemalloc
+
+from benchmarks.bench_pipeline import (git_revision, previous_result,
+                                       save_result)
+from tenants import Tenant
+
+RESULTS_FILE = os.path.join(os.path.dirname(__file__), 'memory_results.jsonl')
+STATUSES = ('approved', 'reviewing', 'rejected')
+
+
+def make_response(tenant_number, homeworks):
+    """Ответ API арендатора в том виде, в каком его отдаёт json.loads."""
+    body = json.dumps({
+        'homeworks': [
+            {
+                'id': tenant_number * 100 + number,
+                'status': STATUSES[number % len(STATUSES)],
+                'homework_name': f'user{tenant_number}__hw{number}.zip',
+                'reviewer_comment': 'Хорошая работа.',
+                'date_updated': f'2022-03-{10 + number:02d}T10:20:30Z',
+                'lesson_name': f'Проект спринта {number}',
+            }
+            for number in range(homeworks)
+        ],
+        'current_date': 1650000000 + tenant_number,
+    })
+    return json.loads(body), body.encode()
+
+
+def fill_state(tenant, number, homeworks):
+    """Заполняет состояние арендатора, как после успешного опроса."""
+    response, body = make_response(number, homeworks)
+    tenant.homeworks.diff(response['homeworks'], complete=True)
+    tenant.last_status = response['homeworks'][0]['status']
+    tenant.from_date = response['current_date']
+    tenant.conditional.etag = f'"{hashlib.md5(body).hexdigest()}"'
+    tenant.conditional.last_modified = 'Thu, 10 Mar 2022 10:20:30 GMT'
+    tenant.conditional.body_hash = hashlib.sha256(body).digest()
+
+
+def traced(function):
+    """Прирост памяти по tracemalloc после вызова function()."""
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    result = function()
+    gc.collect()
+    return result, tracemalloc.get_traced_memory()[0] - before
+
+
+def run_benchmark(tenants_count=10000, homeworks=5):
+    """Запускает бенчмарк и возвращает словарь с результатами."""
+    tracemalloc.start()
+    try:
+        tenants, created = traced(lambda: [
+            Tenant(f'token-{number}', number)
+            for number in range(tenants_count)
+        ])
+        _, filled = traced(lambda: [
+            fill_state(tenant, number, homeworks)
+            for number, tenant in enumerate(tenants)
+        ])
+    finally:
+        tracemalloc.stop()
+    return {
+        'timestamp': int(time.time()),
+        'revision': git_revision(),
+        'params': {'benchmark': 'memory', 'tenants': tenants_count,
+                   'homeworks': homeworks},
+        'tenant_bytes': round(created / tenants_count),
+        'state_bytes': round(filled / tenants_count),
+        'bytes_per_tenant': round((created + filled) / tenants_count),
+    }
+
+
+def report(result, previous=None):
+    """Печатает результаты и сравнение с предыдущим запуском."""
+    for key in ('tenant_bytes', 'state_bytes', 'bytes_per_tenant'):
+        line = f'{key:>16}: {result[key]:10d}'
+        if previous is not None:
+            line += (f'   (было {previous[key]}, '
+                     f'ревизия {previous["revision"]})')
+        print(line)
+
+
+def main():
+    """Разбирает аргументы командной строки и запускает бенчмарк."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=10000)
+    parser.add_argument('--homeworks', type=int, default=5)
+    parser.add_argument('--no-save', action='store_true',
+                        help='не сохранять результат')
+    args = parser.parse_args()
+    result = run_benchmark(args.tenants, args.homeworks)
+    report(result, previous_result(result['params'], RESULTS_FILE))
+    if not args.no_save:
+        save_result(result, RESULTS_FILE)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""Бенчмарк полного цикла опроса на локальных заглушках.
+
+Цикл get_api_answer -> check_response -> parse_status -> send_message
+прогоняется движком опроса для многих арендаторов. Отчёт содержит
+опросы и отправки в секунду, p50/p99 длительности цикла и память на
+арендатора; результаты дописываются в benchmarks/results.jsonl, чтобы
+их можно было сравнивать между версиями.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_pipeline --tenants 1000 --duration 10
+"""
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import os
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import homework
+from benchmarks.stubs import StubPracticumAPI, StubTelegramBot
+from circuit_breaker import CircuitBreaker
+from cursor_store import CursorStore
+from engine import PollingEngine
+from http_client import HTTPClient
+from scheduler import PollScheduler
+from tenants import Tenant
+
+RESULTS_FILE = os.path.join(os.path.dirname(__file__), 'results.jsonl')
+
+
+def make_tenants(count):
+    """Создаёт арендаторов для бенчмарка."""
+    return [Tenant(f'token-{number}', number) for number in range(count)]
+
+
+def percentile(values, fraction):
+    """Возвращает перцентиль списка значений."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def measure_memory(tenants_count, bot, cursors):
+    """Память на арендатора после одного цикла опроса, в байтах."""
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tenants = make_tenants(tenants_count)
+    for tenant in tenants:
+        try:
+            homework.poll_tenant(tenant, bot, cursors)
+        except Exception:
+            pass
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return used / tenants_count
+
+
+def measure_throughput(tenants, bot, cursors, duration, concurrency):
+    """Прогоняет движок duration секунд и собирает длительности циклов."""
+    latencies = []
+    errors = []
+    poll = functools.partial(homework.poll_tenant, bot=bot, cursors=cursors)
+
+    def timed_poll(tenant):
+        started = time.perf_counter()
+        try:
+            poll(tenant)
+        except Exception:
+            errors.append(tenant.key)
+        latencies.append(time.perf_counter() - started)
+
+    engine = PollingEngine(
+        tenants,
+        poll=timed_poll,
+        scheduler=PollScheduler(
+            default_interval=0, status_intervals={}, jitter=0,
+            spread_start=False,
+        ),
+        max_concurrency=concurrency,
+    )
+
+    async def run():
+        try:
+            await asyncio.wait_for(engine.run(), duration)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(run())
+    return latencies, len(errors)
+
+
+def git_revision():
+    """Текущая ревизия репозитория или None."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(tenants_count=100, duration=5.0, concurrency=32,
+                  api_latency=0.0, api_error_rate=0.0, change_rate=0.1,
+                  telegram_latency=0.0):
+    """Запускает бенчмарк и возвращает словарь с результатами."""
+    api = StubPracticumAPI(
+        latency=api_latency, error_rate=api_error_rate,
+        change_rate=change_rate, seed=1,
+    )
+    bot = StubTelegramBot(latency=telegram_latency)
+    cursors = CursorStore(':memory:')
+    # Запросы к API уходят в заглушку через настоящий HTTPClient.
+    client = HTTPClient()
+    client.session.get = api.get
+    original_client, homework.api_client = homework.api_client, client
+    original_breaker, homework.api_breaker = (
+        homework.api_breaker, CircuitBreaker()
+    )
+    try:
+        memory = measure_memory(min(tenants_count, 1000), bot, cursors)
+        api.requests = bot.sent = 0
+        latencies, errors = measure_throughput(
+            make_tenants(tenants_count), bot, cursors, duration, concurrency
+        )
+    finally:
+        homework.api_client = original_client
+        homework.api_breaker = original_breaker
+        cursors.close()
+    return {
+        'timestamp': int(time.time()),
+        'revision': git_revision(),
+        'params': {
+            'tenants': tenants_count, 'duration': duration,
+            'concurrency': concurrency, 'api_latency': api_latency,
+            'api_error_rate': api_error_rate, 'change_rate': change_rate,
+            'telegram_latency': telegram_latency,
+        },
+        'polls_per_second': len(latencies) / duration,
+        'sends_per_second': bot.sent / duration,
+        'p50_cycle_ms': percentile(latencies, 0.5) * 1000,
+        'p99_cycle_ms': percentile(latencies, 0.99) * 1000,
+        'mean_cycle_ms': (
+            statistics.fmean(latencies) * 1000 if latencies else 0.0
+        ),
+        'errors': errors,
+        'memory_per_tenant_bytes': round(memory),
+    }
+
+
+def save_result(result, path=RESULTS_FILE):
+    """Дописывает результат в файл результатов."""
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+
+def previous_result(params, path=RESULTS_FILE):
+    """Последний сохранённый результат с теми же параметрами."""
+    if not os.path.exists(path):
+        return None
+    previous = None
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            result = json.loads(line)
+            if result['params'] == params:
+                previous = result
+    return previous
+
+
+def report(result, previous=None):
+    """Печатает результаты и сравнение с предыдущим запуском."""
+    keys = ('polls_per_second', 'sends_per_second', 'p50_cycle_ms',
+            'p99_cycle_ms', 'memory_per_tenant_bytes', 'errors')
+    for key in keys:
+        line = f'{key:>24}: {result[key]:12.2f}'
+        if previous is not None:
+            line += (f'   (было {previous[key]:.2f}, '
+                     f'ревизия {previous["revision"]})')
+        print(line)
+
+
+def main():
+    """Разбирает аргументы командной строки и запускает бенчмарк."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--api-latency', type=float, default=0.0)
+    parser.add_argument('--api-error-rate', type=float, default=0.0)
+    parser.add_argument('--change-rate', type=float, default=0.1)
+    parser.add_argument('--telegram-latency', type=float, default=0.0)
+    parser.add_argument('--no-save', action='store_true',
+                        help='не сохранять результат')
+    args = parser.parse_args()
+    # Логи не выводятся, но записи по-прежнему создаются, как в работе.
+    logging.getLogger().addHandler(logging.NullHandler())
+    result = run_benchmark(
+        tenants_count=args.tenants, duration=args.duration,
+        concurrency=args.concurrency, api_latency=args.api_latency,
+        api_error_rate=args.api_error_rate, change_rate=args.change_rate,
+        telegram_latency=args.telegram_latency,
+    )
+    report(result, previous_result(result['params']))
+    if not args.no_save:
+        save_result(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Бенчмарк запуска бота: время импорта модулей и проверки настроек.
+
+Импорт homework выполняется в отдельном интерпретаторе с
+-X importtime; отчёт содержит общее время импорта, самые медленные
+модули и список тяжёлых зависимостей, загруженных при импорте
+(их быть не должно). Отдельно измеряется python homework.py --check
+за вычетом запуска пустого интерпретатора. Результаты дописываются в
+benchmarks/startup_results.jsonl.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_pipeline import (git_revision, previous_result,
+                                       save_result)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FILE = os.path.join(os.path.dirname(__file__), 'startup_results.jsonl')
+HEAVY_MODULES = ('telegram', 'requests', 'dotenv', 'asyncio')
+# Переменные окружения для проверки настроек без настоящих токенов.
+CHECK_ENV = {
+    'PRACTICUM_TOKEN': 'token', 'TELEGRAM_TOKEN': '1234:abcdefg',
+    'TELEGRAM_CHAT_ID': '1',
+}
+
+
+def parse_importtime(output):
+    """Разбирает вывод -X importtime для последнего импортированного модуля.
+
+    Возвращает список (модуль, self, cumulative) из модуля и всех
+    модулей, импортированных им (но не при запуске интерпретатора).
+    Время - в микросекундах, модуль - последний элемент списка.
+    """
+    lines = [
+        line[len('import time:'):].split('|')
+        for line in output.splitlines()
+        if line.startswith('import time:') and 'imported package' not in line
+    ]
+    modules = []
+    for own, cumulative, name in reversed(lines):
+        if modules and not name.startswith('  '):
+            break
+        modules.append((name.strip(), int(own), int(cumulative)))
+    modules.reverse()
+    return modules
+
+
+def import_times(module='homework'):
+    """Импортирует module в новом интерпретаторе с -X importtime."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(completed.stderr)
+
+
+def run_seconds(args, env=None):
+    """Время выполнения команды в секундах."""
+    started = time.perf_counter()
+    subprocess.run(
+        args, cwd=ROOT, env=env, check=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - started
+
+
+def run_benchmark(repeat=3, top=10, module='homework'):
+    """Запускает бенчмарк и возвращает словарь с результатами."""
+    totals = []
+    for _ in range(repeat):
+        modules = import_times(module)
+        totals.append(modules[-1][2])
+    env = {**os.environ, **CHECK_ENV}
+    baseline = min(
+        run_seconds([sys.executable, '-c', 'pass']) for _ in range(repeat)
+    )
+    check = min(
+        run_seconds([sys.executable, f'{module}.py', '--check'], env)
+        for _ in range(repeat)
+    )
+    slowest = sorted(modules[:-1], key=lambda item: item[1], reverse=True)
+    loaded = {name for name, _, _ in modules}
+    return {
+        'timestamp': int(time.time()),
+        'revision': git_revision(),
+        'params': {'benchmark': 'startup', 'module': module},
+        'import_ms': statistics.median(totals) / 1000,
+        'check_ms': max(check - baseline, 0) * 1000,
+        'heavy_modules': [name for name in HEAVY_MODULES if name in loaded],
+        'slowest': [
+            {'module': name, 'self_ms': own / 1000,
+             'cumulative_ms': cumulative / 1000}
+            for name, own, cumulative in slowest[:top]
+        ],
+    }
+
+
+def report(result, previous=None):
+    """Печатает результаты и сравнение с предыдущим запуском."""
+    for key in ('import_ms', 'check_ms'):
+        line = f'{key:>12}: {result[key]:10.2f}'
+        if previous is not None:
+            line += (f'   (было {previous[key]:.2f}, '
+                     f'ревизия {previous["revision"]})')
+        print(line)
+    print(f'{"heavy":>12}: {", ".join(result["heavy_modules"]) or "-"}')
+    for item in result['slowest']:
+        print(f'{item["self_ms"]:10.2f} {item["cumulative_ms"]:10.2f}  '
+              f'{item["module"]}')
+
+
+def main():
+    """Разбирает аргументы командной строки и запускает бенчмарк."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--no-save', action='store_true',
+                        help='не сохранять результат')
+    args = parser.parse_args()
+    result = run_benchmark(repeat=args.repeat, top=args.top)
+    report(result, previous_result(result['params'], RESULTS_FILE))
+    if not args.no_save:
+        save_result(result, RESULTS_FILE)
+
+
+if __name__ == '__main__':
+    main()
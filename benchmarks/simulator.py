@@ -0,0 +1,381 @@
+"""Локальные имитаторы API Практикум.Домашка и Telegram Bot API.
+
+Позволяют нагружать бота тысячами арендаторов без обращения к
+practicum.yandex.ru и api.telegram.org. Запуск из корня репозитория:
+    python -m benchmarks.simulator --tenants 1000 \
+        --write-tenants tenants.json
+
+После этого бот запускается с переменными окружения
+    TENANTS_FILE=tenants.json
+    PRACTICUM_ENDPOINT=http://127.0.0.1:8080/api/user_api/homework_statuses/
+    TELEGRAM_API_URL=http://127.0.0.1:8081/bot
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+API_PATH = '/api/user_api/homework_statuses/'
+STATUS_TRANSITIONS = {
+    'reviewing': ('approved', 'rejected'),
+    'rejected': ('reviewing',),
+    'approved': ('approved',),
+}
+
+
+def tenant_token(number):
+    """Токен арендатора с номером number."""
+    return f'token-{number}'
+
+
+def tenant_number(token):
+    """Номер арендатора по токену или None для чужого токена."""
+    prefix, _, number = token.partition('-')
+    if prefix != 'token' or not number.isdigit():
+        return None
+    return int(number)
+
+
+def format_date(timestamp):
+    """Время в формате date_updated API Практикума."""
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(timestamp))
+
+
+class _TenantHistory:
+    """Работы одного арендатора: [время изменения, словарь работы]."""
+
+    __slots__ = ('homeworks', 'advanced_at')
+
+    def __init__(self, homeworks, now):
+        self.homeworks = homeworks
+        self.advanced_at = now
+
+
+class PracticumSimulator:
+    """Состояние имитатора API Практикума.
+
+    Для каждого из tenants арендаторов генерируется история из history
+    работ. Статусы работ меняются со средней частотой transition_rate
+    переходов в секунду на арендатора, каждая новая работа появляется с
+    частотой new_homework_rate. latency - задержка ответа, error_rate и
+    throttle_rate - доли ответов 500 и 429.
+    """
+
+    def __init__(self, tenants=100, history=5, transition_rate=0.01,
+                 new_homework_rate=0.001, latency=0.0, error_rate=0.0,
+                 throttle_rate=0.0, seed=None, clock=time.time):
+        """Инициализация имитатора."""
+        self.tenants = tenants
+        self.history = history
+        self.transition_rate = transition_rate
+        self.new_homework_rate = new_homework_rate
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.stats = {'requests': 0, 'errors': 0, 'throttled': 0,
+                      'unauthorized': 0, 'transitions': 0}
+        self._histories = {}
+        self._lock = threading.Lock()
+
+    def _history(self, token, now):
+        """История работ арендатора, созданная при первом обращении."""
+        history = self._histories.get(token)
+        if history is None:
+            homeworks = []
+            for number in range(self.history):
+                updated = int(now) - (self.history - number) * 86400
+                homeworks.append([updated, {
+                    'id': number,
+                    'status': 'approved',
+                    'homework_name': f'hw{number}.zip',
+                    'reviewer_comment': 'Всё нравится',
+                    'date_updated': format_date(updated),
+                    'lesson_name': f'Спринт {number}',
+                }])
+            if homeworks:
+                homeworks[-1][1]['status'] = 'reviewing'
+            history = self._histories[token] = _TenantHistory(
+                homeworks, now
+            )
+        return history
+
+    def _advance(self, history, now):
+        """Применяет переходы статусов, накопившиеся с прошлого запроса."""
+        elapsed = now - history.advanced_at
+        history.advanced_at = now
+        transitions = self._events(elapsed * self.transition_rate)
+        for _ in range(transitions):
+            if not history.homeworks:
+                break
+            entry = self.rng.choice(history.homeworks)
+            homework = entry[1]
+            homework['status'] = self.rng.choice(
+                STATUS_TRANSITIONS[homework['status']]
+            )
+            entry[0] = int(now)
+            homework['date_updated'] = format_date(now)
+            self.stats['transitions'] += 1
+        for _ in range(self._events(elapsed * self.new_homework_rate)):
+            number = len(history.homeworks)
+            history.homeworks.append([int(now), {
+                'id': number,
+                'status': 'reviewing',
+                'homework_name': f'hw{number}.zip',
+                'reviewer_comment': '',
+                'date_updated': format_date(now),
+                'lesson_name': f'Спринт {number}',
+            }])
+            self.stats['transitions'] += 1
+
+    def _events(self, expected):
+        """Число событий пуассоновского потока с матожиданием expected."""
+        count = 0
+        if expected <= 0:
+            return count
+        moment = self.rng.expovariate(1)
+        while moment < expected:
+            count += 1
+            moment += self.rng.expovariate(1)
+        return count
+
+    def homework_statuses(self, authorization, from_date):
+        """Обрабатывает запрос к homework_statuses.
+
+        Возвращает (код ответа, тело ответа, дополнительные заголовки).
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.stats['requests'] += 1
+            token = (authorization or '').partition('OAuth ')[2]
+            number = tenant_number(token)
+            if number is None or number >= self.tenants:
+                self.stats['unauthorized'] += 1
+                return HTTPStatus.UNAUTHORIZED, {
+                    'code': 'not_authenticated',
+                    'message': 'Учетные данные не были предоставлены.',
+                    'source': '__response__',
+                }, {}
+            roll = self.rng.random()
+            if roll < self.error_rate:
+                self.stats['errors'] += 1
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {
+                    'code': 'UnknownError',
+                }, {}
+            if roll < self.error_rate + self.throttle_rate:
+                self.stats['throttled'] += 1
+                return HTTPStatus.TOO_MANY_REQUESTS, {
+                    'code': 'throttled',
+                }, {'Retry-After': '1'}
+            try:
+                from_date = int(float(from_date))
+            except (TypeError, ValueError):
+                return HTTPStatus.BAD_REQUEST, {
+                    'error': {'error': 'Wrong from_date format'},
+                    'code': 'UnknownError',
+                    'source': '__response__',
+                }, {}
+            now = self.clock()
+            history = self._history(token, now)
+            self._advance(history, now)
+            homeworks = [
+                dict(homework) for updated, homework in sorted(
+                    history.homeworks, key=lambda entry: -entry[0]
+                )
+                if updated >= from_date
+            ]
+        return HTTPStatus.OK, {
+            'homeworks': homeworks,
+            'current_date': int(now),
+        }, {}
+
+
+class TelegramSimulator:
+    """Состояние имитатора Telegram Bot API.
+
+    Принимает sendMessage и getMe, считает сообщения по чатам;
+    throttle_rate - доля ответов 429 с retry_after.
+    """
+
+    def __init__(self, latency=0.0, throttle_rate=0.0, retry_after=1,
+                 seed=None):
+        """Инициализация имитатора."""
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.messages = {}
+        self.stats = {'sent': 0, 'throttled': 0}
+        self._message_id = 0
+        self._lock = threading.Lock()
+
+    def call(self, method, payload):
+        """Обрабатывает вызов метода Bot API. Возвращает (код, тело)."""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if method == 'getMe':
+                return HTTPStatus.OK, {'ok': True, 'result': {
+                    'id': 1, 'is_bot': True, 'first_name': 'homework_bot',
+                    'username': 'homework_bot',
+                }}
+            if method != 'sendMessage':
+                return HTTPStatus.NOT_FOUND, {
+                    'ok': False, 'error_code': 404,
+                    'description': 'Not Found',
+                }
+            if self.rng.random() < self.throttle_rate:
+                self.stats['throttled'] += 1
+                return HTTPStatus.TOO_MANY_REQUESTS, {
+                    'ok': False, 'error_code': 429,
+                    'description': (
+                        f'Too Many Requests: retry after {self.retry_after}'
+                    ),
+                    'parameters': {'retry_after': self.retry_after},
+                }
+            chat_id = str(payload.get('chat_id'))
+            self.messages[chat_id] = self.messages.get(chat_id, 0) + 1
+            self.stats['sent'] += 1
+            self._message_id += 1
+            return HTTPStatus.OK, {'ok': True, 'result': {
+                'message_id': self._message_id,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'text': payload.get('text'),
+            }}
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    """Общая часть обработчиков: keep-alive и ответ в JSON."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def respond(self, status, body, headers=None):
+        """Отправляет JSON-ответ."""
+        data = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        """Не пишет журнал запросов."""
+
+
+class PracticumHandler(_JSONHandler):
+    """HTTP-обработчик имитатора API Практикума."""
+
+    simulator = None
+
+    def do_GET(self):
+        """Отвечает на GET /api/user_api/homework_statuses/."""
+        url = urlsplit(self.path)
+        if url.path != API_PATH:
+            self.respond(HTTPStatus.NOT_FOUND, {'detail': 'Not found.'})
+            return
+        from_date = parse_qs(url.query).get('from_date', [None])[0]
+        self.respond(*self.simulator.homework_statuses(
+            self.headers.get('Authorization'), from_date
+        ))
+
+
+class TelegramHandler(_JSONHandler):
+    """HTTP-обработчик имитатора Telegram Bot API."""
+
+    simulator = None
+
+    def do_POST(self):
+        """Отвечает на POST /bot<token>/<method>."""
+        method = self.path.rstrip('/').rpartition('/')[2]
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            payload = {}
+        self.respond(*self.simulator.call(method, payload))
+
+    do_GET = do_POST
+
+
+def serve(handler, simulator, host='127.0.0.1', port=0):
+    """Запускает имитатор в фоновом потоке и возвращает сервер.
+
+    Адрес сервера - server.server_address, остановка - server.shutdown().
+    """
+    handler_class = type(
+        handler.__name__, (handler,), {'simulator': simulator}
+    )
+    server = ThreadingHTTPServer((host, port), handler_class)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def write_tenants(path, tenants):
+    """Записывает файл арендаторов для переменной TENANTS_FILE."""
+    records = [
+        {'practicum_token': tenant_token(number), 'chat_id': number}
+        for number in range(tenants)
+    ]
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(records, file)
+
+
+def main():
+    """Запускает оба имитатора до прерывания."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--telegram-port', type=int, default=8081)
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--history', type=int, default=5)
+    parser.add_argument('--transition-rate', type=float, default=0.01)
+    parser.add_argument('--new-homework-rate', type=float, default=0.001)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--telegram-latency', type=float, default=0.0)
+    parser.add_argument('--telegram-throttle-rate', type=float, default=0.0)
+    parser.add_argument('--write-tenants', metavar='PATH',
+                        help='записать файл арендаторов для TENANTS_FILE')
+    args = parser.parse_args()
+    if args.write_tenants:
+        write_tenants(args.write_tenants, args.tenants)
+    practicum = PracticumSimulator(
+        tenants=args.tenants, history=args.history,
+        transition_rate=args.transition_rate,
+        new_homework_rate=args.new_homework_rate, latency=args.latency,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+    )
+    telegram = TelegramSimulator(
+        latency=args.telegram_latency,
+        throttle_rate=args.telegram_throttle_rate,
+    )
+    servers = [
+        serve(PracticumHandler, practicum, args.host, args.port),
+        serve(TelegramHandler, telegram, args.host, args.telegram_port),
+    ]
+    print(f'API Практикума: http://{args.host}:{args.port}{API_PATH}')
+    print(f'Telegram Bot API: http://{args.host}:{args.telegram_port}/bot')
+    try:
+        while True:
+            time.sleep(10)
+            print(f'API: {practicum.stats}, Telegram: {telegram.stats}')
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Локальные заглушки API Практикума и Telegram для бенчмарков."""
+import json
+import random
+import threading
+import time
+from http import HTTPStatus
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+
+
+class StubResponse:
+    """Ответ заглушки с интерфейсом requests.Response."""
+
+    def __init__(self, status_code, content=b'', headers=None):
+        """Инициализация ответа."""
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def json(self):
+        """Декодирует тело ответа."""
+        return json.loads(self.content)
+
+
+class StubPracticumAPI:
+    """Заглушка метода get сессии API Практикума.
+
+    Для каждого токена хранит список работ; при каждом запросе с
+    вероятностью change_rate меняет статус одной из них. latency -
+    задержка ответа в секундах, error_rate - доля ответов с кодом 500.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, change_rate=0.1,
+                 homeworks_per_tenant=3, seed=None):
+        """Инициализация заглушки."""
+        self.latency = latency
+        self.error_rate = error_rate
+        self.change_rate = change_rate
+        self.homeworks_per_tenant = homeworks_per_tenant
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self._homeworks = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        """Отвечает как эндпоинт homework_statuses."""
+        if self.latency:
+            time.sleep(self.latency)
+        token = headers['Authorization']
+        with self._lock:
+            self.requests += 1
+            if self.rng.random() < self.error_rate:
+                return StubResponse(HTTPStatus.INTERNAL_SERVER_ERROR)
+            homeworks = self._homeworks.get(token)
+            if homeworks is None:
+                homeworks = self._homeworks[token] = [
+                    {
+                        'id': number,
+                        'homework_name': f'hw{number}',
+                        'status': 'reviewing',
+                        'date_updated': '2022-03-10T10:00:00Z',
+                    }
+                    for number in range(self.homeworks_per_tenant)
+                ]
+            elif self.rng.random() < self.change_rate:
+                homework = self.rng.choice(homeworks)
+                homework['status'] = self.rng.choice(STATUSES)
+                homework['date_updated'] = time.strftime(
+                    '%Y-%m-%dT%H:%M:%SZ'
+                )
+            body = json.dumps({
+                'homeworks': homeworks,
+                'current_date': int(time.time()),
+            }).encode()
+        return StubResponse(HTTPStatus.OK, body)
+
+
+class StubTelegramBot:
+    """Заглушка Bot: считает отправленные сообщения."""
+
+    def __init__(self, latency=0.0):
+        """Инициализация заглушки."""
+        self.latency = latency
+        self.sent = 0
+        self._lock = threading.Lock()
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        """Имитирует отправку сообщения."""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.sent += 1
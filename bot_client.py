@@ -0,0 +1,58 @@
+"""Управление жизненным циклом клиента Telegram Bot."""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+CON_POOL_SIZE = 8
+
+
+class BotClientManager:
+    """Создаёт клиентов Bot один раз и раздаёт их отправителям.
+
+    Все клиенты используют один объект Request, то есть один пул
+    соединений с api.telegram.org. Клиент для токена создаётся лениво
+    при первом обращении и дальше переиспользуется, поэтому отправка
+    сообщений не платит за создание бота и TLS рукопожатие. Сам пакет
+    telegram импортируется при создании первого клиента.
+    """
+
+    def __init__(self, con_pool_size=CON_POOL_SIZE, base_url=None):
+        """Инициализация менеджера.
+
+        base_url - адрес Bot API вместо https://api.telegram.org/bot.
+        """
+        self.con_pool_size = con_pool_size
+        self.base_url = base_url
+        self._request = None
+        self._bots = {}
+        self._lock = threading.Lock()
+
+    def get_bot(self, token):
+        """Возвращает общий клиент Bot для токена."""
+        bot = self._bots.get(token)
+        if bot is not None:
+            return bot
+        import telegram
+        from telegram.utils.request import Request
+
+        with self._lock:
+            if token not in self._bots:
+                if self._request is None:
+                    self._request = Request(
+                        con_pool_size=self.con_pool_size
+                    )
+                self._bots[token] = telegram.Bot(
+                    token=token, base_url=self.base_url,
+                    request=self._request,
+                )
+                logger.info('Создан клиент Bot.')
+            return self._bots[token]
+
+    def close(self):
+        """Закрывает пул соединений и забывает созданных клиентов."""
+        with self._lock:
+            if self._request is not None:
+                self._request.stop()
+            self._request = None
+            self._bots.clear()
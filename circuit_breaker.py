@@ -0,0 +1,133 @@
+"""Автоматический выключатель запросов к недоступному сервису."""
+import logging
+import threading
+import time
+from enum import Enum
+
+logger = logging.getLogger(__name__)
+
+# После FAILURE_THRESHOLD сбоев подряд запросы прекращаются на
+# RESET_TIMEOUT секунд; каждая неудачная пробная попытка увеличивает
+# паузу в BACKOFF раз, но не больше MAX_RESET_TIMEOUT.
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30
+MAX_RESET_TIMEOUT = 900
+BACKOFF = 2
+
+
+class CircuitState(Enum):
+    """Состояние выключателя; значение - код для метрик."""
+
+    CLOSED = 0
+    OPEN = 1
+    HALF_OPEN = 2
+
+
+class CircuitOpenError(Exception):
+    """Запрос не выполнен: выключатель разомкнут."""
+
+    def __init__(self, retry_after):
+        """retry_after - через сколько секунд возможна пробная попытка."""
+        super().__init__(
+            f'Сервис недоступен, следующая попытка через {retry_after:.0f} с.'
+        )
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Выключатель, общий для всех арендаторов одного сервиса.
+
+    В замкнутом состоянии запросы идут как обычно. После
+    failure_threshold сбоев подряд выключатель размыкается: allow()
+    возвращает False, и запросы не отправляются reset_timeout секунд.
+    Затем он полуоткрыт: allow() пропускает ровно один пробный запрос.
+    Успех пробы замыкает выключатель и сбрасывает паузу, сбой снова
+    размыкает его с паузой, увеличенной в backoff раз (не больше
+    max_reset_timeout).
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD,
+                 reset_timeout=RESET_TIMEOUT,
+                 max_reset_timeout=MAX_RESET_TIMEOUT, backoff=BACKOFF,
+                 clock=time.monotonic):
+        """Инициализация замкнутого выключателя."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.backoff = backoff
+        self.clock = clock
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self._timeout = reset_timeout
+        self._opened_at = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_after(self):
+        """Через сколько секунд выключатель пропустит пробный запрос."""
+        if self.state is CircuitState.CLOSED:
+            return 0
+        return max(self._opened_at + self._timeout - self.clock(), 0)
+
+    def available(self):
+        """Можно ли сейчас попробовать запрос; пробу не занимает."""
+        with self._lock:
+            if self.state is CircuitState.CLOSED:
+                return True
+            return not self._probing and self.retry_after() == 0
+
+    def allow(self):
+        """Решает, выполнять ли запрос.
+
+        В полуоткрытом состоянии разрешение получает только один
+        вызывающий; он обязан сообщить результат через record_success()
+        или record_failure().
+        """
+        with self._lock:
+            if self.state is CircuitState.CLOSED:
+                return True
+            if not self._probing and self.retry_after() == 0:
+                self.state = CircuitState.HALF_OPEN
+                self._probing = True
+                logger.info('Выключатель полуоткрыт: пробный запрос.')
+                return True
+            self.rejected += 1
+            return False
+
+    def check(self):
+        """Как allow(), но выбрасывает CircuitOpenError вместо False."""
+        if not self.allow():
+            raise CircuitOpenError(self.retry_after())
+
+    def record_success(self):
+        """Учитывает успешный запрос."""
+        with self._lock:
+            if self.state is not CircuitState.CLOSED:
+                logger.info('Выключатель замкнут: сервис снова доступен.')
+            self.state = CircuitState.CLOSED
+            self.failures = 0
+            self._timeout = self.reset_timeout
+            self._probing = False
+
+    def record_failure(self):
+        """Учитывает сбой запроса."""
+        with self._lock:
+            self.failures += 1
+            if self.state is CircuitState.HALF_OPEN:
+                self._timeout = min(self._timeout * self.backoff,
+                                    self.max_reset_timeout)
+                self._open()
+            elif (self.state is CircuitState.CLOSED
+                  and self.failures >= self.failure_threshold):
+                self._open()
+
+    def _open(self):
+        """Размыкает выключатель на текущую паузу."""
+        self.state = CircuitState.OPEN
+        self._opened_at = self.clock()
+        self._probing = False
+        logger.warning(
+            'Выключатель разомкнут после %d сбоев подряд на %s с.',
+            self.failures, self._timeout,
+        )
@@ -0,0 +1,55 @@
+"""Хранилище курсоров from_date арендаторов в SQLite."""
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CursorStore:
+    """Сохраняет между опросами и перезапусками значение current_date.
+
+    Для каждого арендатора хранится одна строка: ключ арендатора и
+    метка времени, с которой нужно запрашивать изменения в следующий
+    раз. Запись выполняется сразу при обновлении, поэтому после
+    перезапуска бот продолжает с сохранённого курсора.
+    """
+
+    def __init__(self, path):
+        """Открывает (и при необходимости создаёт) базу курсоров."""
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS cursors ('
+                'tenant_key TEXT PRIMARY KEY, '
+                'from_date INTEGER NOT NULL, '
+                'updated_at INTEGER NOT NULL)'
+            )
+
+    def get(self, tenant_key, default=None):
+        """Возвращает сохранённый курсор арендатора или default."""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT from_date FROM cursors WHERE tenant_key = ?',
+                (tenant_key,),
+            ).fetchone()
+        return row[0] if row else default
+
+    def set(self, tenant_key, from_date):
+        """Сохраняет курсор арендатора."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT INTO cursors (tenant_key, from_date, updated_at) '
+                'VALUES (?, ?, ?) ON CONFLICT(tenant_key) DO UPDATE SET '
+                'from_date = excluded.from_date, '
+                'updated_at = excluded.updated_at',
+                (tenant_key, from_date, int(time.time())),
+            )
+        logger.debug('Курсор арендатора %s - %s.', tenant_key, from_date)
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,179 @@
+"""Асинхронный движок опроса API для множества арендаторов."""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from event_log import POLL, emit
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENT_POLLS = 32
+# Пауза перед перезапуском упавшей фоновой службы, секунды.
+SERVICE_RESTART_DELAY = 5
+
+POLLS = REGISTRY.counter(
+    'homework_bot_polls_total', 'Выполненные циклы опроса.', ['result'],
+)
+POLL_DURATION = REGISTRY.histogram(
+    'homework_bot_poll_duration_seconds',
+    'Длительность цикла опроса без ожидания в очереди.',
+)
+POLLS_WAITING = REGISTRY.gauge(
+    'homework_bot_polls_waiting', 'Циклы опроса, ждущие свободного слота.',
+)
+POLLS_IN_FLIGHT = REGISTRY.gauge(
+    'homework_bot_polls_in_flight', 'Выполняющиеся циклы опроса.',
+)
+
+
+class PollingEngine:
+    """Опрашивает API Практикума для многих арендаторов в одном процессе.
+
+    Каждый арендатор обслуживается отдельной задачей asyncio, поэтому
+    медленный ответ одного арендатора не задерживает остальных.
+    Одновременно выполняется не больше max_concurrency циклов опроса:
+    блокирующие вызовы (requests, telegram) уходят в пул потоков того
+    же размера. Функция poll получает арендатора и выполняет один цикл
+    опроса; исключение из неё останавливает только задачу этого
+    арендатора, а если задан supervisor (см. supervisor.Supervisor),
+    опрос арендатора повторяется после назначенной им паузы. Паузы
+    между опросами арендатора вычисляет scheduler
+    (см. scheduler.PollScheduler). background - корутинные функции
+    фоновых служб (например, очереди исходящих сообщений), работающих,
+    пока идёт опрос; служба, завершившаяся ошибкой, перезапускается
+    через SERVICE_RESTART_DELAY секунд. После stop() новые опросы не
+    начинаются, начатые доводятся до конца, затем выполняются корутинные
+    функции shutdown (например, отправка оставшихся сообщений), и только
+    после этого фоновые службы останавливаются.
+    """
+
+    def __init__(self, tenants, poll, scheduler,
+                 max_concurrency=MAX_CONCURRENT_POLLS, background=(),
+                 shutdown=(), supervisor=None):
+        """Инициализация движка."""
+        self.tenants = list(tenants)
+        self.poll = poll
+        self.scheduler = scheduler
+        self.max_concurrency = max_concurrency
+        self.background = list(background)
+        self.shutdown = list(shutdown)
+        self.supervisor = supervisor
+        self._semaphore = None
+        self._executor = None
+        self._stopping = None
+
+    async def run(self):
+        """Запускает опрос всех арендаторов и ждёт завершения задач.
+
+        Если задачи арендаторов завершились ошибкой, после остановки
+        всех задач выбрасывается первая из ошибок.
+        """
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._stopping = asyncio.Event()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix='poll',
+        )
+        logger.info(
+            'Запуск движка: арендаторов - %d, параллельных опросов - %d.',
+            len(self.tenants), self.max_concurrency,
+        )
+        services = [
+            asyncio.create_task(self._run_service(service))
+            for service in self.background
+        ]
+        try:
+            results = await asyncio.gather(
+                *(self._run_tenant(tenant) for tenant in self.tenants),
+                return_exceptions=True,
+            )
+            for hook in self.shutdown:
+                await hook()
+        finally:
+            for service in services:
+                service.cancel()
+            await asyncio.gather(*services, return_exceptions=True)
+            self._executor.shutdown(wait=False)
+        errors = [
+            result for result in results if isinstance(result, Exception)
+        ]
+        if errors:
+            raise errors[0]
+
+    def stop(self):
+        """Просит движок завершиться после текущих циклов опроса.
+
+        Вызывается из цикла asyncio, например обработчиком сигнала.
+        """
+        if self._stopping is not None and not self._stopping.is_set():
+            logger.info('Остановка движка: ждём завершения опросов.')
+            self._stopping.set()
+
+    async def poll_once(self, tenant):
+        """Выполняет один цикл опроса арендатора в пуле потоков."""
+        loop = asyncio.get_running_loop()
+        POLLS_WAITING.inc()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            POLLS_WAITING.dec()
+        POLLS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        result = 'error'
+        try:
+            await loop.run_in_executor(self._executor, self.poll, tenant)
+            result = 'ok'
+        finally:
+            duration = time.perf_counter() - started
+            POLL_DURATION.observe(duration)
+            POLLS.labels(result).inc()
+            emit(POLL, tenant.key, result=result,
+                 ms=round(duration * 1000, 1))
+            POLLS_IN_FLIGHT.dec()
+            self._semaphore.release()
+
+    async def _run_service(self, service):
+        """Выполняет фоновую службу, перезапуская её после ошибок."""
+        while True:
+            try:
+                await service()
+                return
+            except Exception:
+                logger.exception(
+                    'Фоновая служба %s остановлена ошибкой, перезапуск '
+                    'через %s с.', getattr(service, '__qualname__', service),
+                    SERVICE_RESTART_DELAY,
+                )
+            await asyncio.sleep(SERVICE_RESTART_DELAY)
+
+    async def _run_tenant(self, tenant):
+        """Бесконечный цикл опроса одного арендатора."""
+        await self._sleep(self.scheduler.first_delay(tenant))
+        while not self._stopping.is_set():
+            try:
+                await self.poll_once(tenant)
+            except Exception:
+                if self.supervisor is None:
+                    logger.exception(
+                        'Опрос арендатора %s остановлен ошибкой.', tenant.key
+                    )
+                    raise
+                delay = self.supervisor.record_failure(tenant.key)
+                logger.exception(
+                    'Опрос арендатора %s завершился ошибкой, повтор через '
+                    '%s с.', tenant.key, delay,
+                )
+                await self._sleep(delay)
+                continue
+            if self.supervisor is not None:
+                self.supervisor.record_success(tenant.key)
+            await self._sleep(self.scheduler.next_delay(tenant))
+
+    async def _sleep(self, delay):
+        """Пауза между опросами, прерываемая вызовом stop()."""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
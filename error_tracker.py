@@ -0,0 +1,152 @@
+"""Дедупликация ошибок перед отправкой их в Telegram."""
+import re
+import time
+
+from metrics import REGISTRY
+
+# Повторы ошибки в течение WINDOW секунд после последнего появления
+# не отправляются, а считаются; раз в ROLLUP_INTERVAL секунд по ним
+# отправляется сводка.
+WINDOW = 3600
+ROLLUP_INTERVAL = 3600
+
+SUPPRESSED_ERRORS = REGISTRY.counter(
+    'homework_bot_errors_suppressed_total',
+    'Повторы ошибок, не отправленные в чат.', ['type'],
+)
+
+# Числа вместе с дробной частью, датой и временем: 0.25, 10:20:30.
+_NUMBERS = re.compile(r'\d+(?:[.:-]\d+)*')
+_STATUS_CODE = re.compile(r'[1-5]\d\d')
+_SPACES = re.compile(r'\s+')
+
+
+def _replace_number(match):
+    """Заменяет число на '#', кроме кодов ответа HTTP."""
+    number = match.group()
+    if not _STATUS_CODE.fullmatch(number):
+        return '#'
+    # Ошибки сервера (5xx) - один сбой, остальные коды различаются.
+    return '5##' if number[0] == '5' else number
+
+
+def normalize(message):
+    """Убирает из текста ошибки числа и лишние пробелы.
+
+    Сообщения, отличающиеся только временем, идентификаторами или
+    кодом ошибки сервера (5xx), дают один и тот же отпечаток. Другие
+    коды ответа HTTP сохраняются: 401 после 500 - другая ошибка.
+    """
+    return _SPACES.sub(' ', _NUMBERS.sub(_replace_number, message)).strip()
+
+
+class _ErrorState:
+    """Счётчики одной ошибки."""
+
+    __slots__ = ('message', 'last_seen', 'period_start', 'suppressed')
+
+    def __init__(self, message, now):
+        self.message = message
+        self.last_seen = now
+        self.period_start = now
+        self.suppressed = 0
+
+
+class ErrorTracker:
+    """Решает, какие ошибки арендатора сообщать в чат.
+
+    Ошибка определяется отпечатком (тип, источник, нормализованный
+    текст). О первом появлении сообщается сразу, повторы в течение
+    window секунд только считаются, а раз в rollup_interval секунд по
+    ним формируется сводка. Ошибка, не повторявшаяся дольше window,
+    забывается, и её следующее появление снова сообщается сразу.
+    """
+
+    __slots__ = ('window', 'rollup_interval', 'clock', '_errors')
+
+    def __init__(self, window=WINDOW, rollup_interval=ROLLUP_INTERVAL,
+                 clock=time.monotonic):
+        """Инициализация трекера."""
+        self.window = window
+        self.rollup_interval = rollup_interval
+        self.clock = clock
+        self._errors = {}
+
+    def __len__(self):
+        """Количество отслеживаемых ошибок."""
+        return len(self._errors)
+
+    def snapshot(self):
+        """Состояние для снимка: отпечатки и счётчики ошибок.
+
+        Время хранится как возраст в секундах, а не по часам
+        трекера: монотонные часы не переживают перезапуск процесса.
+        """
+        now = self.clock()
+        return [
+            [error_type, source, text, state.message,
+             now - state.last_seen, now - state.period_start,
+             state.suppressed]
+            for (error_type, source, text), state in self._errors.items()
+        ]
+
+    def restore(self, items, elapsed=0):
+        """Восстанавливает состояние из snapshot().
+
+        elapsed - сколько секунд прошло с момента снимка.
+        """
+        now = self.clock()
+        self._errors = {}
+        for (error_type, source, text, message, seen_age, period_age,
+             suppressed) in items:
+            state = _ErrorState(message, now - seen_age - elapsed)
+            state.period_start = now - period_age - elapsed
+            state.suppressed = suppressed
+            self._errors[(error_type, source, text)] = state
+        self._expire(now)
+
+    def record(self, error_type, source, message):
+        """Учитывает ошибку.
+
+        Возвращает текст для отправки в чат или None, если ошибка
+        повторяется и сообщать о ней сейчас не нужно.
+        """
+        now = self.clock()
+        self._expire(now)
+        key = (error_type, source, normalize(message))
+        state = self._errors.get(key)
+        if state is None:
+            self._errors[key] = _ErrorState(message, now)
+            return message
+        state.last_seen = now
+        state.suppressed += 1
+        SUPPRESSED_ERRORS.labels(error_type).inc()
+        return None
+
+    def rollups(self):
+        """Возвращает сводки по повторам, время которых подошло."""
+        now = self.clock()
+        messages = []
+        for state in self._errors.values():
+            period = now - state.period_start
+            if state.suppressed and period >= self.rollup_interval:
+                messages.append(
+                    f'Ошибка повторилась {state.suppressed} раз за '
+                    f'последние {round(period / 60)} мин.: {state.message}'
+                )
+                state.suppressed = 0
+                state.period_start = now
+        self._expire(now)
+        return messages
+
+    def _expire(self, now):
+        """Забывает ошибки, не повторявшиеся дольше окна.
+
+        Ошибка с неотправленными в сводке повторами не забывается.
+        """
+        expired = [
+            key for key, state in self._errors.items()
+            if not state.suppressed and now - state.last_seen > self.window
+        ]
+        for key in expired:
+            del self._errors[key]
@@ -0,0 +1,311 @@
+"""Журнал событий бота: опросы, изменения работ, отправки и ошибки.
+
+Записи пишутся в каталог журнала сегментами по суткам (UTC): в файл
+ГГГГ-ММ-ДД.jsonl - по одной компактной JSON-записи на строку, только
+дописыванием. Рядом, в ГГГГ-ММ-ДД.idx, для каждой записи арендатора
+хранится строка "ключ арендатора<TAB>смещение записи". Запрос за период
+читает только сегменты нужных суток, а запрос по арендатору - только
+его записи по смещениям из индекса.
+
+Запросы из командной строки, например все изменения арендатора за
+неделю:
+    python event_log.py --tenant 1a2b3c4d5e6f --kind change --since 7d
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+# Типы записей.
+POLL = 'poll'
+CHANGE = 'change'
+SEND = 'send'
+ERROR = 'error'
+# Записи логов уровня WARNING и выше, не относящиеся к событиям.
+LOG = 'log'
+KINDS = (POLL, CHANGE, SEND, ERROR, LOG)
+
+EVENT_LOG_DIR = 'events'
+RETENTION_DAYS = 90
+# Логгер событий: его записи попадают только в журнал событий.
+LOGGER_NAME = 'homework_bot.events'
+
+logger = logging.getLogger(LOGGER_NAME)
+
+_DURATION = re.compile(r'^(\d+)([mhd])$')
+_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+
+
+def emit(kind, tenant=None, **fields):
+    """Записывает событие kind арендатора с ключом tenant.
+
+    Запись уходит через логгер событий и пишется в журнал в потоке
+    логирования (см. log_config.configure_logging); без настроенного
+    логирования вызов почти ничего не стоит.
+    """
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(kind, extra={'event': kind, 'tenant': tenant,
+                                 'fields': fields})
+
+
+def _day(timestamp):
+    """Сутки (UTC) записи с временем timestamp."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).date()
+
+
+class EventLog:
+    """Журнал событий в каталоге directory.
+
+    write() дописывает запись в сегмент текущих суток и индекс,
+    query() выбирает записи за период, по арендатору и типу. Сегменты
+    старше retention_days суток удаляются при открытии журнала.
+    """
+
+    def __init__(self, directory=EVENT_LOG_DIR,
+                 retention_days=RETENTION_DAYS, clock=time.time):
+        """Открывает (и при необходимости создаёт) каталог журнала."""
+        self.directory = directory
+        self.retention_days = retention_days
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._day = None
+        self._segment = None
+        self._index = None
+        os.makedirs(directory, exist_ok=True)
+        if retention_days:
+            self.prune()
+
+    def _paths(self, day):
+        """Пути сегмента и индекса суток day."""
+        base = os.path.join(self.directory, day.isoformat())
+        return base + '.jsonl', base + '.idx'
+
+    def write(self, kind, tenant=None, timestamp=None, **fields):
+        """Дописывает запись в журнал."""
+        timestamp = self.clock() if timestamp is None else timestamp
+        record = {'t': round(timestamp, 3), 'k': kind}
+        if tenant is not None:
+            record['tenant'] = tenant
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'),
+                          default=str).encode() + b'\n'
+        day = _day(timestamp)
+        with self._lock:
+            if day != self._day:
+                self._open(day)
+            offset = self._segment.tell()
+            self._segment.write(line)
+            self._segment.flush()
+            if tenant is not None:
+                self._index.write(f'{tenant}\t{offset}\n'.encode())
+                self._index.flush()
+
+    def _open(self, day):
+        """Переходит к сегменту суток day."""
+        self._close_files()
+        segment, index = self._paths(day)
+        self._segment = open(segment, 'ab')
+        if self._segment.tell() and not self._ends_with_newline(segment):
+            # Недописанная при падении запись не склеивается со
+            # следующей.
+            self._segment.write(b'\n')
+        self._index = open(index, 'ab')
+        self._day = day
+
+    @staticmethod
+    def _ends_with_newline(path):
+        """Заканчивается ли файл переводом строки."""
+        with open(path, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b'\n'
+
+    def _close_files(self):
+        """Закрывает файлы текущего сегмента."""
+        for file in (self._segment, self._index):
+            if file is not None:
+                file.close()
+        self._segment = self._index = self._day = None
+
+    def days(self):
+        """Сутки, за которые есть сегменты, по порядку."""
+        days = []
+        for name in os.listdir(self.directory):
+            stem, extension = os.path.splitext(name)
+            if extension != '.jsonl':
+                continue
+            try:
+                days.append(date.fromisoformat(stem))
+            except ValueError:
+                continue
+        return sorted(days)
+
+    def query(self, since=None, until=None, tenant=None, kinds=None):
+        """Записи за [since, until) в порядке записи.
+
+        since и until - время Unix; tenant - ключ арендатора; kinds -
+        набор типов записей. Читаются только сегменты суток периода, а
+        при заданном tenant - только записи арендатора из индекса.
+        """
+        first = None if since is None else _day(since)
+        last = None if until is None else _day(until)
+        for day in self.days():
+            if (first and day < first) or (last and day > last):
+                continue
+            for record in self._read(day, tenant):
+                if since is not None and record['t'] < since:
+                    continue
+                if until is not None and record['t'] >= until:
+                    continue
+                if kinds and record['k'] not in kinds:
+                    continue
+                if tenant is not None and record.get('tenant') != tenant:
+                    continue
+                yield record
+
+    def _read(self, day, tenant):
+        """Записи сегмента суток day (только арендатора tenant)."""
+        segment, index = self._paths(day)
+        with open(segment, 'rb') as file:
+            if tenant is None:
+                lines = iter(file.readline, b'')
+            else:
+                lines = self._lines_at(file, self._offsets(index, tenant))
+            for line in lines:
+                # Последняя строка может быть недописана при падении.
+                if not line.endswith(b'\n'):
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    @staticmethod
+    def _offsets(index, tenant):
+        """Смещения записей арендатора tenant из индекса сегмента."""
+        prefix = f'{tenant}\t'.encode()
+        if not os.path.exists(index):
+            return []
+        with open(index, 'rb') as file:
+            return [
+                int(line[len(prefix):]) for line in file
+                if line.startswith(prefix)
+            ]
+
+    @staticmethod
+    def _lines_at(file, offsets):
+        """Строки файла, начинающиеся со смещений offsets."""
+        for offset in offsets:
+            file.seek(offset)
+            yield file.readline()
+
+    def prune(self):
+        """Удаляет сегменты старше retention_days суток."""
+        oldest = _day(self.clock()) - timedelta(days=self.retention_days)
+        for day in self.days():
+            if day >= oldest:
+                break
+            for path in self._paths(day):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def close(self):
+        """Закрывает файлы журнала."""
+        with self._lock:
+            self._close_files()
+
+
+class EventLogHandler(logging.Handler):
+    """Хэндлер логирования, пишущий записи в журнал событий.
+
+    Записи логгера событий (см. emit) пишутся как события своего типа,
+    остальные записи - как записи типа LOG с уровнем, логгером,
+    текстом и трассировкой исключения.
+    """
+
+    def __init__(self, event_log, level=logging.WARNING):
+        """Инициализация хэндлера журнала event_log."""
+        super().__init__()
+        self.event_log = event_log
+        self.level_for_logs = level
+
+    def emit(self, record):
+        """Пишет запись в журнал."""
+        try:
+            kind = getattr(record, 'event', None)
+            if kind is not None:
+                self.event_log.write(kind, record.tenant, record.created,
+                                     **record.fields)
+                return
+            if record.levelno < self.level_for_logs:
+                return
+            fields = {'level': record.levelname, 'logger': record.name,
+                      'message': record.getMessage()}
+            if record.exc_info:
+                fields['exc'] = logging.Formatter().formatException(
+                    record.exc_info
+                )
+            self.event_log.write(LOG, getattr(record, 'tenant', None),
+                                 record.created, **fields)
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        """Закрывает журнал."""
+        self.event_log.close()
+        super().close()
+
+
+def parse_time(value, now=None):
+    """Время Unix из '7d', '12h', '30m' (назад от now) или даты ISO."""
+    match = _DURATION.match(value)
+    if match:
+        now = time.time() if now is None else now
+        delta = timedelta(**{_UNITS[match[2]]: int(match[1])})
+        return now - delta.total_seconds()
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def main(argv=None):
+    """Выводит записи журнала по запросу из командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Запросы к журналу событий бота.'
+    )
+    parser.add_argument('--dir', default=os.getenv('EVENT_LOG_DIR',
+                                                   EVENT_LOG_DIR))
+    parser.add_argument('--tenant', help='ключ арендатора')
+    parser.add_argument('--kind', action='append', choices=KINDS,
+                        help='тип записей, можно указать несколько раз')
+    parser.add_argument('--since', help='начало периода: 7d, 12h или дата')
+    parser.add_argument('--until', help='конец периода: 1h или дата')
+    parser.add_argument('--limit', type=int,
+                        help='вывести не больше стольких записей')
+    parser.add_argument('--count', action='store_true',
+                        help='вывести только число записей')
+    args = parser.parse_args(argv)
+    event_log = EventLog(args.dir, retention_days=None)
+    records = event_log.query(
+        since=args.since and parse_time(args.since),
+        until=args.until and parse_time(args.until),
+        tenant=args.tenant,
+        kinds=args.kind,
+    )
+    if args.count:
+        print(sum(1 for _ in records))
+        return
+    if args.limit is not None:
+        records = itertools.islice(records, args.limit)
+    for record in records:
+        sys.stdout.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,40 +1,167 @@
-"""Главный файл приложения бота."""
+"""Главный файл приложения бота.
+
+Модули, нужные только работающему боту (движок опроса, asyncio,
+серверы webhook и метрик, telegram, requests), импортируются при
+запуске main() или при первом запросе, поэтому импорт модуля и проверка
+настроек (python homework.py --check) обходятся без них.
+"""
+import functools
 import logging
 import os
-import requests
+import re
 import sys
 import time
 
-from logging.handlers import RotatingFileHandler
-
-from dotenv import load_dotenv
+from bot_client import BotClientManager
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from event_log import CHANGE, ERROR, EVENT_LOG_DIR
+from event_log import emit as log_event
 from http import HTTPStatus
-from mycustomerror import MyCustomError
-from telegram import Bot
+from http_client import NOT_MODIFIED, POOL_CONNECTIONS, HTTPClient
+from metrics import REGISTRY
+from mycustomerror import APIResponseError, MyCustomError
+from profiling import PROFILE_DIR, enable_stages, stage
+from render import DEFAULT_LOCALE, VERDICTS, Renderer
+from state_store import ChangeKind, intern_status
+from tenants import Tenant, load_tenants
+from validators import Field, ResponseValidator
+
+
+def load_env():
+    """Загружает переменные из файла .env, если он есть.
+
+    python-dotenv импортируется, только когда файл найден: в каталоге
+    запуска или рядом с этим модулем.
+    """
+    for directory in (os.getcwd(), os.path.dirname(os.path.abspath(__file__))):
+        path = os.path.join(directory, '.env')
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return
 
-load_dotenv()
+
+load_env()
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+TELEGRAM_TOKEN_FORMAT = re.compile(r'^\d{3,}:[\w-]+$')
+# JSON-файл со списком арендаторов (practicum_token, chat_id). Если не
+# задан, бот обслуживает одного арендатора из переменных выше.
+TENANTS_FILE = os.getenv('TENANTS_FILE')
+# По умолчанию совпадает с engine.MAX_CONCURRENT_POLLS; сам движок
+# импортируется только в main().
+MAX_CONCURRENT = int(os.getenv('MAX_CONCURRENT_POLLS', 32))
+# Размер пула соединений: число хостов и соединений на один хост.
+HTTP_POOL_CONNECTIONS = int(
+    os.getenv('HTTP_POOL_CONNECTIONS', POOL_CONNECTIONS)
+)
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', MAX_CONCURRENT))
+# Пул соединений Telegram: по соединению на каждый поток опроса.
+TELEGRAM_POOL_SIZE = int(os.getenv('TELEGRAM_POOL_SIZE', MAX_CONCURRENT + 4))
+
+# Уровень логов бота и уровни отдельных модулей в виде
+# 'engine=DEBUG,message_queue=WARNING'.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+# Каталог журнала событий (опросы, изменения, отправки, ошибки).
+EVENT_LOG = os.getenv('EVENT_LOG_DIR', EVENT_LOG_DIR)
+# Замеры этапов цикла опроса включаются при запуске PROFILE_STAGES=1
+# или сигналом SIGUSR2; сэмплирующий профайлер - сигналом SIGUSR1, стеки
+# записываются в PROFILES.
+PROFILE_STAGES = os.getenv('PROFILE_STAGES') == '1'
+PROFILES = os.getenv('PROFILE_DIR', PROFILE_DIR)
+# База с сохраняемым между перезапусками состоянием бота.
+STATE_DB = os.getenv('STATE_DB', 'homework_bot.sqlite3')
+# Порт HTTP-эндпоинта метрик Prometheus; без него метрики не отдаются.
+METRICS_PORT = os.getenv('METRICS_PORT')
+# Порт и общий секрет сервера webhook. При включённом webhook изменения
+# приходят сразу, а опрос API остаётся редкой сверкой раз в
+# RECONCILE_INTERVAL секунд.
+WEBHOOK_PORT = os.getenv('WEBHOOK_PORT')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+RECONCILE_INTERVAL = int(os.getenv('RECONCILE_INTERVAL', 3600))
+# Общая база аренды арендаторов для нескольких процессов worker: при
+# заданной SHARD_DB каждый процесс опрашивает только своих арендаторов.
+# WORKER_ID - имя процесса, по умолчанию DYNO или хост и pid.
+SHARD_DB = os.getenv('SHARD_DB')
+WORKER_ID = os.getenv('WORKER_ID')
 
 RETRY_TIME = 600
-ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-# ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/111' # 404
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+# Начальный from_date для арендатора без сохранённого курсора.
+INITIAL_TIMESTAMP = 1646906700
+# Адреса API можно переопределить, например для нагрузочного
+# тестирования на локальных имитаторах (benchmarks/simulator.py).
+ENDPOINT = os.getenv(
+    'PRACTICUM_ENDPOINT',
+    'https://practicum.yandex.ru/api/user_api/homework_statuses/',
+)
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL')
+# Время сервера меняется в каждом ответе API, поэтому при сравнении
+# ответов без декодирования JSON оно не учитывается.
+VOLATILE_RESPONSE_FIELDS = re.compile(rb'"current_date"\s*:\s*\d+')
 
-HOMEWORK_VERDICTS = {
-    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
-    'reviewing': 'Работа взята на проверку ревьюером.',
-    'rejected': 'Работа проверена: у ревьюера есть замечания.'
-}
+# Служебные сообщения каждого цикла опроса. В очереди исходящих
+# сообщений они сливаются, если в чат уже что-то ждёт отправки.
+CHECKING_MESSAGE = 'Проверяем статус работы'
+UNCHANGED_MESSAGE = 'Статус работы прежний.'
+CHEER_MESSAGE = 'Держись боец! Тяжёло в учении - легко в бою!'
+HEARTBEAT_MESSAGES = (CHECKING_MESSAGE, UNCHANGED_MESSAGE, CHEER_MESSAGE)
+
+# Коды ответа API, означающие временный сбой на стороне сервиса.
+TRANSIENT_STATUSES = frozenset({
+    HTTPStatus.REQUEST_TIMEOUT, HTTPStatus.TOO_MANY_REQUESTS,
+})
+
+CHANGE_EVENTS = REGISTRY.counter(
+    'homework_bot_change_events_total',
+    'Обнаруженные изменения работ по виду.', ['kind'],
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    'homework_bot_outbound_queue_depth',
+    'Сообщения, ждущие отправки в Telegram.',
+)
+
+HOMEWORK_VERDICTS = VERDICTS[DEFAULT_LOCALE]
+# Тексты уведомлений по шаблонам языков с кешем готовых текстов.
+RENDERER = Renderer()
+
+# Схема работы в ответе API; проверки компилируются один раз.
+HOMEWORK_SCHEMA = (
+    Field('homework_name', str),
+    Field('status', str, choices=HOMEWORK_VERDICTS),
+    Field('id', int, required=False),
+    Field('date_updated', str, required=False),
+)
+RESPONSE_VALIDATOR = ResponseValidator(HOMEWORK_SCHEMA)
+# Сколько ошибок проверки показывать в логе и в чате.
+MAX_REPORTED_ERRORS = 3
 
 logger = logging.getLogger(__name__)
 
-# Ниже представлены переменные для сохранения состояния ошибок и не
-# отправки их в Телеграм при их повторении
-get_api_answer_message_status_code_not_200 = ''
-status_bank = get_api_answer_message_status_code_not_200
+# Общий для всех арендаторов клиент: соединения с API переиспользуются
+# между опросами, и TCP/TLS рукопожатие не повторяется каждый цикл.
+api_client = HTTPClient(
+    pool_connections=HTTP_POOL_CONNECTIONS,
+    pool_maxsize=HTTP_POOL_MAXSIZE,
+)
+# Выключатель общий для всех арендаторов: при недоступности API
+# запросы прекращаются для всех сразу, а не для каждого по отдельности.
+api_breaker = CircuitBreaker()
+REGISTRY.gauge(
+    'homework_bot_api_circuit_state',
+    'Состояние выключателя API: 0 - замкнут, 1 - разомкнут, '
+    '2 - полуоткрыт.',
+).set_function(lambda: api_breaker.state.value)
+REGISTRY.gauge(
+    'homework_bot_api_circuit_rejected',
+    'Запросы к API, не выполненные из-за разомкнутого выключателя.',
+).set_function(lambda: api_breaker.rejected)
+# Клиенты Bot создаются один раз и делят общий пул соединений.
+bot_manager = BotClientManager(
+    con_pool_size=TELEGRAM_POOL_SIZE, base_url=TELEGRAM_API_URL
+)
 
 
 def send_message(bot, message):
@@ -45,56 +172,146 @@ def send_message(bot, message):
     - экземпляр класса Bot,
     - строку с текстом сообщения.
     """
-    logger.info(f'Инициализируем объект bot - {bot}.')
-    # logger.error(f'Ошибка инициализации объекта bot - {bot}.')
+    send_chat_message(bot, TELEGRAM_CHAT_ID, message)
+
+
+@stage('send_message')
+def send_chat_message(bot, chat_id, message):
+    """Отправляет сообщение в указанный Telegram чат."""
+    logger.debug('Инициализируем объект bot - %s.', bot)
     if not bot:
         message = f'Ошибка инициализации объекта bot - {bot}.'
         logger.error(message, exc_info=True)
         raise MyCustomError(message)
     else:
         bot.send_message(
-            chat_id=TELEGRAM_CHAT_ID,
+            chat_id=chat_id,
             text=message,
         )
-        logger.info(f'В чат отправлено сообщение - "{message}".')
-        # logger.error(f'Ошибка отправки сообщения в чат - "{message}".')
+        logger.info('В чат отправлено сообщение - "%s".', message)
 
 
 def get_api_answer(current_timestamp):
     """Делает запрос к единственному эндпоинту API-сервиса.
 
-    В качестве параметра функция получает временную метку.
+    В качестве параметра функция получает временную метку. Запрос
+    выполняется с токеном PRACTICUM_TOKEN, ошибки сообщаются в чат
+    TELEGRAM_CHAT_ID.
+    """
+    # Одиночный запрос не с чем сравнивать, поэтому он безусловный.
+    tenant = Tenant(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID, conditional=None)
+    bot = bot_manager.get_bot(TELEGRAM_TOKEN)
+    return get_tenant_api_answer(tenant, current_timestamp, bot)
+
+
+@stage('get_api_answer')
+def get_tenant_api_answer(tenant, current_timestamp, bot):
+    """Делает запрос к API-сервису от имени арендатора.
+
+    Ошибка запроса отправляется ботом bot в чат арендатора, если её
+    не подавил трекер ошибок арендатора (tenant.errors), и выбрасывается
+    как APIResponseError. Пока общий выключатель api_breaker разомкнут,
+    запрос не выполняется и выбрасывается CircuitOpenError. Если у
+    арендатора есть состояние условных запросов (tenant.conditional),
+    то для ответа, не изменившегося с последнего обработанного, сразу
+    возвращается NOT_MODIFIED - без декодирования и логирования.
     """
     timestamp = current_timestamp or int(time.time())
     params = {'from_date': timestamp}
-    bot = Bot(token=TELEGRAM_TOKEN)
-    global status_bank
-    # status_bank = ''
-    response = requests.get(ENDPOINT, headers=HEADERS, params=params)
-    # response = requests.get(ENDPOINT)
+    headers = {'Authorization': f'OAuth {tenant.practicum_token}'}
+    api_breaker.check()
+    try:
+        if tenant.conditional is None:
+            response = api_client.get(
+                ENDPOINT, headers=headers, params=params
+            )
+        else:
+            response = api_client.get_conditional(
+                ENDPOINT, tenant.conditional,
+                volatile=VOLATILE_RESPONSE_FIELDS,
+                headers=headers, params=params,
+            )
+    except OSError as error:
+        # Ошибки requests наследуются от OSError.
+        api_breaker.record_failure()
+        raise_api_error(
+            tenant, bot, f'Ошибка соединения с API - {error}.',
+            transient=True,
+        )
+    except Exception:
+        # Выключатель должен узнать результат, иначе пробный запрос
+        # полуоткрытого выключателя никогда не завершится.
+        api_breaker.record_failure()
+        raise
+    if response is NOT_MODIFIED:
+        api_breaker.record_success()
+        return response
     status_code = response.status_code
-    logger.info(f'status_code - {status_code}')
+    logger.debug('status_code - %s', status_code)
+    transient = (status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+                 or status_code in TRANSIENT_STATUSES)
+    if transient:
+        api_breaker.record_failure()
+    else:
+        # Любой другой ответ, например 401, значит, что API работает.
+        api_breaker.record_success()
     if response.status_code != HTTPStatus.OK:
-        message_status_code_not_200 = (
-            f'Ошибка запроса к API. Код не равен 200. Код - {status_code}.'
+        raise_api_error(
+            tenant, bot,
+            f'Ошибка запроса к API. Код не равен 200. Код - {status_code}.',
+            transient=transient,
         )
-        if message_status_code_not_200 != status_bank:
-            logger.error(message_status_code_not_200)
-            send_message(bot, message_status_code_not_200)
-            status_bank = message_status_code_not_200
-            # sys.exit(message_status_code_not_200)
-            # time.sleep(RETRY_TIME)
-        else:
-            logger.error(message_status_code_not_200)
-            # sys.exit(message_status_code_not_200)
-            # time.sleep(RETRY_TIME)
-            # raise MyCustomError(message_status_code_not_200)
-    else:
-        # В случае успешного запроса должна вернуть ответ API,
-        # преобразовав его из формата JSON к типам данных Python.
-        response = response.json()
-        logger.info(f'response в get_api_answer *********** {response}.')
-        return response
+    # В случае успешного запроса должна вернуть ответ API,
+    # преобразовав его из формата JSON к типам данных Python.
+    response = response.json()
+    logger.debug(
+        'response в get_api_answer - %s.', response,
+        extra={'payload': True},
+    )
+    return response
+
+
+def raise_api_error(tenant, bot, message, transient):
+    """Сообщает об ошибке запроса к API и выбрасывает APIResponseError.
+
+    Ошибка отправляется ботом bot в чат арендатора, если её не подавил
+    трекер ошибок арендатора.
+    """
+    logger.error(message)
+    log_event(ERROR, tenant.key, type='HTTPStatus', message=message)
+    alert = tenant.errors.record('HTTPStatus', 'get_api_answer', message)
+    if alert:
+        send_chat_message(bot, tenant.chat_id, alert)
+    raise APIResponseError(message, transient=transient)
+
+
+def validate_response(response):
+    """Проверяет ответ API по схеме и возвращает ValidationResult.
+
+    Непригодный ответ (не словарь, нет списка homeworks) выбрасывает
+    TypeError или KeyError; ошибки отдельных работ собираются в
+    результат и логируются одной записью.
+    """
+    logger.debug(
+        'response из check_response - %s.', response,
+        extra={'payload': True},
+    )
+    try:
+        result = RESPONSE_VALIDATOR.validate(response)
+    except (KeyError, TypeError) as error:
+        logger.error(error)
+        raise
+    if result.errors:
+        logger.warning(
+            'Ошибок в ответе API - %d: %s', len(result.errors),
+            format_errors(result.errors),
+        )
+    return result
+
+
+def format_errors(errors):
+    """Текст первых MAX_REPORTED_ERRORS ошибок проверки."""
+    return ' '.join(map(str, errors[:MAX_REPORTED_ERRORS]))
 
 
 def check_response(response):
@@ -103,41 +320,11 @@ def check_response(response):
     Если ответ API соответствует ожиданиям, то функция должна вернуть
     список домашних работ (он может быть и пустым), доступный в
     ответе API по ключу 'homeworks и приведенный к типам данных Python.
+    Об ошибках в чат сообщает цикл опроса, перехвативший исключение.
+    Работы с некорректными полями возвращаются: ошибку по такой работе
+    выбросит parse_status.
     """
-    bot = Bot(token=TELEGRAM_TOKEN)
-    if not isinstance(response, dict):
-        message = f'Ответ АПИ (response) не словарь, а {type(response)}.'
-        logger.error(message)
-        raise TypeError(message)
-    else:
-        logger.info(f'response из check_response - {response}.')
-        if 'homeworks' and 'current_date' not in response:
-            message = ('В ответе АПИ отсутствует список работ и текущая дата'
-                       + ' (ключи homeworks и current_date).')
-            logger.error(message)
-            send_message(bot, message)
-            raise KeyError(message)
-        else:
-            homeworks = response['homeworks']
-            if not isinstance(homeworks, list):
-                message = 'Список работ (homeworkS) не list.'
-                logger.error(message)
-                send_message(bot, message)
-                raise TypeError(message)
-            else:
-                if homeworks is None:
-                    message = 'Список работ (homeworkS) пуст.'
-                    logger.error(message)
-                    send_message(bot, message)
-                    raise ValueError(message)
-                else:
-                    homework = homeworks[0]
-                    if not isinstance(homework, dict):
-                        message = 'Содержимое работы (homeworK) не dict.'
-                        logger.error(message)
-                        raise TypeError(message)
-                    else:
-                        return homework
+    return validate_response(response).items
 
 
 def parse_status(homework):
@@ -148,48 +335,35 @@ def parse_status(homework):
     работы. В качестве параметра функция получает только один элемент
     из списка домашних работ.
     """
-    logger.info(f'homework из parse_status - {homework}.')
-    logger.info(f'тип homework из parse_status - {type(homework)}.')
-    if 'homework_name' not in homework:
-        message = (
-            'В содержимом работы (homework) нет имени и '
-            + 'статуса работы (ключь homework_name).'
-        )
-        logger.error(message)
-        raise KeyError(message)
-    elif 'status' not in homework:
-        message = (
-            'В содержимом работы (homework) нет имени и '
-            + 'статуса работы (ключь status).'
-        )
-        logger.error(message)
-        raise KeyError(message)
-    else:
-        if not isinstance(
-            ((homework['homework_name']) and (homework['status'])),
-            str
-        ):
-            message = 'homework_name и status не str.'
-            logger.error(message)
-            raise TypeError(message)
-        else:
-            homework_name = homework['homework_name']
-            homework_status = homework['status']
-            if homework_status not in HOMEWORK_VERDICTS:
-                message = (
-                    'В содержимом работы (homework) её статус '
-                    + f'(homework_status) "{homework_status}" не '
-                    + 'соответствует ожидаемым.'
-                )
-                logger.error(message)
-                raise KeyError(message)
-            else:
-                verdict = HOMEWORK_VERDICTS[homework_status]
-                # В случае успеха, функция возвращает подготовленную
-                # для отправки в Telegram строку, содержащую один из
-                # вердиктов словаря HOMEWORK_VERDICTS.
-                return ('Изменился статус проверки работы '
-                        + f'"{homework_name}". {verdict}')
+    check_homework(homework)
+    # В случае успеха, функция возвращает подготовленную для отправки
+    # в Telegram строку, содержащую один из вердиктов словаря
+    # HOMEWORK_VERDICTS.
+    return RENDERER.render(homework['homework_name'], homework['status'])
+
+
+def check_homework(homework):
+    """Проверяет работу по схеме и выбрасывает KeyError или TypeError."""
+    logger.debug(
+        'homework из parse_status - %s.', homework,
+        extra={'payload': True},
+    )
+    errors = RESPONSE_VALIDATOR.validate_item(homework)
+    if errors:
+        logger.error(errors[0])
+        raise errors[0].exception()
+
+
+@stage('parse_status')
+def render_statuses(homeworks, locale=DEFAULT_LOCALE):
+    """Тексты уведомлений для списка работ на языке locale.
+
+    Все работы проверяются до рендеринга, тексты готовятся одним
+    вызовом Renderer.render_many.
+    """
+    for homework in homeworks:
+        check_homework(homework)
+    return RENDERER.render_many(homeworks, locale)
 
 
 def check_tokens():
@@ -205,104 +379,416 @@ def check_tokens():
     return all([PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID])
 
 
+@stage('notify')
+def notify_changes(tenant, bot, events, outbox=None):
+    """Отправляет в чат арендатора сообщения об изменениях работ.
+
+    Если задан outbox (см. outbox.Outbox), уведомления записываются в
+    него, а отправляет их диспетчер outbox. Заодно запоминает последний
+    статус работы арендатора и число опросов подряд без изменений: по
+    ним планируется следующий опрос.
+    """
+    changed = []
+    for event in events:
+        CHANGE_EVENTS.labels(event.kind.value).inc()
+        log_event(
+            CHANGE, tenant.key, chat=tenant.chat_id,
+            homework=event.homework_id, change=event.kind.value,
+            status=event.homework and event.homework.get('status'),
+        )
+        if event.kind is ChangeKind.REMOVED:
+            logger.info(
+                'Работа %s арендатора %s пропала из ответа API.',
+                event.homework_id, tenant.key,
+            )
+            continue
+        changed.append(event)
+    # Если есть обновления — получить статусы работ из обновлений и
+    # отправить сообщения в Telegram.
+    messages = render_statuses(
+        [event.homework for event in changed], tenant.locale
+    )
+    if outbox is None:
+        for message in messages:
+            send_chat_message(bot, tenant.chat_id, message)
+    elif messages:
+        # Уведомления записываются до сдвига курсора: изменение,
+        # найденное повторно после падения, не будет отправлено дважды.
+        outbox.add(tenant, [event.homework for event in changed], messages)
+    if changed:
+        # Работы в ответе API идут от последней изменённой к ранним.
+        tenant.last_status = intern_status(
+            changed[0].homework.get('status')
+        )
+        tenant.idle_polls = 0
+    else:
+        tenant.idle_polls += 1
+        logger.debug(UNCHANGED_MESSAGE)
+        send_chat_message(bot, tenant.chat_id, UNCHANGED_MESSAGE)
+
+
+def report_error(tenant, bot, error_type, message):
+    """Логирует ошибку цикла опроса и сообщает о ней в чат арендатора.
+
+    Повторы той же ошибки не отправляются, а попадают в периодическую
+    сводку трекера ошибок арендатора.
+    """
+    logger.exception(message, exc_info=True)
+    log_event(ERROR, tenant.key, type=error_type, message=message)
+    alert = tenant.errors.record(error_type, 'poll_tenant', message)
+    if alert:
+        send_chat_message(bot, tenant.chat_id, alert)
+
+
+@stage('check_response')
+def valid_homeworks(tenant, bot, response):
+    """Возвращает корректные работы из ответа API.
+
+    Некорректные работы пропускаются, а об ошибках сообщается в чат
+    арендатора; повторы того же сообщения подавляет трекер ошибок.
+    """
+    result = validate_response(response)
+    if result.errors:
+        message = ('Некорректные данные в ответе API: '
+                   + format_errors(result.errors))
+        log_event(ERROR, tenant.key, type='ValidationError',
+                  message=message)
+        alert = tenant.errors.record(
+            'ValidationError', 'check_response', message
+        )
+        if alert:
+            send_chat_message(bot, tenant.chat_id, alert)
+    return result.valid
+
+
+def poll_tenant(tenant, bot, cursors, outbox=None):
+    """Один цикл опроса API и уведомления арендатора.
+
+    Запрашивает изменения статусов работ с курсора арендатора, при
+    изменении отправляет в чат арендатора новый статус. bot - клиент
+    Bot или очередь исходящих сообщений с тем же интерфейсом. После
+    успешной обработки ответа курсор сдвигается на current_date и
+    сохраняется в cursors. outbox - журнал уведомлений, см.
+    notify_changes. Ошибки сообщаются в тот же чат (без
+    повторов, см. report_error) и выбрасываются дальше. Временные сбои
+    API только логируются: цикл опроса повторится по расписанию, а пока
+    выключатель api_breaker разомкнут, цикл пропускается целиком.
+    """
+    if not api_breaker.available():
+        logger.debug('API недоступен, опрос арендатора %s пропущен.',
+                     tenant.key)
+        return
+    try:
+        send_chat_message(bot, tenant.chat_id, CHECKING_MESSAGE)
+        for rollup in tenant.errors.rollups():
+            send_chat_message(bot, tenant.chat_id, rollup)
+        poll_changes(tenant, bot, cursors, outbox)
+    except CircuitOpenError as error:
+        logger.debug('Опрос арендатора %s пропущен: %s', tenant.key,
+                     error)
+    except APIResponseError as error:
+        # Об ошибке уже сообщено в get_tenant_api_answer.
+        if not error.transient:
+            raise
+        logger.warning('Опрос арендатора %s не удался: %s', tenant.key,
+                       error.message)
+    except ConnectionError as conerror:
+        message = ('ConnectionError при опросе арендатора: '
+                   + f'{conerror}')
+        report_error(tenant, bot, 'ConnectionError', message)
+        raise ConnectionError(message)
+    except TypeError as typerror:
+        message = (
+            'TypeError при опросе арендатора: '
+            + f'{typerror}'
+        )
+        report_error(tenant, bot, 'TypeError', message)
+        raise TypeError(message)
+    except Exception as error:
+        message = (
+            'Exception при опросе арендатора: '
+            + f'{error}.'
+        )
+        report_error(tenant, bot, type(error).__name__, message)
+        raise MyCustomError(message)
+    finally:
+        send_chat_message(bot, tenant.chat_id, CHEER_MESSAGE)
+
+
+def poll_changes(tenant, bot, cursors, outbox=None):
+    """Запрашивает изменения работ арендатора и сообщает о них."""
+    logger.debug(
+        'Известно работ арендатора %s - %d.',
+        tenant.key, len(tenant.homeworks),
+    )
+    # Без сохранённого курсора API возвращает всю историю работ:
+    # по ней определяются и удалённые работы.
+    initial = tenant.from_date == INITIAL_TIMESTAMP
+    # Сделать запрос к API.
+    response = get_tenant_api_answer(tenant, tenant.from_date, bot)
+    if response is NOT_MODIFIED:
+        # Ответ не изменился: проверять и разбирать нечего.
+        notify_changes(tenant, bot, (), outbox)
+        return
+    homeworks = valid_homeworks(tenant, bot, response)
+    # Изменения той же работы могут одновременно прийти по webhook.
+    with tenant.lock:
+        events = tenant.homeworks.diff(homeworks, complete=initial)
+        if initial:
+            # При первом опросе, как и раньше, сообщаем только о
+            # последней работе, а не обо всей истории.
+            events = events[:1]
+        notify_changes(tenant, bot, events, outbox)
+    current_date = response.get('current_date')
+    if isinstance(current_date, int):
+        tenant.from_date = current_date
+        cursors.set(tenant.key, current_date)
+    if tenant.conditional is not None:
+        tenant.conditional.commit()
+
+
+def ingest_update(tenant, bot, update, outbox=None):
+    """Обрабатывает изменения работ, присланные по webhook.
+
+    update имеет формат ответа API и проходит те же проверки и то же
+    сравнение с известными статусами, что и ответ на опрос, поэтому
+    об изменении, пришедшем и по webhook, и при опросе, сообщается
+    один раз. Курсор опроса не сдвигается: пропущенное webhook'ом
+    найдёт следующая сверка.
+    """
+    result = validate_response(update)
+    # Обновление с некорректными работами отклоняется целиком, чтобы
+    # отправитель узнал об ошибке и повторил его.
+    for error in result.errors:
+        if error.index is not None:
+            raise error.exception()
+    homeworks = result.homeworks
+    with tenant.lock:
+        # Запоздавшее или повторно присланное уведомление со старым
+        # временем изменения не откатывает статус работы.
+        events = tenant.homeworks.diff(homeworks, newer_only=True)
+        if events:
+            notify_changes(tenant, bot, events, outbox)
+
+
+def resume_tenants(tenants, cursors, snapshots):
+    """Восстанавливает курсоры и состояние арендаторов из базы.
+
+    После перезапуска (или передачи арендатора от другого процесса)
+    опрос продолжается с сохранённого курсора, а известные статусы
+    работ берутся из снимка, а не запрашиваются заново. Возвращает
+    число арендаторов, восстановленных из снимка.
+    """
+    warm = 0
+    for tenant in tenants:
+        tenant.from_date = cursors.get(tenant.key, INITIAL_TIMESTAMP)
+        warm += snapshots.load(tenant)
+    return warm
+
+
 def main():
-    """Основная логика работы бота."""
+    """Основная логика работы бота.
+
+    Все арендаторы опрашиваются в одном процессе движком PollingEngine.
+    """
+    import asyncio
+    import signal
+
+    from cursor_store import CursorStore
+    from engine import PollingEngine
+    from message_queue import OutboundQueue
+    from metrics import start_http_server
+    from outbox import Outbox, OutboxDispatcher
+    from scheduler import PollScheduler
+    from snapshot import SnapshotStore
+    from profiling import SamplingProfiler, toggle_stages
+    from supervisor import Supervisor
+    from webhook import start_webhook_server
+
     # Токены проверяются в специальной функции - check_tokens() - к
     # моменту вызова send_message() она уже должна быть объявлена
-    # (иначе мы просто завершаем программу). Даже если в ней ничего не
-    # будет(None), то try-except это определить не поможет, такие
-    # проверки обычно делаются через if-else.
-    if not check_tokens():
+    # (иначе мы просто завершаем программу). При заданном TENANTS_FILE
+    # токен Практикума и чат берутся из файла арендаторов.
+    if not (check_tokens() or (TENANTS_FILE and TELEGRAM_TOKEN)):
         message = ('check_tokens() вернула не True, а вернула'
                    + f' {check_tokens()}.')
         logger.critical(message, exc_info=True)
         sys.exit(message)
+    tenants = load_tenants(TENANTS_FILE, PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)
+    cursors = CursorStore(STATE_DB)
+    snapshots = SnapshotStore(STATE_DB)
+    outbox = Outbox(STATE_DB)
+    outbox.purge()
+    warm = resume_tenants(tenants, cursors, snapshots)
+    logger.info('Состояние восстановлено из снимка для %d из %d '
+                'арендаторов.', warm, len(tenants))
+    bot = bot_manager.get_bot(TELEGRAM_TOKEN)
+    # Потоки опроса только ставят сообщения в очередь, а отправляет
+    # их с учётом ограничений Telegram фоновая служба движка.
+    outbound = OutboundQueue(
+        lambda chat_id, text: bot.send_message(chat_id=chat_id, text=text),
+        heartbeats=HEARTBEAT_MESSAGES,
+        tenants={tenant.chat_id: tenant.key for tenant in tenants},
+    )
+    if WEBHOOK_PORT:
+        scheduler = PollScheduler(
+            default_interval=RECONCILE_INTERVAL, status_intervals={},
+            max_interval=RECONCILE_INTERVAL, spread_start=len(tenants) > 1,
+        )
     else:
-        current_homework = {}
-        # current_response = {}
-        while True:
-            try:
-                bot = Bot(token=TELEGRAM_TOKEN)
-                # Переменная для хранения последней работы
-                # Используется для проверки изменений
-                message = 'Проверяем статус работы'
-                send_message(bot, message)
-                logger.info(
-                    f'current_homework из main - {current_homework}.'
-                )
-                # logger.info(f'current_homeworks из main - {current_homeworks}.')
-                current_timestamp = 1646906700
-                # Сделать запрос к API.
-                response = get_api_answer(current_timestamp)
-                homework = check_response(response)
-                if homework != current_homework:
-                    # Если есть обновления — получить статус работы из
-                    # обновления и отправить сообщение в Telegram.
-                    message = parse_status(homework)
-                    send_message(bot, message)
-                    current_homework = homework
-                    logger.info(
-                        f'current_homework из main - {current_homework}.'
-                    )
-                    time.sleep(RETRY_TIME)
-                else:
-                    message = 'Статус работы прежний.'
-                    logger.debug(message)
-                    send_message(bot, message)
-                    # Подождать некоторое время и сделать новый запрос.
-                    time.sleep(RETRY_TIME)
-            except ConnectionError as conerror:
-                message = ('ConnectionError при запуске функции main: '
-                           + f'{conerror}')
-                logger.error(message)
-                send_message(bot, message)
-                logger.exception(message, exc_info=True)
-                raise ConnectionError(message)
-            except TypeError as typerror:
-                message = (
-                    'TypeError при запуске функции main: '
-                    + f'{typerror}'
-                )
-                logger.error(message)
-                send_message(bot, message)
-                logger.exception(message, exc_info=True)
-                raise TypeError(message)
-            except Exception as error:
-                message = (
-                    'Exception при запуске функции '
-                    + f'main: {error}.'
-                )
-                logger.error(message)
-                send_message(bot, message)
-                logger.exception(message, exc_info=True)
-                raise MyCustomError(message)
-            else:
-                time.sleep(RETRY_TIME)
-            finally:
-                message = 'Держись боец! Тяжёло в учении - легко в бою!'
-                send_message(bot, message)
-                time.sleep(RETRY_TIME)
+        # При многих арендаторах первые опросы разносятся по интервалу.
+        scheduler = PollScheduler(
+            default_interval=RETRY_TIME, spread_start=len(tenants) > 1
+        )
+    poll = functools.partial(
+        poll_tenant, bot=outbound, cursors=cursors, outbox=outbox
+    )
+    background = [outbound.run]
+    shards = None
+    if SHARD_DB:
+        from sharding import LeaseStore, ShardCoordinator, default_worker_id
 
+        # Арендатор, перешедший к другому процессу, сохраняется снимком,
+        # а получивший его процесс продолжает с курсора и снимка.
+        shards = ShardCoordinator(
+            LeaseStore(SHARD_DB, WORKER_ID or default_worker_id()),
+            tenants,
+            on_acquire=functools.partial(
+                resume_tenants, cursors=cursors, snapshots=snapshots
+            ),
+            on_release=snapshots.save,
+        )
+        shards.rebalance()
+        poll = shards.owned_only(poll)
+        background.append(shards.run)
+    # Уведомления об изменениях работ отправляются из outbox: записанное,
+    # но не отправленное до остановки уведомление отправится после
+    # перезапуска.
+    dispatcher = OutboxDispatcher(
+        outbox, outbound,
+        tenant_keys=None if shards is None else shards.owned_keys,
+    )
+    background.append(dispatcher.run)
+    supervisor = Supervisor()
+    engine = PollingEngine(
+        tenants,
+        poll=poll,
+        scheduler=scheduler,
+        max_concurrency=MAX_CONCURRENT,
+        background=background,
+        # При остановке оставшиеся сообщения отправляются до выхода, а
+        # результаты отправки записываются в outbox.
+        shutdown=[dispatcher.dispatch, outbound.flush, dispatcher.commit],
+        # Ошибка опроса не завершает процесс: опрос арендатора
+        # повторяется с нарастающей паузой, а часто падающий арендатор
+        # уходит в карантин. Кеши и соединения процесса сохраняются.
+        supervisor=supervisor,
+    )
+    metrics_server = None
+    if METRICS_PORT:
+        QUEUE_DEPTH.set_function(outbound.__len__)
+        metrics_server = start_http_server(int(METRICS_PORT))
+    webhook_server = None
+    if WEBHOOK_PORT:
+        webhook_server = start_webhook_server(
+            int(WEBHOOK_PORT), tenants,
+            functools.partial(ingest_update, bot=outbound, outbox=outbox),
+            WEBHOOK_SECRET,
+        )
 
-if __name__ == '__main__':
-    logger.setLevel(logging.DEBUG)
+    async def run():
+        # SIGTERM (перезапуск dyno) и Ctrl+C останавливают движок мягко:
+        # начатые опросы и отправки завершаются.
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, engine.stop)
+        # Профилирование работающего бота без перезапуска:
+        # kill -USR1 <pid> запускает и останавливает профайлер,
+        # kill -USR2 <pid> включает и выключает замеры этапов.
+        if hasattr(signal, 'SIGUSR1'):
+            loop.add_signal_handler(signal.SIGUSR1, profiler.toggle)
+            loop.add_signal_handler(signal.SIGUSR2, toggle_stages)
+        await engine.run()
 
-    formatter = logging.Formatter(
-        '%(asctime)s - %(levelname)s - %(message)s -'
-        + ' %(funcName)s - %(lineno)d'
-    )
+    enable_stages(PROFILE_STAGES)
+    profiler = SamplingProfiler(PROFILES)
+
+    try:
+        asyncio.run(run())
+    finally:
+        if webhook_server is not None:
+            webhook_server.shutdown()
+        if shards is None:
+            snapshots.save(tenants)
+        else:
+            snapshots.save(
+                [tenant for tenant in tenants if shards.owns(tenant)]
+            )
+            shards.close()
+        snapshots.close()
+        logger.info('Неотправленных уведомлений в outbox - %d.',
+                    len(outbox))
+        outbox.close()
+        logger.info('Статистика соединений API - %s.', api_client.stats())
+        logger.info('Статистика очереди сообщений - %s.', outbound.stats)
+        logger.info('Статистика перезапусков опроса - %s.',
+                    supervisor.stats())
+        api_client.close()
+        bot_manager.close()
+        cursors.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        profiler.stop()
+
+
+def config_problems():
+    """Возвращает список ошибок настроек бота.
+
+    Проверяются только переменные окружения и файл арендаторов, без
+    обращения к API и Telegram.
+    """
+    problems = []
+    if not (check_tokens() or (TENANTS_FILE and TELEGRAM_TOKEN)):
+        missing = [
+            name for name in ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN',
+                              'TELEGRAM_CHAT_ID')
+            if not globals()[name]
+        ]
+        problems.append(
+            'Не заданы переменные окружения: ' + ', '.join(missing) + '.'
+        )
+    if TELEGRAM_TOKEN and not TELEGRAM_TOKEN_FORMAT.match(TELEGRAM_TOKEN):
+        problems.append('TELEGRAM_TOKEN не похож на токен бота.')
+    if TENANTS_FILE:
+        try:
+            tenants = load_tenants(TENANTS_FILE)
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            problems.append(f'Файл арендаторов {TENANTS_FILE} не '
+                            f'прочитан: {error!r}.')
+        else:
+            if not tenants:
+                problems.append(f'В файле {TENANTS_FILE} нет арендаторов.')
+    if WEBHOOK_PORT and not WEBHOOK_SECRET:
+        problems.append('Для WEBHOOK_PORT нужен WEBHOOK_SECRET.')
+    return problems
 
-    # Хэндлер для управления лог-файлами
-    handler = RotatingFileHandler(
-        'homework.log',
-        maxBytes=50000000,
-        backupCount=2,
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
 
-    stream_handler = logging.StreamHandler(sys.stdout)
-    stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
+def preflight():
+    """Проверяет настройки и возвращает код завершения процесса."""
+    problems = config_problems()
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if not problems:
+        print('Настройки в порядке.')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    if '--check' in sys.argv[1:]:
+        sys.exit(preflight())
+    from log_config import configure_logging, parse_levels
 
+    # Логи форматируются и пишутся в stdout и журнал событий в фоновом
+    # потоке, чтобы не тормозить циклы опроса.
+    configure_logging(LOG_LEVEL, parse_levels(LOG_LEVELS), EVENT_LOG)
     main()
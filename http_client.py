@@ -0,0 +1,202 @@
+"""HTTP-клиент с пулом соединений для запросов к API Практикума."""
+import hashlib
+import logging
+import threading
+import time
+from http import HTTPStatus
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 32
+TIMEOUT = (5, 30)
+
+# Результат условного запроса, когда ответ не изменился.
+NOT_MODIFIED = object()
+
+REQUEST_DURATION = REGISTRY.histogram(
+    'homework_bot_api_request_duration_seconds',
+    'Длительность запросов к API по коду ответа.', ['code'],
+)
+SHORT_CIRCUITS = REGISTRY.counter(
+    'homework_bot_api_short_circuits_total',
+    'Ответы API, обработка которых была пропущена.', ['reason'],
+)
+
+
+class ConditionalState:
+    """Валидаторы последнего обработанного ответа для условных запросов.
+
+    Новые значения сначала попадают в pending и становятся текущими
+    только после commit(), то есть когда ответ успешно обработан. Иначе
+    сбой обработки привёл бы к тому, что изменившийся ответ больше не
+    считался бы новым.
+    """
+
+    __slots__ = ('etag', 'last_modified', 'body_hash', 'pending')
+
+    def __init__(self):
+        """Инициализация пустого состояния."""
+        self.etag = None
+        self.last_modified = None
+        self.body_hash = None
+        self.pending = None
+
+    def commit(self):
+        """Делает валидаторы обработанного ответа текущими."""
+        if self.pending is not None:
+            self.etag, self.last_modified, self.body_hash = self.pending
+            self.pending = None
+
+
+class HTTPClient:
+    """Долгоживущая сессия requests с пулом keep-alive соединений.
+
+    pool_connections - сколько хостов держать в пуле одновременно,
+    pool_maxsize - сколько соединений держать к одному хосту. При
+    pool_block=True запросы сверх pool_maxsize ждут свободного
+    соединения, так что к одному хосту никогда не открывается больше
+    pool_maxsize соединений. Сессия и пул создаются при первом запросе:
+    импорт requests стоит заметного времени запуска.
+    """
+
+    def __init__(self, pool_connections=POOL_CONNECTIONS,
+                 pool_maxsize=POOL_MAXSIZE, pool_block=True,
+                 timeout=TIMEOUT):
+        """Инициализация клиента."""
+        self.timeout = timeout
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self._session = None
+        self._adapter = None
+        # Счётчики пулов, вытесненных из менеджера, чтобы статистика
+        # не терялась при смене хостов.
+        self._lock = threading.Lock()
+        self._evicted = {'connections': 0, 'requests': 0}
+        self._short_circuits = {'not_modified': 0, 'unchanged': 0}
+
+    @property
+    def session(self):
+        """Сессия requests; создаётся при первом обращении."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        """Создаёт сессию с общим пулом соединений."""
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        self._adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+        )
+        session.mount('https://', self._adapter)
+        session.mount('http://', self._adapter)
+        pools = self._adapter.poolmanager.pools
+        dispose = pools.dispose_func
+
+        def dispose_pool(pool):
+            with self._lock:
+                self._evicted['connections'] += pool.num_connections
+                self._evicted['requests'] += pool.num_requests
+            if dispose is not None:
+                dispose(pool)
+
+        pools.dispose_func = dispose_pool
+        return session
+
+    def get(self, url, **kwargs):
+        """Выполняет GET-запрос через общий пул соединений."""
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.perf_counter()
+        code = 'error'
+        try:
+            response = self.session.get(url, **kwargs)
+            code = response.status_code
+            return response
+        finally:
+            REQUEST_DURATION.labels(code).observe(
+                time.perf_counter() - started
+            )
+
+    def get_conditional(self, url, state, volatile=None, **kwargs):
+        """Выполняет условный GET-запрос.
+
+        Отправляет If-None-Match/If-Modified-Since из state и возвращает
+        NOT_MODIFIED, если сервер ответил 304 или тело ответа совпало с
+        последним обработанным. Тело сравнивается по хешу сырых байтов
+        до любого декодирования; volatile - регулярное выражение для
+        байтов, которые меняются в каждом ответе и не должны учитываться
+        (например, текущее время сервера). Ответ с другим кодом
+        возвращается как есть.
+        """
+        headers = dict(kwargs.pop('headers', None) or {})
+        if state.etag:
+            headers['If-None-Match'] = state.etag
+        if state.last_modified:
+            headers['If-Modified-Since'] = state.last_modified
+        response = self.get(url, headers=headers, **kwargs)
+        if response.status_code == HTTPStatus.NOT_MODIFIED:
+            self._count_short_circuit('not_modified')
+            return NOT_MODIFIED
+        if response.status_code != HTTPStatus.OK:
+            return response
+        body = response.content
+        if volatile is not None:
+            body = volatile.sub(b'', body)
+        body_hash = hashlib.blake2b(body, digest_size=16).digest()
+        if body_hash == state.body_hash:
+            self._count_short_circuit('unchanged')
+            return NOT_MODIFIED
+        state.pending = (
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            body_hash,
+        )
+        return response
+
+    def _count_short_circuit(self, reason):
+        """Учитывает запрос, обработка которого была пропущена."""
+        with self._lock:
+            self._short_circuits[reason] += 1
+        SHORT_CIRCUITS.labels(reason).inc()
+
+    def stats(self):
+        """Возвращает счётчики соединений и их повторного использования.
+
+        connections - сколько TCP/TLS соединений было открыто,
+        requests - сколько запросов через них выполнено,
+        reused - сколько запросов обошлись без нового соединения,
+        not_modified и unchanged - сколько условных запросов завершились
+        без обработки ответа по 304 и по совпадению хеша тела.
+        """
+        with self._lock:
+            connections = self._evicted['connections']
+            requests_count = self._evicted['requests']
+            short_circuits = dict(self._short_circuits)
+        if self._adapter is not None:
+            pools = self._adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+                    requests_count += pool.num_requests
+        return {
+            'connections': connections,
+            'requests': requests_count,
+            'reused': max(requests_count - connections, 0),
+            **short_circuits,
+        }
+
+    def close(self):
+        """Закрывает все соединения пула."""
+        if self._session is not None:
+            self._session.close()
@@ -0,0 +1,136 @@
+"""Настройка логирования бота: запись в фоновом потоке."""
+import atexit
+import itertools
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+from event_log import EVENT_LOG_DIR, LOGGER_NAME, EventLog, EventLogHandler
+
+LOG_FORMAT = (
+    '%(asctime)s - %(levelname)s - %(message)s -'
+    + ' %(funcName)s - %(lineno)d'
+)
+# Сообщение длиннее обрезается при форматировании.
+MAX_MESSAGE_LENGTH = 2000
+# Из записей с полными ответами API (extra={'payload': True}) в лог
+# попадает каждая PAYLOAD_SAMPLE_RATE-я.
+PAYLOAD_SAMPLE_RATE = 10
+# Логгеры модулей бота: им назначается уровень LOG_LEVEL, остальным
+# (telegram, urllib3) - WARNING. Логгер журнала событий настраивается
+# отдельно.
+BOT_LOGGERS = (
+    'homework', '__main__', 'engine', 'bot_client', 'cursor_store',
+    'http_client', 'message_queue', 'metrics', 'webhook', 'snapshot',
+    'circuit_breaker', 'supervisor', 'sharding',
+    'outbox', 'profiling', 'error_tracker', 'scheduler', 'state_store',
+    'validators', 'render', 'tenants',
+)
+
+
+class LazyQueueHandler(QueueHandler):
+    """QueueHandler, не форматирующий запись в вызывающем потоке.
+
+    Стандартный QueueHandler.prepare() подставляет аргументы в сообщение
+    ещё до постановки в очередь; здесь запись уходит в очередь как есть,
+    а форматирование выполняют хэндлеры в потоке QueueListener.
+    """
+
+    def prepare(self, record):
+        """Возвращает запись без форматирования."""
+        return record
+
+
+class TruncatingFormatter(logging.Formatter):
+    """Форматтер, обрезающий слишком длинные сообщения."""
+
+    def __init__(self, fmt=LOG_FORMAT, max_length=MAX_MESSAGE_LENGTH):
+        """Инициализация форматтера."""
+        super().__init__(fmt)
+        self.max_length = max_length
+
+    def formatMessage(self, record):
+        """Обрезает сообщение записи перед подстановкой в формат."""
+        message = record.message
+        if len(message) > self.max_length:
+            record.message = (
+                f'{message[:self.max_length]}... '
+                f'[обрезано {len(message) - self.max_length} символов]'
+            )
+        return super().formatMessage(record)
+
+
+class PayloadSampler(logging.Filter):
+    """Пропускает только каждую n-ю запись с полным ответом API."""
+
+    def __init__(self, rate=PAYLOAD_SAMPLE_RATE):
+        """Инициализация фильтра."""
+        super().__init__()
+        self._counter = itertools.count()
+        self.rate = rate
+
+    def filter(self, record):
+        """Решает, попадёт ли запись в лог."""
+        if not getattr(record, 'payload', False):
+            return True
+        return next(self._counter) % self.rate == 0
+
+
+def parse_levels(spec):
+    """Разбирает строку вида 'engine=DEBUG,homework=INFO' в словарь."""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = item.partition('=')
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+class NoEvents(logging.Filter):
+    """Не пропускает записи логгера событий."""
+
+    def filter(self, record):
+        """Решает, попадёт ли запись в вывод."""
+        return record.name != LOGGER_NAME
+
+
+def configure_logging(level='DEBUG', module_levels=None,
+                      events_dir=EVENT_LOG_DIR,
+                      sample_rate=PAYLOAD_SAMPLE_RATE):
+    """Настраивает неблокирующее логирование и возвращает QueueListener.
+
+    Логгеры только кладут записи в очередь; вывод в stdout и запись
+    в журнал событий (см. event_log) выполняются в отдельном потоке. В
+    журнал попадают события и записи уровня WARNING и выше. Уровень
+    логгеров бота задаёт level, отдельных модулей - module_levels.
+    """
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(TruncatingFormatter())
+    stream_handler.addFilter(NoEvents())
+    event_handler = EventLogHandler(EventLog(events_dir))
+
+    records = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(records)
+    queue_handler.addFilter(PayloadSampler(sample_rate))
+    listener = QueueListener(
+        records, event_handler, stream_handler, respect_handler_level=True
+    )
+
+    root = logging.getLogger()
+    root.setLevel(logging.WARNING)
+    root.addHandler(queue_handler)
+    events = logging.getLogger(LOGGER_NAME)
+    events.setLevel(logging.INFO)
+    events.propagate = False
+    events.addHandler(queue_handler)
+    for name in BOT_LOGGERS:
+        logging.getLogger(name).setLevel(level)
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    listener.start()
+    # atexit вызывает функции в обратном порядке: сначала listener
+    # дописывает оставшиеся записи, затем журнал закрывается.
+    atexit.register(event_handler.close)
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,273 @@
+"""Очередь исходящих сообщений Telegram с ограничением частоты."""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+from event_log import SEND, emit
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Ограничения Bot API: около 30 сообщений в секунду на бота и не чаще
+# одного сообщения в секунду в один чат.
+GLOBAL_RATE = 30
+CHAT_RATE = 1
+SEND_WORKERS = 8
+# Сколько секунд при остановке ждать отправки оставшихся сообщений.
+FLUSH_TIMEOUT = 20
+# Служебные сообщения отправляются в чат не чаще раза в
+# HEARTBEAT_INTERVAL секунд.
+HEARTBEAT_INTERVAL = 3600
+
+SEND_DURATION = REGISTRY.histogram(
+    'homework_bot_telegram_send_duration_seconds',
+    'Длительность отправки сообщений в Telegram по результату.',
+    ['result'],
+)
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity."""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        """Инициализация полного ведра."""
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def take(self):
+        """Забирает токен.
+
+        Возвращает 0, если токен был, иначе - сколько секунд ждать до
+        появления токена (токен при этом не забирается).
+        """
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        """Ждёт и забирает токен."""
+        delay = self.take()
+        while delay:
+            await asyncio.sleep(delay)
+            delay = self.take()
+
+
+class OutboundQueue:
+    """Асинхронная очередь исходящих сообщений.
+
+    Метод send_message повторяет интерфейс Bot и может вызываться из
+    потоков опроса: он только ставит сообщение в очередь и сразу
+    возвращается. Отправкой занимаются воркеры run() в цикле asyncio с
+    общим и початовым ограничением частоты. Сообщение, совпадающее с
+    уже ждущим отправки в тот же чат, отбрасывается; служебное
+    сообщение (heartbeats) отбрасывается, если в чат уже что-то ждёт
+    отправки или служебное сообщение уже ставилось в очередь этого
+    чата в последние heartbeat_interval секунд. На RetryAfter от
+    Telegram отправка приостанавливается на указанное время, а
+    сообщение возвращается в начало очереди чата.
+    Функции on_done, переданные в send_message, вызываются в цикле
+    asyncio с результатом отправки (True или False), в том числе для
+    сообщений, слитых с ждущим отправки. Отправки записываются в журнал
+    событий с ключом арендатора чата: из словаря tenants (чат - ключ
+    арендатора) или переданным в send_message.
+    """
+
+    def __init__(self, send, heartbeats=(), global_rate=GLOBAL_RATE,
+                 chat_rate=CHAT_RATE, workers=SEND_WORKERS, tenants=None,
+                 heartbeat_interval=HEARTBEAT_INTERVAL,
+                 clock=time.monotonic):
+        """Инициализация очереди.
+
+        send - блокирующая функция send(chat_id, text), выполняющая
+        отправку; она вызывается в пуле потоков.
+        """
+        self.send = send
+        self.heartbeats = frozenset(heartbeats)
+        self.heartbeat_interval = heartbeat_interval
+        self.clock = clock
+        self.chat_rate = chat_rate
+        self.workers = workers
+        self._global_bucket = TokenBucket(global_rate)
+        self._chat_buckets = {}
+        self._pending = {}
+        self._callbacks = {}
+        self._heartbeats_at = {}
+        # Ключи арендаторов по чатам; чат - строкой, как в outbox.
+        self._tenants = {
+            str(chat_id): key for chat_id, key in (tenants or {}).items()
+        }
+        self._ready = deque()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._wakeup = None
+        self._paused_until = 0
+        self.stats = {'queued': 0, 'coalesced': 0, 'sent': 0,
+                      'failed': 0, 'retry_after': 0}
+
+    def __len__(self):
+        """Количество сообщений, ждущих отправки."""
+        with self._lock:
+            return sum(len(messages) for messages in self._pending.values())
+
+    def __bool__(self):
+        """Очередь - рабочий отправитель, даже когда она пуста."""
+        return True
+
+    def send_message(self, chat_id=None, text=None, on_done=None,
+                     tenant=None, **kwargs):
+        """Ставит сообщение в очередь. Возвращает False, если оно слито.
+
+        tenant - ключ арендатора чата для журнала событий.
+        Потокобезопасен и не блокирует вызывающего.
+        """
+        # Чат из файла арендаторов бывает числом, а из outbox - строкой:
+        # это один чат с общей очередью и ограничением частоты.
+        chat_id = str(chat_id)
+        with self._lock:
+            if tenant is not None:
+                self._tenants[chat_id] = tenant
+            messages = self._pending.get(chat_id)
+            duplicate = messages is not None and text in messages
+            if text in self.heartbeats and not duplicate and (
+                messages is not None or not self._heartbeat_due(chat_id)
+            ):
+                self.stats['coalesced'] += 1
+                return False
+            if on_done is not None:
+                self._callbacks.setdefault((chat_id, text), []).append(
+                    on_done
+                )
+            if duplicate:
+                self.stats['coalesced'] += 1
+                return False
+            self.stats['queued'] += 1
+            if messages is None:
+                self._pending[chat_id] = deque([text])
+                self._ready.append(chat_id)
+            else:
+                messages.append(text)
+        self._notify()
+        return True
+
+    def _heartbeat_due(self, chat_id):
+        """Можно ли поставить служебное сообщение в очередь чата."""
+        now = self.clock()
+        last = self._heartbeats_at.get(chat_id)
+        if last is not None and now - last < self.heartbeat_interval:
+            return False
+        self._heartbeats_at[chat_id] = now
+        return True
+
+    async def run(self):
+        """Запускает воркеры отправки; работает до отмены."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        if self._ready:
+            self._wakeup.set()
+        await asyncio.gather(
+            *(self._worker() for _ in range(self.workers))
+        )
+
+    async def flush(self, timeout=FLUSH_TIMEOUT):
+        """Ждёт отправки всех сообщений очереди, но не дольше timeout.
+
+        Воркеры run() должны работать. Возвращает число сообщений,
+        оставшихся неотправленными.
+        """
+        deadline = time.monotonic() + timeout
+        while len(self) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        left = len(self)
+        if left:
+            logger.warning('При остановке не отправлено сообщений - %d.',
+                           left)
+        return left
+
+    def _notify(self):
+        """Будит воркеры из любого потока."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _next_chat(self):
+        """Забирает чат, готовый к отправке, или возвращает None."""
+        with self._lock:
+            if not self._ready:
+                self._wakeup.clear()
+                return None
+            return self._ready.popleft()
+
+    async def _worker(self):
+        """Отправляет сообщения, пока его не отменят."""
+        from telegram.error import RetryAfter
+
+        loop = asyncio.get_running_loop()
+        while True:
+            chat_id = self._next_chat()
+            if chat_id is None:
+                await self._wakeup.wait()
+                continue
+            # Пока воркер занят чатом, чата нет в _ready, поэтому порядок
+            # сообщений в одном чате сохраняется.
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = self._chat_buckets[chat_id] = TokenBucket(
+                    self.chat_rate
+                )
+            await bucket.acquire()
+            await self._global_bucket.acquire()
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            with self._lock:
+                text = self._pending[chat_id][0]
+            started = time.perf_counter()
+            try:
+                await loop.run_in_executor(None, self.send, chat_id, text)
+            except RetryAfter as error:
+                self._observe('retry_after', chat_id, started)
+                self.stats['retry_after'] += 1
+                self._paused_until = time.monotonic() + error.retry_after
+                logger.warning(
+                    'Telegram просит подождать %s с.', error.retry_after
+                )
+            except Exception:
+                self._observe('failed', chat_id, started)
+                self.stats['failed'] += 1
+                logger.exception('Сообщение в чат %s не отправлено.', chat_id)
+                self._done(chat_id, False)
+            else:
+                self._observe('sent', chat_id, started)
+                self.stats['sent'] += 1
+                self._done(chat_id, True)
+            with self._lock:
+                if chat_id in self._pending:
+                    self._ready.append(chat_id)
+
+    def _observe(self, result, chat_id, started):
+        """Учитывает отправку в метриках и журнале событий."""
+        duration = time.perf_counter() - started
+        SEND_DURATION.labels(result).observe(duration)
+        emit(SEND, self._tenants.get(chat_id), chat=chat_id,
+             result=result, ms=round(duration * 1000, 1))
+
+    def _done(self, chat_id, sent):
+        """Убирает отправленное сообщение из очереди чата."""
+        with self._lock:
+            messages = self._pending[chat_id]
+            text = messages.popleft()
+            if not messages:
+                del self._pending[chat_id]
+            callbacks = self._callbacks.pop((chat_id, text), ())
+        for on_done in callbacks:
+            on_done(sent)
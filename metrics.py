@@ -0,0 +1,268 @@
+"""Метрики бота в формате Prometheus."""
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30,
+)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(names, values, extra=()):
+    """Форматирует метки в виде {name="value",...}."""
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"')
+         .replace('\n', r'\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    """Форматирует число для Prometheus."""
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Общая часть метрик: имя, описание и дочерние серии по меткам."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        """Инициализация метрики."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        """Возвращает серию метрики для значений меток."""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        """Создаёт новую серию."""
+        raise NotImplementedError
+
+    def _default(self):
+        """Серия метрики без меток."""
+        return self.labels()
+
+    def render(self):
+        """Строки метрики в текстовом формате Prometheus."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _Value:
+    """Серия счётчика или измерителя."""
+
+    def __init__(self):
+        self.value = 0
+        self.function = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        """Значение будет вычисляться функцией в момент сбора метрик."""
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function else self.value
+
+    def render(self, name, labelnames, key):
+        labels = _format_labels(labelnames, key)
+        return [f'{name}{labels} {_format_value(self.get())}']
+
+
+class Counter(_Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = 'counter'
+    _new_child = staticmethod(_Value)
+
+    def inc(self, amount=1):
+        """Увеличивает счётчик без меток."""
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    """Измеритель: значение, которое может расти и убывать."""
+
+    kind = 'gauge'
+    _new_child = staticmethod(_Value)
+
+    def inc(self, amount=1):
+        """Увеличивает измеритель без меток."""
+        self._default().inc(amount)
+
+    def dec(self, amount=1):
+        """Уменьшает измеритель без меток."""
+        self._default().dec(amount)
+
+    def set(self, value):
+        """Устанавливает значение измерителя без меток."""
+        self._default().set(value)
+
+    def set_function(self, function):
+        """Вычислять значение измерителя без меток функцией."""
+        self._default().set_function(function)
+
+
+class _HistogramValue:
+    """Серия гистограммы."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def render(self, name, labelnames, key):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            labels = _format_labels(
+                labelnames, key, [('le', _format_value(float(bound)))]
+            )
+            lines.append(f'{name}_bucket{labels} {cumulative}')
+        labels = _format_labels(labelnames, key)
+        lines.append(f'{name}_sum{labels} {_format_value(total)}')
+        lines.append(f'{name}_count{labels} {cumulative}')
+        return lines
+
+
+class Histogram(_Metric):
+    """Гистограмма длительностей."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        """Инициализация гистограммы."""
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(float(bound) for bound in buckets)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        """Учитывает значение в гистограмме без меток."""
+        self._default().observe(value)
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        """Инициализация пустого набора."""
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        """Возвращает метрику name, создавая её при первом обращении."""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f'Метрика {name} уже зарегистрирована '
+                                 f'с типом {metric.kind}.')
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Регистрирует счётчик."""
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        """Регистрирует измеритель."""
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(),
+                  buckets=DEFAULT_BUCKETS):
+        """Регистрирует гистограмму."""
+        return self._register(
+            Histogram, name, documentation, labelnames, buckets=buckets
+        )
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def start_http_server(port, host='', registry=REGISTRY):
+    """Запускает HTTP-сервер метрик в фоновом потоке и возвращает его.
+
+    Метрики отдаются по GET /metrics. http.server импортируется только
+    здесь, чтобы модули с метриками не замедляли запуск.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            """Не пишет журнал запросов."""
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info('Метрики доступны на порту %d.', server.server_port)
+    return server
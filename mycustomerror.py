@@ -13,8 +13,20 @@ class MyCustomError(Exception):
 
     def __str__(self):
         """Вызов метода str в MyCustomError."""
-        print('Вызов метода str MyCustomError')
         if self.message:
             return f'MyCustomError: "{self.message}".'  # mb raise ???
         else:
             return 'MyCustomError была вызвана.'  # mb raise ???
+
+
+class APIResponseError(MyCustomError):
+    """Запрос к API не удался.
+
+    transient=True означает временный сбой (ошибка соединения, код 5xx,
+    408 или 429): он не связан с арендатором, и опрос можно повторить.
+    """
+
+    def __init__(self, message, transient=False):
+        """Инициализация объекта APIResponseError."""
+        super().__init__(message)
+        self.transient = transient
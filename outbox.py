@@ -0,0 +1,272 @@
+"""Журнал исходящих уведомлений (outbox) в SQLite."""
+import asyncio
+import functools
+import logging
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from metrics import REGISTRY
+from state_store import homework_key
+
+logger = logging.getLogger(__name__)
+
+# Сколько уведомлений диспетчер передаёт в очередь отправки за раз и
+# как часто проверяет журнал.
+BATCH_SIZE = 100
+DISPATCH_INTERVAL = 1
+# После MAX_ATTEMPTS неудачных отправок уведомление больше не
+# отправляется. Отправленные записи хранятся RETENTION секунд: пока
+# запись есть, то же изменение работы не будет отправлено повторно.
+MAX_ATTEMPTS = 5
+RETENTION = 30 * 24 * 3600
+
+DELIVERED = REGISTRY.counter(
+    'homework_bot_outbox_delivered_total',
+    'Уведомления из outbox по результату отправки.', ['result'],
+)
+
+Notification = namedtuple('Notification',
+                          ['id', 'tenant_key', 'chat_id', 'text'])
+
+
+def notification_key(homework):
+    """Ключ идемпотентности уведомления: работа, статус и время."""
+    return (f'{homework_key(homework)}:{homework.get("status")}:'
+            f'{homework.get("date_updated")}')
+
+
+class Outbox:
+    """Журнал уведомлений, записываемый до отправки.
+
+    Уведомление об изменении работы сначала сохраняется в таблицу
+    outbox с ключом идемпотентности (арендатор, notification_key()),
+    и только потом отправляется диспетчером. Повторная запись того же
+    изменения (например, если бот упал до сохранения курсора и при
+    перезапуске нашёл изменение снова) игнорируется, а записанное, но
+    не отправленное уведомление отправляется после перезапуска.
+    """
+
+    def __init__(self, path, clock=time.time):
+        """Открывает (и при необходимости создаёт) журнал."""
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS outbox ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'tenant_key TEXT NOT NULL, '
+                'idempotency_key TEXT NOT NULL, '
+                'chat_id TEXT NOT NULL, '
+                'text TEXT NOT NULL, '
+                'attempts INTEGER NOT NULL DEFAULT 0, '
+                'created_at INTEGER NOT NULL, '
+                'sent_at INTEGER, '
+                'UNIQUE (tenant_key, idempotency_key))'
+            )
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS outbox_pending '
+                'ON outbox (id) WHERE sent_at IS NULL'
+            )
+
+    def __len__(self):
+        """Количество неотправленных уведомлений."""
+        with self._lock:
+            return self._connection.execute(
+                'SELECT COUNT(*) FROM outbox WHERE sent_at IS NULL '
+                'AND attempts < ?', (MAX_ATTEMPTS,),
+            ).fetchone()[0]
+
+    def add(self, tenant, homeworks, texts):
+        """Записывает уведомления арендатору об изменениях работ.
+
+        texts - тексты уведомлений в порядке homeworks. Возвращает
+        число записанных уведомлений: уже записанные пропускаются.
+        """
+        now = int(self.clock())
+        rows = [
+            (tenant.key, notification_key(homework), str(tenant.chat_id),
+             text, now)
+            for homework, text in zip(homeworks, texts)
+        ]
+        with self._lock, self._connection:
+            before = self._connection.total_changes
+            self._connection.executemany(
+                'INSERT OR IGNORE INTO outbox (tenant_key, '
+                'idempotency_key, chat_id, text, created_at) '
+                'VALUES (?, ?, ?, ?, ?)', rows,
+            )
+            added = self._connection.total_changes - before
+        if added < len(rows):
+            logger.info('Уже записанные уведомления арендатора %s '
+                        'пропущены - %d.', tenant.key, len(rows) - added)
+        return added
+
+    def pending(self, limit=BATCH_SIZE, after=0, tenant_keys=None):
+        """Неотправленные уведомления с id больше after, по порядку.
+
+        tenant_keys ограничивает выборку арендаторами с этими ключами.
+        Арендаторы отбираются не в запросе, а при чтении: ключей может
+        быть больше, чем параметров в одном запросе SQLite.
+        """
+        keys = None if tenant_keys is None else frozenset(tenant_keys)
+        if keys is not None and not keys:
+            return []
+        notifications = []
+        while len(notifications) < limit:
+            with self._lock:
+                rows = self._connection.execute(
+                    'SELECT id, tenant_key, chat_id, text FROM outbox '
+                    'WHERE sent_at IS NULL AND attempts < ? AND id > ? '
+                    'ORDER BY id LIMIT ?', (MAX_ATTEMPTS, after, limit),
+                ).fetchall()
+            for row in rows:
+                if keys is None or row[1] in keys:
+                    notifications.append(Notification(*row))
+                    if len(notifications) == limit:
+                        break
+            if len(rows) < limit:
+                break
+            after = rows[-1][0]
+        return notifications
+
+    def mark_sent(self, ids):
+        """Отмечает уведомления отправленными."""
+        now = int(self.clock())
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'UPDATE outbox SET sent_at = ? WHERE id = ?',
+                [(now, id_) for id_ in ids],
+            )
+
+    def mark_failed(self, ids):
+        """Учитывает неудачную попытку отправки уведомлений."""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'UPDATE outbox SET attempts = attempts + 1 WHERE id = ?',
+                [(id_,) for id_ in ids],
+            )
+
+    def purge(self, retention=RETENTION):
+        """Удаляет старые отправленные записи; возвращает их число."""
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                'DELETE FROM outbox WHERE sent_at IS NOT NULL '
+                'AND sent_at < ?', (int(self.clock()) - retention,),
+            )
+        return cursor.rowcount
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self._lock:
+            self._connection.close()
+
+
+class OutboxDispatcher:
+    """Фоновая служба движка: отправляет уведомления из outbox.
+
+    Раз в interval секунд берёт из журнала до batch_size новых
+    уведомлений и ставит их в очередь отправки queue
+    (message_queue.OutboundQueue). Результаты отправки записываются в
+    журнал пачкой на следующем шаге. Уведомление, отправленное в
+    Telegram, но не отмеченное в журнале из-за падения бота, будет
+    отправлено повторно: окно для этого - не больше interval секунд.
+    tenant_keys - функция, возвращающая ключи арендаторов процесса
+    (см. sharding.ShardCoordinator); без неё отправляются уведомления
+    всех арендаторов.
+    """
+
+    def __init__(self, outbox, queue, batch_size=BATCH_SIZE,
+                 interval=DISPATCH_INTERVAL, tenant_keys=None):
+        """Инициализация диспетчера."""
+        self.outbox = outbox
+        self.queue = queue
+        self.batch_size = batch_size
+        self.interval = interval
+        self.tenant_keys = tenant_keys
+        self._owned = None
+        self._last_id = 0
+        # Уведомления в очереди отправки и отправленные, результат
+        # которых ещё не записан в журнал: они не берутся повторно.
+        self._in_flight = set()
+        self._sent = []
+        self._failed = []
+        self._lock = asyncio.Lock()
+
+    async def run(self):
+        """Отправляет уведомления, пока его не отменят."""
+        while True:
+            try:
+                await self.dispatch()
+            except sqlite3.Error:
+                logger.exception('Не удалось прочитать outbox.')
+            await asyncio.sleep(self.interval)
+
+    async def dispatch(self):
+        """Записывает результаты и ставит в очередь новые уведомления."""
+        async with self._lock:
+            await self._commit()
+            return await self._dispatch()
+
+    async def _dispatch(self):
+        """Ставит в очередь новые уведомления из журнала."""
+        loop = asyncio.get_running_loop()
+        owned = None if self.tenant_keys is None else self.tenant_keys()
+        if owned != self._owned:
+            # Уведомления перешедших к процессу арендаторов могут быть
+            # записаны раньше уже просмотренных.
+            self._owned = owned
+            self._last_id = 0
+        notifications = await loop.run_in_executor(
+            None, functools.partial(
+                self.outbox.pending, self.batch_size, self._last_id, owned
+            ),
+        )
+        for notification in notifications:
+            self._last_id = notification.id
+            if notification.id in self._in_flight:
+                continue
+            self._in_flight.add(notification.id)
+            self.queue.send_message(
+                chat_id=notification.chat_id, text=notification.text,
+                tenant=notification.tenant_key,
+                on_done=functools.partial(self._done, notification.id),
+            )
+        return len(notifications)
+
+    async def commit(self):
+        """Записывает в журнал результаты отправки."""
+        async with self._lock:
+            await self._commit()
+
+    async def _commit(self):
+        """Записывает результаты отправки без блокировки диспетчера.
+
+        Результаты убираются из памяти только после записи: если база
+        недоступна, они будут записаны при следующем вызове.
+        """
+        loop = asyncio.get_running_loop()
+        if self._sent:
+            sent = list(self._sent)
+            await loop.run_in_executor(None, self.outbox.mark_sent, sent)
+            del self._sent[:len(sent)]
+            # Только теперь журнал не вернёт их как неотправленные.
+            self._in_flight.difference_update(sent)
+        if self._failed:
+            failed = list(self._failed)
+            await loop.run_in_executor(None, self.outbox.mark_failed, failed)
+            del self._failed[:len(failed)]
+            self._in_flight.difference_update(failed)
+            # Неотправленные уведомления будут взяты из журнала снова.
+            self._last_id = min(self._last_id, min(failed) - 1)
+
+    def _done(self, id_, sent):
+        """Результат отправки уведомления из очереди."""
+        if sent:
+            DELIVERED.labels('sent').inc()
+            self._sent.append(id_)
+        else:
+            DELIVERED.labels('failed').inc()
+            self._failed.append(id_)
@@ -0,0 +1,168 @@
+"""Профилирование бота: время этапов опроса и сэмплирующий профайлер."""
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = 'profiles'
+# Интервал между снимками стеков сэмплирующего профайлера, секунды.
+SAMPLE_INTERVAL = 0.01
+
+STAGE_DURATION = REGISTRY.histogram(
+    'homework_bot_stage_duration_seconds',
+    'Длительность этапов цикла опроса.', ['stage'],
+)
+
+_stages_enabled = False
+
+
+def enable_stages(enabled=True):
+    """Включает или выключает замеры этапов (см. stage)."""
+    global _stages_enabled
+    if enabled == _stages_enabled:
+        return
+    _stages_enabled = enabled
+    logger.info('Замеры этапов опроса %s.',
+                'включены' if enabled else 'выключены')
+
+
+def toggle_stages():
+    """Переключает замеры этапов; для обработчика сигнала."""
+    enable_stages(not _stages_enabled)
+
+
+def stage(name):
+    """Декоратор этапа цикла опроса с именем name.
+
+    Пока замеры включены, длительность каждого вызова учитывается в
+    гистограмме homework_bot_stage_duration_seconds{stage=name}.
+    Выключенный замер стоит одной проверки флага.
+    """
+    histogram = STAGE_DURATION.labels(name)
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _stages_enabled:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def frame_name(code):
+    """Имя кадра в стеке: модуль и функция."""
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f'{module}:{code.co_name}'
+
+
+def collapse(frame, thread_name):
+    """Стек кадра frame в формате collapsed, от корня к вершине."""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame.f_code))
+        frame = frame.f_back
+    names.append(thread_name)
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """Сэмплирующий профайлер всех потоков процесса.
+
+    После start() фоновый поток каждые interval секунд снимает стеки
+    всех потоков (кроме своего) и считает одинаковые стеки. stop()
+    записывает их в каталог directory в формате collapsed stacks
+    ("кадр;кадр;кадр число" на строку), который понимают flamegraph.pl,
+    speedscope и inferno. Профайлер можно включать и выключать в
+    работающем боте, например сигналом (см. toggle).
+    """
+
+    def __init__(self, directory=PROFILE_DIR, interval=SAMPLE_INTERVAL,
+                 clock=time.time):
+        """Инициализация выключенного профайлера."""
+        self.directory = directory
+        self.interval = interval
+        self.clock = clock
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopping = threading.Event()
+        self._thread = None
+        self._started_at = None
+
+    @property
+    def running(self):
+        """Идёт ли сейчас профилирование."""
+        return self._thread is not None
+
+    def start(self):
+        """Начинает профилирование."""
+        if self.running:
+            return
+        self.stacks = Counter()
+        self.samples = 0
+        self._started_at = self.clock()
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name='profiler', daemon=True
+        )
+        self._thread.start()
+        logger.info('Профилирование запущено.')
+
+    def stop(self):
+        """Останавливает профилирование и возвращает путь к файлу стеков."""
+        if not self.running:
+            return None
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        path = self.dump()
+        logger.info('Профилирование остановлено, снимков - %d, стеки - %s.',
+                    self.samples, path)
+        return path
+
+    def toggle(self):
+        """Запускает или останавливает профилирование."""
+        if self.running:
+            return self.stop()
+        self.start()
+        return None
+
+    def sample(self):
+        """Снимает стеки всех потоков, кроме текущего."""
+        names = {
+            thread.ident: thread.name for thread in threading.enumerate()
+        }
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident != own:
+                name = names.get(ident, str(ident))
+                self.stacks[collapse(frame, name)] += 1
+        self.samples += 1
+
+    def _run(self):
+        """Цикл снятия стеков в фоновом потоке."""
+        while not self._stopping.wait(self.interval):
+            self.sample()
+
+    def dump(self):
+        """Записывает стеки в файл; возвращает путь к нему."""
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.gmtime(self._started_at))
+        path = os.path.join(
+            self.directory, f'profile-{stamp}-{os.getpid()}.folded'
+        )
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+        return path
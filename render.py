@@ -0,0 +1,77 @@
+"""Тексты уведомлений об изменении статуса работы."""
+import functools
+
+DEFAULT_LOCALE = 'ru'
+CACHE_SIZE = 4096
+
+TEMPLATES = {
+    'ru': 'Изменился статус проверки работы "{homework_name}". {verdict}',
+    'en': 'Review status of "{homework_name}" has changed. {verdict}',
+}
+VERDICTS = {
+    'ru': {
+        'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
+        'reviewing': 'Работа взята на проверку ревьюером.',
+        'rejected': 'Работа проверена: у ревьюера есть замечания.'
+    },
+    'en': {
+        'approved': 'The work has been reviewed and accepted. Hooray!',
+        'reviewing': 'The work has been taken for review.',
+        'rejected': 'The work has been reviewed and needs changes.',
+    },
+}
+
+
+class Renderer:
+    """Готовит тексты уведомлений по статусу работы и языку.
+
+    Шаблоны компилируются при создании: для каждой пары (язык, статус)
+    вердикт подставляется заранее, и шаблон делится на текст до и после
+    имени работы, так что текст собирается одной конкатенацией. Готовые
+    тексты кешируются по (имя работы, статус, язык): одно изменение,
+    разосланное во многие чаты, рендерится один раз. Для неизвестного
+    языка используется default_locale, неизвестный статус - KeyError.
+    """
+
+    def __init__(self, templates=TEMPLATES, verdicts=VERDICTS,
+                 default_locale=DEFAULT_LOCALE, cache_size=CACHE_SIZE):
+        """Компилирует шаблоны."""
+        self.default_locale = default_locale
+        self._locales = frozenset(templates)
+        self._compiled = {}
+        for locale, template in templates.items():
+            for status, verdict in verdicts[locale].items():
+                text = template.replace('{verdict}', verdict)
+                prefix, _, suffix = text.partition('{homework_name}')
+                self._compiled[locale, status] = (prefix, suffix)
+        self._cached = functools.lru_cache(maxsize=cache_size)(self._render)
+
+    def _locale(self, locale):
+        """Язык, на котором будет текст: известный locale или основной."""
+        return locale if locale in self._locales else self.default_locale
+
+    def render(self, homework_name, status, locale=None):
+        """Текст уведомления о статусе работы."""
+        # Ключ кеша не зависит от того, передан ли язык явно.
+        return self._cached(homework_name, status, self._locale(locale))
+
+    def _render(self, homework_name, status, locale):
+        """Собирает текст уведомления по скомпилированному шаблону."""
+        parts = self._compiled.get((locale, status))
+        if parts is None:
+            parts = self._compiled[self.default_locale, status]
+        prefix, suffix = parts
+        return prefix + homework_name + suffix
+
+    def render_many(self, homeworks, locale=None):
+        """Тексты уведомлений для списка работ, в том же порядке."""
+        render = self._cached
+        locale = self._locale(locale)
+        return [
+            render(homework['homework_name'], homework['status'], locale)
+            for homework in homeworks
+        ]
+
+    def cache_info(self):
+        """Статистика кеша текстов."""
+        return self._cached.cache_info()
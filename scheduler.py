@@ -0,0 +1,64 @@
+"""Планировщик опросов: интервал зависит от последнего статуса работы."""
+import random
+
+DEFAULT_INTERVAL = 600
+MAX_INTERVAL = 3600
+# Работу на проверке опрашиваем чаще: её статус скоро изменится.
+STATUS_INTERVALS = {
+    'reviewing': 120,
+    'rejected': 600,
+    'approved': 900,
+}
+# Статусы, при которых интервал растёт с каждым опросом без изменений.
+BACKOFF_STATUSES = frozenset({'approved'})
+BACKOFF = 2
+JITTER = 0.1
+
+
+class PollScheduler:
+    """Вычисляет задержку до следующего опроса арендатора.
+
+    Базовый интервал берётся по последнему наблюдавшемуся статусу
+    (tenant.last_status), для статусов из backoff_statuses он
+    умножается на backoff за каждый опрос без изменений
+    (tenant.idle_polls), но не превышает max_interval. К каждой
+    задержке добавляется случайное отклонение ±jitter, а первый опрос
+    арендатора сдвигается на случайную долю интервала, чтобы запросы
+    разных арендаторов распределялись по времени, а не шли пачкой.
+    """
+
+    def __init__(self, default_interval=DEFAULT_INTERVAL,
+                 status_intervals=None, max_interval=MAX_INTERVAL,
+                 backoff_statuses=BACKOFF_STATUSES, backoff=BACKOFF,
+                 jitter=JITTER, spread_start=True, rng=None):
+        """Инициализация планировщика."""
+        self.default_interval = default_interval
+        if status_intervals is None:
+            status_intervals = STATUS_INTERVALS
+        self.status_intervals = status_intervals
+        self.max_interval = max(max_interval, default_interval)
+        self.backoff_statuses = backoff_statuses
+        self.backoff = backoff
+        self.jitter = jitter
+        self.spread_start = spread_start
+        self.rng = rng or random.Random()
+
+    def interval(self, tenant):
+        """Интервал опроса арендатора без случайного отклонения."""
+        interval = self.status_intervals.get(
+            tenant.last_status, self.default_interval
+        )
+        if tenant.last_status in self.backoff_statuses:
+            interval *= self.backoff ** min(tenant.idle_polls, 32)
+        return min(interval, self.max_interval)
+
+    def first_delay(self, tenant):
+        """Задержка перед первым опросом арендатора."""
+        if not self.spread_start:
+            return 0
+        return self.rng.uniform(0, self.interval(tenant))
+
+    def next_delay(self, tenant):
+        """Задержка до следующего опроса арендатора."""
+        interval = self.interval(tenant)
+        return interval * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
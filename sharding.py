@@ -0,0 +1,327 @@
+"""Распределение арендаторов между несколькими процессами бота."""
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Процесс продлевает аренду каждые HEARTBEAT_INTERVAL секунд; аренда
+# и запись о процессе действуют LEASE_TTL секунд, после чего
+# арендаторов остановившегося процесса забирают остальные.
+HEARTBEAT_INTERVAL = 10
+LEASE_TTL = 30
+# Процесс перестаёт начинать опросы за LEASE_MARGIN секунд до истечения
+# своей аренды: запас на расхождение часов процессов.
+LEASE_MARGIN = 5
+# Сколько секунд rebalance() ждёт завершения начатых опросов
+# переходящих арендаторов; не дождавшихся освобождают позже.
+DRAIN_TIMEOUT = 5
+# Число точек каждого процесса на кольце хешей.
+REPLICAS = 64
+
+OWNED = REGISTRY.gauge(
+    'homework_bot_shard_tenants', 'Арендаторы, опрашиваемые процессом.',
+)
+WORKERS = REGISTRY.gauge(
+    'homework_bot_shard_workers', 'Живые процессы бота.',
+)
+
+
+def default_worker_id():
+    """Имя процесса: DYNO на Heroku, иначе хост и pid."""
+    return os.getenv('DYNO') or f'{socket.gethostname()}-{os.getpid()}'
+
+
+def _hash(value):
+    """Положение строки на кольце хешей."""
+    digest = hashlib.sha1(value.encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+class HashRing:
+    """Согласованное хеширование ключей арендаторов по процессам.
+
+    Каждый процесс занимает replicas точек кольца, ключ принадлежит
+    процессу ближайшей следующей точки. При добавлении или удалении
+    процесса меняют владельца только ключи его точек.
+    """
+
+    def __init__(self, nodes=(), replicas=REPLICAS):
+        """Строит кольцо для процессов nodes."""
+        points = sorted(
+            (_hash(f'{node}#{replica}'), node)
+            for node in nodes for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def owner(self, key):
+        """Процесс, которому принадлежит ключ, или None без процессов."""
+        if not self._nodes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key))
+        return self._nodes[index % len(self._nodes)]
+
+
+class LeaseStore:
+    """Аренда арендаторов процессами в общей базе SQLite.
+
+    В таблице shard_workers процессы отмечают, что они живы, в таблице
+    tenant_leases хранится владелец каждого арендатора и срок аренды.
+    Арендатора может взять только один процесс: чужая аренда
+    перехватывается лишь после истечения срока.
+    """
+
+    def __init__(self, path, worker_id, ttl=LEASE_TTL, clock=time.time):
+        """Открывает (и при необходимости создаёт) базу аренды."""
+        self.worker_id = worker_id
+        self.ttl = ttl
+        self.clock = clock
+        # Срок аренды, взятой или продлённой последним acquire().
+        self.expires_at = 0
+        self._lock = threading.Lock()
+        # Транзакции открываются явно: BEGIN IMMEDIATE сразу блокирует
+        # базу для записи, и процессы не перехватывают аренду друг у
+        # друга.
+        self._connection = sqlite3.connect(
+            path, timeout=LEASE_TTL, isolation_level=None,
+            check_same_thread=False,
+        )
+        with self._lock:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS shard_workers ('
+                'worker_id TEXT PRIMARY KEY, '
+                'heartbeat_at REAL NOT NULL)'
+            )
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS tenant_leases ('
+                'tenant_key TEXT PRIMARY KEY, '
+                'worker_id TEXT NOT NULL, '
+                'expires_at REAL NOT NULL)'
+            )
+
+    def _transaction(self, statements):
+        """Выполняет [(sql, параметры)] одной транзакцией."""
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                for sql, params in statements:
+                    self._connection.execute(sql, params)
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+            self._connection.execute('COMMIT')
+
+    def heartbeat(self):
+        """Отмечает процесс живым и возвращает список живых процессов."""
+        now = self.clock()
+        self._transaction([
+            ('INSERT INTO shard_workers (worker_id, heartbeat_at) '
+             'VALUES (?, ?) ON CONFLICT(worker_id) DO UPDATE SET '
+             'heartbeat_at = excluded.heartbeat_at', (self.worker_id, now)),
+            ('DELETE FROM shard_workers WHERE heartbeat_at <= ?',
+             (now - self.ttl,)),
+        ])
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT worker_id FROM shard_workers ORDER BY worker_id'
+            ).fetchall()
+        return [worker_id for worker_id, in rows]
+
+    def acquire(self, keys):
+        """Берёт или продлевает аренду арендаторов keys.
+
+        Возвращает множество ключей из keys, арендованных процессом.
+        """
+        now = self.clock()
+        self._transaction([
+            ('INSERT INTO tenant_leases (tenant_key, worker_id, '
+             'expires_at) VALUES (?, ?, ?) ON CONFLICT(tenant_key) DO '
+             'UPDATE SET worker_id = excluded.worker_id, '
+             'expires_at = excluded.expires_at '
+             'WHERE tenant_leases.worker_id = excluded.worker_id '
+             'OR tenant_leases.expires_at <= ?',
+             (key, self.worker_id, now + self.ttl, now))
+            for key in keys
+        ])
+        self.expires_at = now + self.ttl
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT tenant_key FROM tenant_leases WHERE worker_id = ? '
+                'AND expires_at > ?', (self.worker_id, now),
+            ).fetchall()
+        return {key for key, in rows} & set(keys)
+
+    def release(self, keys):
+        """Отказывается от аренды арендаторов keys."""
+        self._transaction([
+            ('DELETE FROM tenant_leases WHERE tenant_key = ? '
+             'AND worker_id = ?', (key, self.worker_id))
+            for key in keys
+        ])
+
+    def leave(self):
+        """Снимает всю аренду процесса и запись о нём."""
+        self.expires_at = 0
+        self._transaction([
+            ('DELETE FROM tenant_leases WHERE worker_id = ?',
+             (self.worker_id,)),
+            ('DELETE FROM shard_workers WHERE worker_id = ?',
+             (self.worker_id,)),
+        ])
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self._lock:
+            self._connection.close()
+
+
+class ShardCoordinator:
+    """Решает, каких арендаторов опрашивает этот процесс.
+
+    rebalance() отмечает процесс живым, строит кольцо по живым
+    процессам и арендует своих по кольцу арендаторов. Арендаторы,
+    перешедшие к другому процессу, сначала перестают опрашиваться,
+    затем, когда завершатся уже начатые опросы (см. owned_only), для
+    них вызывается on_release (например, сохранение снимка
+    состояния), и только после этого аренда снимается. Для
+    новых арендаторов вызывается on_acquire (например, загрузка
+    курсора и снимка, сохранённых прежним владельцем). Обе функции
+    получают список арендаторов.
+    """
+
+    def __init__(self, store, tenants, on_acquire=None, on_release=None,
+                 replicas=REPLICAS, interval=HEARTBEAT_INTERVAL,
+                 drain_timeout=DRAIN_TIMEOUT):
+        """Инициализация без арендованных арендаторов."""
+        self.store = store
+        self.tenants = {tenant.key: tenant for tenant in tenants}
+        self.on_acquire = on_acquire
+        self.on_release = on_release
+        self.replicas = replicas
+        self.interval = interval
+        self.drain_timeout = drain_timeout
+        self.owned = frozenset()
+        # Ключи арендаторов, опрос которых идёт сейчас, и перешедших к
+        # другим процессам арендаторов, аренда которых ещё не снята.
+        self._polling = set()
+        self._draining = set()
+        self._idle = threading.Condition()
+
+    def leased(self):
+        """Действует ли ещё аренда процесса (с запасом LEASE_MARGIN).
+
+        Если аренду не удалось продлить (база недоступна или служба
+        rebalance остановилась), процесс перестаёт опрашивать своих
+        арендаторов раньше, чем их заберут другие процессы.
+        """
+        return self.store.clock() < self.store.expires_at - LEASE_MARGIN
+
+    def owns(self, tenant):
+        """Опрашивает ли этот процесс арендатора."""
+        return tenant.key in self.owned and self.leased()
+
+    def owned_keys(self):
+        """Ключи арендаторов процесса с действующей арендой."""
+        return self.owned if self.leased() else frozenset()
+
+    def owned_only(self, poll):
+        """Обёртка функции опроса: чужие арендаторы пропускаются."""
+        def poll_owned(tenant):
+            with self._idle:
+                if not self.owns(tenant):
+                    return
+                self._polling.add(tenant.key)
+            try:
+                poll(tenant)
+            finally:
+                with self._idle:
+                    self._polling.discard(tenant.key)
+                    self._idle.notify_all()
+        return poll_owned
+
+    def rebalance(self):
+        """Обновляет аренду; возвращает ключи своих арендаторов."""
+        workers = self.store.heartbeat()
+        ring = HashRing(workers, self.replicas)
+        wanted = {
+            key for key in self.tenants
+            if ring.owner(key) == self.store.worker_id
+        }
+        # Арендаторы, вернувшиеся к процессу, не освобождаются.
+        self._draining -= wanted
+        lost = self.owned - wanted
+        with self._idle:
+            self.owned = self.owned - lost
+        self._draining |= lost
+        acquired = self.store.acquire(wanted)
+        gained = acquired - self.owned
+        if gained and self.on_acquire is not None:
+            self.on_acquire([self.tenants[key] for key in gained])
+        with self._idle:
+            self.owned = frozenset(acquired)
+        released = self._release() if self._draining else set()
+        if lost or gained or released:
+            logger.info(
+                'Процессов - %d, арендаторов у процесса %s - %d '
+                '(передано - %d, получено - %d, ждут освобождения - %d).',
+                len(workers), self.store.worker_id, len(self.owned),
+                len(released), len(gained), len(wanted - acquired),
+            )
+        OWNED.set(len(self.owned))
+        WORKERS.set(len(workers))
+        return self.owned
+
+    def _release(self):
+        """Освобождает перешедших к другим процессам арендаторов.
+
+        Новые опросы этих арендаторов уже не начинаются; начатые
+        дожидаются не дольше drain_timeout секунд. Арендаторы, опрос
+        которых не завершился, освобождаются при следующем rebalance(),
+        чтобы on_release не получил состояние посреди опроса. Возвращает
+        ключи освобождённых арендаторов.
+        """
+        with self._idle:
+            self._idle.wait_for(
+                lambda: not self._draining & self._polling,
+                self.drain_timeout,
+            )
+            idle = self._draining - self._polling
+        busy = len(self._draining) - len(idle)
+        if busy:
+            logger.warning('Опросы переданных арендаторов не завершились - '
+                           '%d, они будут освобождены позже.', busy)
+        if not idle:
+            return idle
+        if self.on_release is not None:
+            self.on_release([self.tenants[key] for key in idle])
+        self.store.release(idle)
+        self._draining -= idle
+        return idle
+
+    async def run(self):
+        """Фоновая служба движка: периодический rebalance()."""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.rebalance)
+            except sqlite3.Error:
+                logger.exception('Не удалось обновить аренду арендаторов.')
+            await asyncio.sleep(self.interval)
+
+    def close(self):
+        """Освобождает арендаторов для других процессов."""
+        self.owned = frozenset()
+        if self._draining and self.on_release is not None:
+            self.on_release([self.tenants[key] for key in self._draining])
+        self._draining = set()
+        self.store.leave()
+        self.store.close()
@@ -0,0 +1,118 @@
+"""Снимки состояния арендаторов для тёплого перезапуска."""
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from state_store import intern_status
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+
+
+def dump_tenant(tenant):
+    """Возвращает состояние опроса арендатора в виде словаря для JSON."""
+    conditional = tenant.conditional
+    if conditional is not None and conditional.body_hash is not None:
+        conditional = [conditional.etag, conditional.last_modified,
+                       conditional.body_hash.hex()]
+    else:
+        conditional = None
+    return {
+        'version': SNAPSHOT_VERSION,
+        'from_date': tenant.from_date,
+        'last_status': tenant.last_status,
+        'idle_polls': tenant.idle_polls,
+        'homeworks': tenant.homeworks.snapshot(),
+        'conditional': conditional,
+        'errors': tenant.errors.snapshot(),
+        'saved_at': time.time(),
+    }
+
+
+def restore_tenant(tenant, state):
+    """Восстанавливает состояние опроса арендатора из dump_tenant()."""
+    tenant.from_date = state['from_date']
+    tenant.last_status = intern_status(state['last_status'])
+    tenant.idle_polls = state['idle_polls']
+    tenant.homeworks.restore(state['homeworks'])
+    # Повторы ошибок, начавшихся до перезапуска, не сообщаются заново.
+    elapsed = max(0, time.time() - state.get('saved_at', time.time()))
+    tenant.errors.restore(state.get('errors', ()), elapsed)
+    if tenant.conditional is not None and state['conditional']:
+        etag, last_modified, body_hash = state['conditional']
+        tenant.conditional.etag = etag
+        tenant.conditional.last_modified = last_modified
+        tenant.conditional.body_hash = bytes.fromhex(body_hash)
+
+
+class SnapshotStore:
+    """Хранит в SQLite снимки состояния арендаторов.
+
+    Снимок записывается при остановке бота: известные статусы работ,
+    валидаторы условных запросов, последний статус и число опросов без
+    изменений. При запуске снимок восстанавливается, только если он
+    сделан на том же курсоре, что сохранён в CursorStore: иначе после
+    снимка были опросы, и снимок устарел.
+    """
+
+    def __init__(self, path):
+        """Открывает (и при необходимости создаёт) базу снимков."""
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS tenant_snapshots ('
+                'tenant_key TEXT PRIMARY KEY, '
+                'state TEXT NOT NULL, '
+                'updated_at INTEGER NOT NULL)'
+            )
+
+    def save(self, tenants):
+        """Сохраняет снимки всех арендаторов одной транзакцией."""
+        now = int(time.time())
+        rows = []
+        for tenant in tenants:
+            # Состояние может одновременно меняться webhook'ом.
+            with tenant.lock:
+                state = dump_tenant(tenant)
+            rows.append((tenant.key, json.dumps(state), now))
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT INTO tenant_snapshots (tenant_key, state, '
+                'updated_at) VALUES (?, ?, ?) ON CONFLICT(tenant_key) DO '
+                'UPDATE SET state = excluded.state, '
+                'updated_at = excluded.updated_at',
+                rows,
+            )
+        logger.info('Сохранены снимки арендаторов - %d.', len(rows))
+
+    def load(self, tenant):
+        """Восстанавливает снимок арендатора.
+
+        Возвращает True, если снимок найден и совпадает с курсором
+        арендатора (tenant.from_date).
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT state FROM tenant_snapshots WHERE tenant_key = ?',
+                (tenant.key,),
+            ).fetchone()
+        if row is None:
+            return False
+        state = json.loads(row[0])
+        if state.get('version') != SNAPSHOT_VERSION:
+            logger.info('Снимок арендатора %s другой версии.', tenant.key)
+            return False
+        if state['from_date'] != tenant.from_date:
+            logger.info('Снимок арендатора %s устарел.', tenant.key)
+            return False
+        restore_tenant(tenant, state)
+        return True
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,167 @@
+"""Состояние домашних работ арендатора и поиск изменений в нём."""
+import sys
+from collections import namedtuple
+from datetime import datetime
+from enum import Enum, IntEnum
+
+
+class ChangeKind(Enum):
+    """Тип изменения домашней работы."""
+
+    NEW = 'new'
+    STATUS_CHANGED = 'status-changed'
+    REMOVED = 'removed'
+
+
+class HomeworkStatus(IntEnum):
+    """Статус проверки работы; значение - код в отпечатке работы."""
+
+    UNKNOWN = 0
+    REVIEWING = 1
+    APPROVED = 2
+    REJECTED = 3
+
+
+STATUSES = {
+    sys.intern(status.name.lower()): status
+    for status in HomeworkStatus if status
+}
+_STATUS_NAMES = {name: name for name in STATUSES}
+# Под код статуса в упакованном отпечатке отводится STATUS_BITS бит.
+STATUS_BITS = 4
+
+ChangeEvent = namedtuple('ChangeEvent', ['kind', 'homework_id', 'homework'])
+
+
+def homework_key(homework):
+    """Возвращает ключ работы: id, а при его отсутствии - имя работы."""
+    return homework.get('id', homework.get('homework_name'))
+
+
+def intern_status(status):
+    """Возвращает общий для всех арендаторов объект строки статуса.
+
+    Статус из ответа API - отдельная строка в каждом ответе; известные
+    статусы заменяются одной строкой на процесс.
+    """
+    return _STATUS_NAMES.get(status, status)
+
+
+def parse_timestamp(value):
+    """Время в формате ISO 8601 из ответа API в секундах Unix или None."""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return None
+    return int(parsed.timestamp())
+
+
+def fingerprint(homework):
+    """Возвращает компактный отпечаток работы: статус и время изменения.
+
+    Известный статус и время изменения упаковываются в одно целое
+    число: время в секундах, сдвинутое на STATUS_BITS, и код статуса.
+    Иначе отпечаток - пара (статус, время) из ответа как есть.
+    """
+    status = homework.get('status')
+    date_updated = homework.get('date_updated')
+    code = STATUSES.get(status)
+    timestamp = parse_timestamp(date_updated)
+    if code is None or timestamp is None or timestamp < 0:
+        return status, date_updated
+    return timestamp << STATUS_BITS | code
+
+
+def updated_at(fingerprint_):
+    """Время изменения работы из отпечатка в секундах Unix или None."""
+    if isinstance(fingerprint_, int):
+        return fingerprint_ >> STATUS_BITS
+    return parse_timestamp(fingerprint_[1])
+
+
+class HomeworkStateStore:
+    """Отпечатки домашних работ арендатора, индексированные по ключу работы.
+
+    Вместо целых словарей из ответа API хранится только отпечаток
+    каждой работы - обычно одно целое число (см. fingerprint). Метод
+    diff за один проход по списку работ находит новые и изменившиеся
+    работы, а для полного списка - ещё и удалённые.
+    """
+
+    __slots__ = ('_fingerprints',)
+
+    def __init__(self):
+        """Инициализация пустого хранилища."""
+        self._fingerprints = {}
+
+    def __len__(self):
+        """Количество известных работ."""
+        return len(self._fingerprints)
+
+    def __contains__(self, homework_id):
+        """Проверяет, известна ли работа с ключом homework_id."""
+        return homework_id in self._fingerprints
+
+    def snapshot(self):
+        """Возвращает состояние в виде списка [ключ, отпечаток]."""
+        return [
+            [key, fingerprint_] for key, fingerprint_
+            in self._fingerprints.items()
+        ]
+
+    def restore(self, items):
+        """Заменяет состояние сохранённым методом snapshot()."""
+        self._fingerprints = {
+            key: fingerprint_ if isinstance(fingerprint_, int)
+            else tuple(fingerprint_)
+            for key, fingerprint_ in items
+        }
+
+    def diff(self, homeworks, complete=False, newer_only=False):
+        """Сравнивает список работ с сохранённым состоянием и обновляет его.
+
+        Возвращает список ChangeEvent в порядке следования работ в
+        ответе API. complete=True означает, что homeworks - полный список
+        работ арендатора, и отсутствующие в нём работы считаются
+        удалёнными; для инкрементального ответа (изменения с from_date)
+        удаления не определяются. newer_only=True пропускает работы,
+        время изменения которых раньше сохранённого (например,
+        запоздавшие или повторно присланные уведомления).
+        """
+        events = []
+        seen = set()
+        for homework in homeworks:
+            key = homework_key(homework)
+            seen.add(key)
+            new_fingerprint = fingerprint(homework)
+            old_fingerprint = self._fingerprints.get(key)
+            if old_fingerprint == new_fingerprint:
+                continue
+            if newer_only and self._is_older(new_fingerprint,
+                                             old_fingerprint):
+                continue
+            self._fingerprints[key] = new_fingerprint
+            if old_fingerprint is None:
+                kind = ChangeKind.NEW
+            else:
+                kind = ChangeKind.STATUS_CHANGED
+            events.append(ChangeEvent(kind, key, homework))
+        if complete:
+            for key in self._fingerprints.keys() - seen:
+                del self._fingerprints[key]
+                events.append(ChangeEvent(ChangeKind.REMOVED, key, None))
+        return events
+
+    @staticmethod
+    def _is_older(new_fingerprint, old_fingerprint):
+        """Изменена ли работа раньше, чем в сохранённом отпечатке."""
+        if old_fingerprint is None:
+            return False
+        new_time = updated_at(new_fingerprint)
+        old_time = updated_at(old_fingerprint)
+        return (new_time is not None and old_time is not None
+                and new_time < old_time)
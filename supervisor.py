@@ -0,0 +1,140 @@
+"""Перезапуск задач опроса арендаторов после ошибок."""
+import logging
+import time
+from collections import deque
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Первый перезапуск - через RESTART_DELAY секунд, каждый следующий
+# подряд - в BACKOFF раз позже, но не позже MAX_RESTART_DELAY. Если
+# за RESTART_WINDOW секунд опрос падает больше MAX_RESTARTS раз,
+# арендатор помещается в карантин на QUARANTINE_TIME секунд.
+RESTART_DELAY = 5
+MAX_RESTART_DELAY = 300
+BACKOFF = 2
+MAX_RESTARTS = 5
+RESTART_WINDOW = 3600
+QUARANTINE_TIME = 3600
+
+RESTARTS = REGISTRY.counter(
+    'homework_bot_tenant_restarts_total',
+    'Перезапуски опроса арендаторов после ошибок.',
+)
+QUARANTINES = REGISTRY.counter(
+    'homework_bot_tenant_quarantines_total',
+    'Помещения арендаторов в карантин.',
+)
+QUARANTINED = REGISTRY.gauge(
+    'homework_bot_tenants_quarantined', 'Арендаторы в карантине.',
+)
+
+
+class _TenantRecord:
+    """История ошибок опроса одного арендатора."""
+
+    __slots__ = ('failures', 'delay', 'restarts', 'quarantined')
+
+    def __init__(self, delay):
+        self.failures = deque()
+        self.delay = delay
+        self.restarts = 0
+        self.quarantined = False
+
+
+class Supervisor:
+    """Решает, когда перезапустить опрос арендатора после ошибки.
+
+    Ошибка опроса одного арендатора не останавливает ни процесс, ни
+    задачу арендатора: record_failure() возвращает паузу, после
+    которой опрос нужно повторить. Паузы растут экспоненциально, пока
+    опрос не пройдёт успешно (record_success()). Арендатор, опрос
+    которого падает больше max_restarts раз за window секунд,
+    помещается в карантин: следующая попытка - через quarantine_time
+    секунд. Успешный опрос после карантина возвращает арендатора в
+    обычный режим. Методы вызываются из цикла asyncio движка.
+    """
+
+    def __init__(self, restart_delay=RESTART_DELAY,
+                 max_restart_delay=MAX_RESTART_DELAY, backoff=BACKOFF,
+                 max_restarts=MAX_RESTARTS, window=RESTART_WINDOW,
+                 quarantine_time=QUARANTINE_TIME, clock=time.monotonic):
+        """Инициализация без истории ошибок."""
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.backoff = backoff
+        self.max_restarts = max_restarts
+        self.window = window
+        self.quarantine_time = quarantine_time
+        self.clock = clock
+        self._records = {}
+
+    def record_failure(self, key):
+        """Учитывает ошибку опроса арендатора key.
+
+        Возвращает паузу в секундах до следующей попытки.
+        """
+        record = self._records.get(key)
+        if record is None:
+            record = self._records[key] = _TenantRecord(self.restart_delay)
+        self._release(record)
+        now = self.clock()
+        failures = record.failures
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        failures.append(now)
+        if len(failures) > self.max_restarts:
+            failures.clear()
+            record.delay = self.restart_delay
+            record.quarantined = True
+            QUARANTINES.inc()
+            QUARANTINED.inc()
+            logger.error(
+                'Арендатор %s помещён в карантин на %s с: опрос падает '
+                'слишком часто.', key, self.quarantine_time,
+            )
+            return self.quarantine_time
+        delay = record.delay
+        record.delay = min(delay * self.backoff, self.max_restart_delay)
+        record.restarts += 1
+        RESTARTS.inc()
+        return delay
+
+    def record_success(self, key):
+        """Учитывает успешный опрос арендатора key."""
+        record = self._records.get(key)
+        if record is None:
+            return
+        if record.quarantined:
+            logger.info('Арендатор %s выведен из карантина.', key)
+        self._release(record)
+        record.delay = self.restart_delay
+
+    def restarts(self, key):
+        """Число перезапусков опроса арендатора key."""
+        record = self._records.get(key)
+        return 0 if record is None else record.restarts
+
+    def quarantined(self):
+        """Ключи арендаторов в карантине."""
+        return [
+            key for key, record in self._records.items()
+            if record.quarantined
+        ]
+
+    def stats(self):
+        """Сводка перезапусков для логов."""
+        return {
+            'restarts': sum(
+                record.restarts for record in self._records.values()
+            ),
+            'quarantined': len(self.quarantined()),
+        }
+
+    @staticmethod
+    def _release(record):
+        """Снимает с арендатора отметку о карантине."""
+        if record.quarantined:
+            record.quarantined = False
+            QUARANTINED.dec()
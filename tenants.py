@@ -0,0 +1,70 @@
+"""Арендаторы бота: пары (токен API Практикума, чат Telegram)."""
+import hashlib
+import json
+import sys
+import threading
+from dataclasses import dataclass, field
+
+from error_tracker import ErrorTracker
+from http_client import ConditionalState
+from render import DEFAULT_LOCALE
+from state_store import HomeworkStateStore
+
+# Арендаторов могут быть сотни тысяч: с Python 3.10 их атрибуты
+# хранятся в __slots__, без словаря __dict__ у каждого объекта.
+SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**SLOTS)
+class Tenant:
+    """Арендатор бота.
+
+    Хранит токен API Практикум.Домашка, чат, в который отправляются
+    уведомления, и состояние опроса, принадлежащее только этому
+    арендатору.
+    """
+
+    practicum_token: str = field(repr=False)
+    chat_id: str
+    locale: str = field(default=DEFAULT_LOCALE, repr=False)
+    homeworks: HomeworkStateStore = field(
+        default_factory=HomeworkStateStore, repr=False
+    )
+    errors: ErrorTracker = field(default_factory=ErrorTracker, repr=False)
+    from_date: int = field(default=0, repr=False)
+    last_status: str = field(default=None, repr=False)
+    idle_polls: int = field(default=0, repr=False)
+    conditional: ConditionalState = field(
+        default_factory=ConditionalState, repr=False
+    )
+    key: str = field(init=False)
+    lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        """Вычисляет короткий ключ арендатора, не раскрывающий токен."""
+        raw = f'{self.practicum_token}:{self.chat_id}'.encode()
+        self.key = hashlib.sha256(raw).hexdigest()[:12]
+
+
+def load_tenants(path=None, practicum_token=None, chat_id=None):
+    """Возвращает список арендаторов.
+
+    Если указан путь к JSON-файлу, арендаторы читаются из него: файл
+    содержит список объектов с ключами practicum_token, chat_id и
+    необязательным locale - языком уведомлений.
+    Иначе возвращается единственный арендатор из переданных токена и
+    чата (переменные окружения PRACTICUM_TOKEN и TELEGRAM_CHAT_ID).
+    """
+    if not path:
+        return [Tenant(practicum_token, chat_id)]
+    with open(path, encoding='utf-8') as file:
+        records = json.load(file)
+    return [
+        Tenant(
+            record['practicum_token'], record['chat_id'],
+            record.get('locale', DEFAULT_LOCALE),
+        )
+        for record in records
+    ]
@@ -0,0 +1,32 @@
+from benchmarks.bench_memory import run_benchmark as run_memory_benchmark
+from benchmarks.bench_pipeline import run_benchmark
+from benchmarks.bench_startup import run_benchmark as run_startup_benchmark
+
+
+class TestBenchmarks:
+
+    def test_pipeline_benchmark_smoke(self):
+        result = run_benchmark(tenants_count=5, duration=0.2,
+                               concurrency=2, api_error_rate=0.1)
+        assert result['polls_per_second'] > 0, (
+            'Бенчмарк должен выполнять циклы опроса'
+        )
+        assert result['sends_per_second'] > 0
+        assert result['p50_cycle_ms'] <= result['p99_cycle_ms']
+        assert result['memory_per_tenant_bytes'] > 0
+
+    def test_startup_benchmark_smoke(self):
+        result = run_startup_benchmark(repeat=1, top=3)
+        assert result['import_ms'] > 0
+        assert result['heavy_modules'] == [], (
+            'Импорт homework не должен загружать telegram, requests, '
+            'dotenv и asyncio'
+        )
+        assert len(result['slowest']) == 3
+
+    def test_memory_benchmark_smoke(self):
+        result = run_memory_benchmark(tenants_count=200, homeworks=5)
+        assert 0 < result['tenant_bytes'] < result['bytes_per_tenant']
+        assert result['state_bytes'] < 1200, (
+            'Состояние арендатора не должно хранить ответы API целиком'
+        )
@@ -0,0 +1,36 @@
+import telegram
+
+from bot_client import BotClientManager
+
+
+class FakeBot:
+
+    def __init__(self, token=None, base_url=None, request=None):
+        self.token = token
+        self.request = request
+
+
+class TestBotClientManager:
+
+    def test_bot_is_created_once(self, monkeypatch):
+        monkeypatch.setattr(telegram, 'Bot', FakeBot)
+        manager = BotClientManager(con_pool_size=2)
+        first = manager.get_bot('1234:abcdefg')
+        second = manager.get_bot('1234:abcdefg')
+        assert first is second, (
+            'Клиент Bot для одного токена должен создаваться один раз'
+        )
+
+    def test_bots_share_connection_pool(self, monkeypatch):
+        monkeypatch.setattr(telegram, 'Bot', FakeBot)
+        manager = BotClientManager(con_pool_size=2)
+        first = manager.get_bot('1234:abcdefg')
+        second = manager.get_bot('5678:hijklmn')
+        assert first is not second
+        assert first.request is second.request, (
+            'Клиенты Bot должны использовать общий пул соединений'
+        )
+        manager.close()
+        assert manager.get_bot('1234:abcdefg') is not first, (
+            'После close() менеджер должен создавать новых клиентов'
+        )
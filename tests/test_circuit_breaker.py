@@ -0,0 +1,99 @@
+import pytest
+
+import homework
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from cursor_store import CursorStore
+from tenants import Tenant
+from utils import FakeClock
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_consecutive_failures(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10,
+                                 clock=clock)
+        for _ in range(2):
+            assert breaker.allow()
+            breaker.record_failure()
+        breaker.record_success()
+        for _ in range(3):
+            breaker.record_failure()
+        assert breaker.state is CircuitState.OPEN, (
+            'Выключатель должен размыкаться после серии сбоев подряд'
+        )
+        assert not breaker.allow()
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+
+    def test_half_open_probe_and_backoff(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10,
+                                 max_reset_timeout=30, backoff=2,
+                                 clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        assert breaker.available()
+        assert breaker.allow(), 'После паузы нужен пробный запрос'
+        assert not breaker.allow(), 'Пробный запрос должен быть один'
+        breaker.record_failure()
+        assert breaker.retry_after() == 20, (
+            'Неудачная проба должна увеличивать паузу'
+        )
+        clock.now = 30
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.retry_after() == 30, 'Пауза ограничена сверху'
+        clock.now = 60
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state is CircuitState.CLOSED
+        breaker.record_failure()
+        assert breaker.retry_after() == 10, (
+            'Успешная проба должна сбрасывать паузу'
+        )
+
+
+class CountingClient:
+
+    def __init__(self):
+        self.requests = 0
+
+    def get(self, *args, **kwargs):
+        self.requests += 1
+        raise OSError('Connection refused')
+
+
+class Bot:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None):
+        self.sent.append(text)
+
+
+def test_outage_does_not_stop_polling(monkeypatch, tmp_path):
+    client = CountingClient()
+    monkeypatch.setattr(homework, 'api_client', client)
+    monkeypatch.setattr(homework, 'api_breaker',
+                        CircuitBreaker(failure_threshold=2))
+    cursors = CursorStore(str(tmp_path / 'state.sqlite3'))
+    tenants = [Tenant(f'token-{number}', number, conditional=None)
+               for number in range(10)]
+    bot = Bot()
+    for tenant in tenants:
+        homework.poll_tenant(tenant, bot, cursors)
+    cursors.close()
+    assert client.requests == 2, (
+        'При разомкнутом выключателе запросы к API не должны выполняться'
+    )
+    assert len([text for text in bot.sent if 'соединения' in text]) == 2
+
+
+def test_api_error_does_not_print(capsys):
+    error = homework.APIResponseError('Код - 500.', transient=True)
+    assert 'Код - 500.' in str(error)
+    assert capsys.readouterr().out == '', (
+        'Ошибки запроса к API не должны печатать в stdout мимо логов'
+    )
@@ -0,0 +1,20 @@
+from cursor_store import CursorStore
+
+
+class TestCursorStore:
+
+    def test_cursor_survives_restart(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        store = CursorStore(path)
+        assert store.get('tenant', 100) == 100, (
+            'Для нового арендатора должен возвращаться курсор по умолчанию'
+        )
+        store.set('tenant', 1646906700)
+        store.set('tenant', 1646907000)
+        store.close()
+
+        store = CursorStore(path)
+        assert store.get('tenant') == 1646907000, (
+            'После перезапуска должен читаться последний сохранённый курсор'
+        )
+        store.close()
@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+from engine import PollingEngine
+from scheduler import PollScheduler
+from supervisor import Supervisor
+from tenants import Tenant
+
+
+def fixed_scheduler(interval):
+    return PollScheduler(default_interval=interval, status_intervals={},
+                         jitter=0, spread_start=False)
+
+
+def run_engine_for(engine, seconds):
+    async def runner():
+        try:
+            await asyncio.wait_for(engine.run(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(runner())
+
+
+class TestPollingEngine:
+
+    def test_slow_tenant_does_not_delay_others(self):
+        calls = []
+
+        def poll(tenant):
+            calls.append(tenant.chat_id)
+            if tenant.chat_id == 'slow':
+                time.sleep(0.5)
+
+        tenants = [Tenant('token-1', 'slow'), Tenant('token-2', 'fast')]
+        engine = PollingEngine(tenants, poll, fixed_scheduler(0.02),
+                               max_concurrency=2)
+        run_engine_for(engine, 0.3)
+        assert calls.count('slow') == 1, (
+            'Медленный арендатор должен успеть выполнить один цикл опроса'
+        )
+        assert calls.count('fast') > 3, (
+            'Медленный арендатор не должен задерживать опрос остальных'
+        )
+
+    def test_failed_tenant_is_isolated(self):
+        calls = []
+
+        def poll(tenant):
+            calls.append(tenant.chat_id)
+            if tenant.chat_id == 'bad':
+                raise ValueError('Сломанный ответ API')
+
+        tenants = [Tenant('token-1', 'bad'), Tenant('token-2', 'good')]
+        engine = PollingEngine(tenants, poll, fixed_scheduler(0.02),
+                               max_concurrency=2)
+        run_engine_for(engine, 0.2)
+        assert calls.count('bad') == 1, (
+            'Опрос арендатора с ошибкой должен остановиться'
+        )
+        assert calls.count('good') > 3, (
+            'Ошибка одного арендатора не должна останавливать остальных'
+        )
+
+    def test_supervisor_restarts_failed_tenant(self):
+        calls = []
+
+        def poll(tenant):
+            calls.append(tenant.chat_id)
+            if tenant.chat_id == 'bad' and calls.count('bad') < 3:
+                raise ValueError('Сломанный ответ API')
+
+        supervisor = Supervisor(restart_delay=0.01, max_restart_delay=0.02)
+        tenants = [Tenant('token-1', 'bad'), Tenant('token-2', 'good')]
+        engine = PollingEngine(tenants, poll, fixed_scheduler(0.02),
+                               max_concurrency=2, supervisor=supervisor)
+        run_engine_for(engine, 0.3)
+        assert calls.count('bad') > 3, (
+            'После ошибок опрос арендатора должен перезапускаться'
+        )
+        assert supervisor.restarts(tenants[0].key) == 2
+        assert supervisor.restarts(tenants[1].key) == 0
+
+    def test_stop_finishes_polls_and_runs_shutdown(self):
+        events = []
+
+        def poll(tenant):
+            events.append('poll-start')
+            time.sleep(0.1)
+            events.append('poll-end')
+
+        async def flush():
+            events.append('flush')
+
+        async def service():
+            try:
+                await asyncio.sleep(10)
+            finally:
+                events.append('service-stopped')
+
+        engine = PollingEngine([Tenant('token', 1)], poll,
+                               fixed_scheduler(60), max_concurrency=1,
+                               background=[service], shutdown=[flush])
+
+        async def runner():
+            task = asyncio.create_task(engine.run())
+            await asyncio.sleep(0.05)
+            engine.stop()
+            await asyncio.wait_for(task, 1)
+
+        started = time.monotonic()
+        asyncio.run(runner())
+        assert time.monotonic() - started < 1, (
+            'После stop() движок не должен ждать следующего опроса'
+        )
+        assert events == ['poll-start', 'poll-end', 'flush',
+                          'service-stopped'], (
+            'Начатый опрос нужно завершить, а фоновые службы остановить '
+            'после функций shutdown'
+        )
+
+    def test_failed_background_service_restarts(self, monkeypatch):
+        monkeypatch.setattr('engine.SERVICE_RESTART_DELAY', 0.01)
+        runs = []
+
+        async def service():
+            runs.append(len(runs))
+            if len(runs) < 3:
+                raise RuntimeError('служба упала')
+            await asyncio.sleep(10)
+
+        engine = PollingEngine([Tenant('token', 1)], lambda tenant: None,
+                               fixed_scheduler(60), background=[service])
+        run_engine_for(engine, 0.2)
+        assert len(runs) == 3, (
+            'Упавшая фоновая служба должна перезапускаться'
+        )
+
+    def test_tenant_key_hides_token(self):
+        tenant = Tenant('secret-token', '12345')
+        assert 'secret-token' not in repr(tenant), (
+            'Токен арендатора не должен попадать в repr и логи'
+        )
+        assert tenant.key == Tenant('secret-token', '12345').key, (
+            'Ключ арендатора должен быть стабильным'
+        )
@@ -0,0 +1,62 @@
+from error_tracker import ErrorTracker
+from utils import FakeClock
+
+
+class TestErrorTracker:
+
+    def test_repeats_are_suppressed_and_rolled_up(self):
+        clock = FakeClock()
+        tracker = ErrorTracker(window=3600, rollup_interval=3600, clock=clock)
+        first = 'Ошибка запроса к API. Код не равен 200. Код - 500.'
+        assert tracker.record('HTTPStatus', 'api', first) == first, (
+            'О первом появлении ошибки нужно сообщать сразу'
+        )
+        for _ in range(57):
+            clock.now += 60
+            assert tracker.record(
+                'HTTPStatus', 'api',
+                'Ошибка запроса к API. Код не равен 200. Код - 503.'
+            ) is None, (
+                'Повторы ошибки, отличающиеся только числами, не отправляются'
+            )
+        assert tracker.rollups() == [], (
+            'Сводка отправляется не чаще раза в rollup_interval'
+        )
+        clock.now = 3600
+        rollups = tracker.rollups()
+        assert len(rollups) == 1
+        assert 'повторилась 57 раз' in rollups[0], (
+            'Сводка должна содержать число подавленных повторов'
+        )
+        assert tracker.rollups() == []
+
+    def test_status_codes_are_not_merged(self):
+        tracker = ErrorTracker()
+        outage = 'Ошибка запроса к API. Код не равен 200. Код - 500.'
+        revoked = 'Ошибка запроса к API. Код не равен 200. Код - 401.'
+        assert tracker.record('HTTPStatus', 'api', outage)
+        assert tracker.record('HTTPStatus', 'api', revoked) == revoked, (
+            'Ошибка с другим кодом ответа должна сообщаться сразу'
+        )
+        assert tracker.record(
+            'HTTPStatus', 'api', 'Таймаут 12.5 с, запрос 1650000000'
+        )
+        assert tracker.record(
+            'HTTPStatus', 'api', 'Таймаут 30.1 с, запрос 1650000042'
+        ) is None
+
+    def test_error_is_forgotten_after_window(self):
+        clock = FakeClock()
+        tracker = ErrorTracker(window=600, clock=clock)
+        assert tracker.record('TypeError', 'poll', 'сломан ответ')
+        clock.now += 601
+        assert tracker.record('TypeError', 'poll', 'сломан ответ'), (
+            'Ошибка, не повторявшаяся дольше окна, сообщается заново'
+        )
+
+    def test_different_sources_are_separate(self):
+        tracker = ErrorTracker()
+        assert tracker.record('KeyError', 'check_response', 'нет ключа')
+        assert tracker.record('KeyError', 'parse_status', 'нет ключа'), (
+            'Ошибки из разных источников не должны сливаться'
+        )
@@ -0,0 +1,89 @@
+import json
+import logging
+
+import event_log
+from event_log import EventLog, EventLogHandler
+from utils import FakeClock
+
+DAY = 24 * 3600
+# 2026-10-12 00:00:00 UTC
+MONDAY = 1791763200
+
+
+def fill(directory):
+    clock = FakeClock(MONDAY)
+    log = EventLog(directory, clock=clock)
+    for day in range(3):
+        clock.now = MONDAY + day * DAY + 60
+        log.write('poll', 'tenant-a', result='ok')
+        log.write('change', 'tenant-a', homework=day, status='approved')
+        log.write('change', 'tenant-b', homework=day, status='rejected')
+        log.write('send', chat=1, result='sent')
+    log.close()
+    return log
+
+
+class TestEventLog:
+
+    def test_query_by_time_tenant_and_kind(self, tmp_path):
+        log = fill(str(tmp_path))
+        assert len(log.days()) == 3, 'Записи должны делиться по суткам'
+        changes = list(log.query(tenant='tenant-a', kinds=['change']))
+        assert [record['homework'] for record in changes] == [0, 1, 2]
+        recent = list(log.query(since=MONDAY + DAY, tenant='tenant-b'))
+        assert [record['homework'] for record in recent] == [1, 2]
+        assert len(list(log.query(until=MONDAY + DAY))) == 4
+        assert list(log.query(tenant='unknown')) == []
+
+    def test_truncated_record_is_skipped(self, tmp_path):
+        log = fill(str(tmp_path))
+        segment = tmp_path / '2026-10-14.jsonl'
+        with open(segment, 'ab') as file:
+            file.write(b'{"t":1791936000,"k":"pol')
+        assert len(list(log.query(since=MONDAY + 2 * DAY))) == 4
+        log = EventLog(str(tmp_path), clock=FakeClock(MONDAY + 2 * DAY))
+        log.write('poll', 'tenant-a', result='ok')
+        log.close()
+        assert len(list(log.query(since=MONDAY + 2 * DAY))) == 5, (
+            'Новая запись не должна склеиваться с недописанной'
+        )
+
+    def test_old_segments_are_pruned(self, tmp_path):
+        fill(str(tmp_path))
+        log = EventLog(str(tmp_path), retention_days=1,
+                       clock=FakeClock(MONDAY + 2 * DAY))
+        assert [day.isoformat() for day in log.days()] == [
+            '2026-10-13', '2026-10-14'
+        ]
+
+    def test_handler_writes_events_and_warnings(self, tmp_path):
+        log = EventLog(str(tmp_path))
+        handler = EventLogHandler(log)
+        logger = logging.getLogger('test_event_log')
+        logger.propagate = False
+        logger.addHandler(handler)
+        events = logging.getLogger(event_log.LOGGER_NAME)
+        events.addHandler(handler)
+        events.setLevel(logging.INFO)
+        try:
+            event_log.emit('change', 'tenant-a', homework=1)
+            logger.info('Обычная запись')
+            logger.warning('Предупреждение %s', 1)
+        finally:
+            events.removeHandler(handler)
+            events.setLevel(logging.NOTSET)
+            logger.removeHandler(handler)
+            handler.close()
+        records = list(log.query())
+        assert [record['k'] for record in records] == ['change', 'log']
+        assert records[0]['tenant'] == 'tenant-a'
+        assert records[1]['message'] == 'Предупреждение 1'
+
+    def test_cli(self, tmp_path, capsys):
+        fill(str(tmp_path))
+        event_log.main(['--dir', str(tmp_path), '--tenant', 'tenant-a',
+                        '--kind', 'change', '--since', '2026-10-13'])
+        lines = capsys.readouterr().out.splitlines()
+        assert [json.loads(line)['homework'] for line in lines] == [1, 2]
+        event_log.main(['--dir', str(tmp_path), '--count'])
+        assert capsys.readouterr().out.strip() == '12'
@@ -0,0 +1,100 @@
+import itertools
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_client import NOT_MODIFIED, ConditionalState, HTTPClient
+
+
+CLOCK = itertools.count(1646906700)
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    etag = None
+
+    def do_GET(self):
+        if self.etag and self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = (
+            '{"homeworks": [], "current_date": %d}' % next(CLOCK)
+        ).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if self.etag:
+            self.send_header('ETag', self.etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    KeepAliveHandler.etag = None
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+
+
+class TestHTTPClient:
+
+    def test_connections_are_reused(self, local_server):
+        client = HTTPClient(pool_maxsize=2)
+        for _ in range(5):
+            response = client.get(local_server)
+            assert response.status_code == 200
+        stats = client.stats()
+        client.close()
+        assert stats['requests'] == 5, (
+            'Проверьте, что счётчик запросов учитывает все запросы'
+        )
+        assert stats['connections'] == 1, (
+            'Последовательные запросы должны идти через одно соединение'
+        )
+        assert stats['reused'] == 4, (
+            'Проверьте подсчёт повторно использованных соединений'
+        )
+
+    def test_unchanged_body_is_short_circuited(self, local_server):
+        client = HTTPClient()
+        state = ConditionalState()
+        volatile = re.compile(rb'"current_date"\s*:\s*\d+')
+        response = client.get_conditional(local_server, state, volatile)
+        assert response is not NOT_MODIFIED
+        assert client.get_conditional(
+            local_server, state, volatile
+        ) is not NOT_MODIFIED, (
+            'Пока ответ не обработан (commit), он не считается известным'
+        )
+        state.commit()
+        assert client.get_conditional(
+            local_server, state, volatile
+        ) is NOT_MODIFIED, (
+            'Ответ, отличающийся только current_date, не должен '
+            'обрабатываться повторно'
+        )
+        assert client.stats()['unchanged'] == 1
+        client.close()
+
+    def test_etag_not_modified(self, local_server):
+        KeepAliveHandler.etag = '"v1"'
+        client = HTTPClient()
+        state = ConditionalState()
+        client.get_conditional(local_server, state)
+        state.commit()
+        assert client.get_conditional(local_server, state) is NOT_MODIFIED
+        assert client.stats()['not_modified'] == 1, (
+            'Ответ 304 должен учитываться как пропущенный цикл'
+        )
+        client.close()
@@ -0,0 +1,62 @@
+import logging
+import os
+import queue
+
+from log_config import (BOT_LOGGERS, LazyQueueHandler, PayloadSampler,
+                        TruncatingFormatter, parse_levels)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_record(msg, *args, **extra):
+    record = logging.LogRecord('homework', logging.INFO, __file__, 1,
+                               msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestLogConfig:
+
+    def test_queue_handler_does_not_format(self):
+        records = queue.SimpleQueue()
+        handler = LazyQueueHandler(records)
+        handler.handle(make_record('status_code - %s', 200))
+        record = records.get_nowait()
+        assert record.args == (200,), (
+            'Подстановка аргументов должна выполняться в потоке записи логов'
+        )
+        assert not hasattr(record, 'message')
+
+    def test_long_messages_are_truncated(self):
+        formatter = TruncatingFormatter('%(message)s', max_length=10)
+        result = formatter.format(make_record('%s', 'x' * 100))
+        assert result.startswith('x' * 10 + '...'), (
+            'Длинное сообщение должно обрезаться'
+        )
+        assert 'обрезано 90' in result
+
+    def test_payload_records_are_sampled(self):
+        sampler = PayloadSampler(rate=5)
+        passed = [
+            sampler.filter(make_record('payload', payload=True))
+            for _ in range(10)
+        ]
+        assert passed.count(True) == 2, (
+            'Должна проходить только каждая n-я запись с ответом API'
+        )
+        assert sampler.filter(make_record('обычная запись'))
+
+    def test_parse_levels(self):
+        assert parse_levels('engine=debug, homework=INFO,') == {
+            'engine': 'DEBUG', 'homework': 'INFO'
+        }
+
+    def test_every_module_logger_is_configured(self):
+        modules = {
+            name[:-3] for name in os.listdir(ROOT) if name.endswith('.py')
+        }
+        # Без своего логгера или с логгером, настроенным отдельно.
+        modules -= {'log_config', 'event_log', 'mycustomerror'}
+        assert modules <= set(BOT_LOGGERS), (
+            'Логгеры всех модулей бота должны получать уровень LOG_LEVEL'
+        )
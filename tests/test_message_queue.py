@@ -0,0 +1,146 @@
+import asyncio
+
+from telegram.error import RetryAfter
+
+from message_queue import OutboundQueue, TokenBucket
+from utils import FakeClock
+
+HEARTBEAT = 'Статус работы прежний.'
+HEARTBEATS = ('Проверяем статус работы', HEARTBEAT, 'Держись боец!')
+
+
+def drain(queue, seconds):
+    async def runner():
+        task = asyncio.create_task(queue.run())
+        await asyncio.sleep(seconds)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(runner())
+
+
+class TestOutboundQueue:
+
+    def test_duplicates_and_heartbeats_are_coalesced(self):
+        sent = []
+        queue = OutboundQueue(lambda chat_id, text: sent.append(text),
+                              heartbeats=[HEARTBEAT], chat_rate=100)
+        assert queue.send_message(chat_id=1, text='Изменился статус')
+        assert not queue.send_message(chat_id=1, text='Изменился статус'), (
+            'Повтор ждущего отправки сообщения должен сливаться'
+        )
+        assert not queue.send_message(chat_id=1, text=HEARTBEAT), (
+            'Служебное сообщение не нужно, если в чат уже что-то ждёт'
+        )
+        assert queue.send_message(chat_id=2, text=HEARTBEAT)
+        drain(queue, 0.1)
+        assert sorted(sent) == sorted(['Изменился статус', HEARTBEAT])
+        assert queue.stats['coalesced'] == 2
+        assert len(queue) == 0
+        assert queue, (
+            'Пустая очередь должна оставаться истинной: send_message '
+            'отклоняет ложный объект bot'
+        )
+
+    def test_idle_cycles_send_one_heartbeat_per_interval(self):
+        sent = []
+        clock = FakeClock()
+        queue = OutboundQueue(lambda chat_id, text: sent.append(text),
+                              heartbeats=HEARTBEATS, chat_rate=100,
+                              heartbeat_interval=3600, clock=clock)
+
+        async def idle_cycles():
+            task = asyncio.create_task(queue.run())
+            for _ in range(7):
+                # Цикл опроса без изменений.
+                for text in HEARTBEATS:
+                    queue.send_message(chat_id=1, text=text)
+                await queue.flush(1)
+                clock.now += 600
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(idle_cycles())
+        assert sent == [HEARTBEATS[0], HEARTBEATS[0]], (
+            'Без изменений в чат уходит не больше одного служебного '
+            'сообщения за интервал'
+        )
+
+    def test_int_and_str_chat_id_share_queue(self):
+        sent = []
+        queue = OutboundQueue(lambda chat_id, text: sent.append(chat_id),
+                              heartbeats=[HEARTBEAT], chat_rate=100)
+        assert queue.send_message(chat_id='42', text='Изменился статус')
+        assert not queue.send_message(chat_id=42, text=HEARTBEAT), (
+            'Чат-число и чат-строка должны быть одним чатом'
+        )
+        assert len(queue) == 1
+        drain(queue, 0.1)
+        assert sent == ['42']
+
+    def test_sends_are_logged_with_tenant(self, monkeypatch):
+        events = []
+        monkeypatch.setattr('message_queue.emit',
+                            lambda kind, tenant=None, **fields:
+                            events.append((kind, tenant)))
+        queue = OutboundQueue(lambda chat_id, text: None, chat_rate=100,
+                              tenants={1: 'tenant-a'})
+        queue.send_message(chat_id=1, text='Изменился статус')
+        queue.send_message(chat_id='2', text='Изменился статус',
+                           tenant='tenant-b')
+        drain(queue, 0.1)
+        assert sorted(events) == [('send', 'tenant-a'),
+                                  ('send', 'tenant-b')], (
+            'Отправки должны попадать в журнал с ключом арендатора'
+        )
+
+    def test_retry_after_resends_message(self):
+        calls = []
+
+        def send(chat_id, text):
+            calls.append(text)
+            if len(calls) == 1:
+                raise RetryAfter(0.05)
+
+        queue = OutboundQueue(send, chat_rate=100)
+        queue.send_message(chat_id=1, text='первое')
+        queue.send_message(chat_id=1, text='второе')
+        drain(queue, 0.3)
+        assert calls == ['первое', 'первое', 'второе'], (
+            'После RetryAfter сообщение должно быть отправлено повторно, '
+            'не нарушая порядок сообщений в чате'
+        )
+        assert queue.stats['retry_after'] == 1
+
+    def test_flush_waits_for_pending_messages(self):
+        sent = []
+        queue = OutboundQueue(lambda chat_id, text: sent.append(text),
+                              chat_rate=20)
+
+        async def runner():
+            task = asyncio.create_task(queue.run())
+            for number in range(3):
+                queue.send_message(chat_id=1, text=str(number))
+            left = await queue.flush(timeout=1)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return left
+
+        assert asyncio.run(runner()) == 0
+        assert sent == ['0', '1', '2'], (
+            'При остановке очередь должна отправить все ждущие сообщения'
+        )
+
+
+class TestTokenBucket:
+
+    def test_bucket_limits_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+        assert bucket.take() == 0
+        assert bucket.take() == 0
+        assert bucket.take() == 0.5, (
+            'Пустое ведро должно сообщать время ожидания токена'
+        )
+        clock.now += 0.5
+        assert bucket.take() == 0
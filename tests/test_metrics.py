@@ -0,0 +1,61 @@
+import urllib.request
+
+import pytest
+
+from metrics import Registry, start_http_server
+
+
+class TestRegistry:
+
+    def test_counter_and_gauge_exposition(self):
+        registry = Registry()
+        polls = registry.counter('polls_total', 'Опросы.', ['result'])
+        polls.labels('ok').inc()
+        polls.labels(result='ok').inc(2)
+        depth = registry.gauge('queue_depth', 'Очередь.')
+        depth.set_function(lambda: 7)
+        text = registry.render()
+        assert '# TYPE polls_total counter' in text
+        assert 'polls_total{result="ok"} 3' in text, (
+            'Счётчик с метками должен выводиться в формате Prometheus'
+        )
+        assert 'queue_depth 7' in text, (
+            'Измеритель должен вычисляться функцией в момент сбора'
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        latency = registry.histogram(
+            'latency_seconds', 'Задержка.', ['code'], buckets=(0.1, 1),
+        )
+        for value in (0.05, 0.5, 5):
+            latency.labels(200).observe(value)
+        text = registry.render()
+        assert 'latency_seconds_bucket{code="200",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{code="200",le="1.0"} 2' in text
+        assert 'latency_seconds_bucket{code="200",le="+Inf"} 3' in text
+        assert 'latency_seconds_count{code="200"} 3' in text
+        assert 'latency_seconds_sum{code="200"} 5.55' in text
+
+    def test_registration_is_idempotent(self):
+        registry = Registry()
+        first = registry.counter('events_total', 'События.')
+        assert registry.counter('events_total', 'События.') is first
+        with pytest.raises(ValueError):
+            registry.gauge('events_total', 'События.')
+
+
+def test_http_endpoint():
+    registry = Registry()
+    registry.counter('events_total', 'События.').inc()
+    server = start_http_server(0, host='127.0.0.1', registry=registry)
+    try:
+        url = f'http://127.0.0.1:{server.server_port}/metrics'
+        with urllib.request.urlopen(url, timeout=5) as response:
+            body = response.read().decode()
+            content_type = response.headers['Content-Type']
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert content_type.startswith('text/plain; version=0.0.4')
+    assert 'events_total 1' in body
@@ -0,0 +1,146 @@
+import asyncio
+
+import homework
+from message_queue import OutboundQueue
+from outbox import MAX_ATTEMPTS, Outbox, OutboxDispatcher
+from state_store import ChangeEvent, ChangeKind
+from tenants import Tenant
+
+HOMEWORK = {'id': 1, 'homework_name': 'hw', 'status': 'approved',
+            'date_updated': '2022-03-10T10:00:00Z'}
+
+
+def dispatch_for(dispatcher, seconds):
+    async def runner():
+        sender = asyncio.create_task(dispatcher.queue.run())
+        task = asyncio.create_task(dispatcher.run())
+        await asyncio.sleep(seconds)
+        task.cancel()
+        await dispatcher.queue.flush(1)
+        await dispatcher.commit()
+        sender.cancel()
+        await asyncio.gather(task, sender, return_exceptions=True)
+
+    asyncio.run(runner())
+
+
+def notify(tenant, outbox, homework_=HOMEWORK):
+    event = ChangeEvent(ChangeKind.STATUS_CHANGED, homework_['id'],
+                        homework_)
+    homework.notify_changes(tenant, None, [event], outbox)
+
+
+class TestOutbox:
+
+    def test_same_change_is_recorded_once(self, tmp_path):
+        outbox = Outbox(str(tmp_path / 'state.sqlite3'))
+        tenant = Tenant('token', 1)
+        notify(tenant, outbox)
+        notify(tenant, outbox)
+        notify(Tenant('token', 2), outbox)
+        notify(tenant, outbox, {**HOMEWORK, 'status': 'rejected'})
+        assert len(outbox) == 3, (
+            'Изменение работы должно записываться в outbox один раз'
+        )
+        assert tenant.last_status == 'rejected'
+        outbox.close()
+
+    def test_pending_filters_many_tenants(self, tmp_path):
+        outbox = Outbox(str(tmp_path / 'state.sqlite3'))
+        tenants = [Tenant(f'token-{number}', number) for number in range(30)]
+        for tenant in tenants:
+            notify(tenant, outbox)
+        owned = {tenant.key for tenant in tenants[::3]}
+        # Ключей больше, чем параметров в одном запросе SQLite.
+        keys = owned | {f'other-{number}' for number in range(40000)}
+        pending = outbox.pending(limit=4, tenant_keys=keys)
+        assert len(pending) == 4
+        assert {item.tenant_key for item in pending} <= owned
+        rest = outbox.pending(after=pending[-1].id, tenant_keys=keys)
+        assert len(pending) + len(rest) == len(owned), (
+            'Должны выбираться все уведомления своих арендаторов'
+        )
+        assert outbox.pending(tenant_keys=()) == []
+        outbox.close()
+
+    def test_restart_resumes_without_resending(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        tenant = Tenant('token', 1)
+        outbox = Outbox(path)
+        notify(tenant, outbox)
+        sent = []
+        queue = OutboundQueue(lambda chat_id, text: sent.append(text),
+                              chat_rate=100)
+        dispatch_for(OutboxDispatcher(outbox, queue, interval=0.01), 0.1)
+        assert len(sent) == 1 and len(outbox) == 0
+        notify(tenant, outbox, {**HOMEWORK, 'status': 'rejected'})
+        outbox.close()
+        # Перезапуск: то же изменение найдено снова, а записанное до
+        # остановки ещё не отправлено.
+        outbox = Outbox(path)
+        notify(tenant, outbox)
+        notify(tenant, outbox, {**HOMEWORK, 'status': 'rejected'})
+        queue = OutboundQueue(lambda chat_id, text: sent.append(text),
+                              chat_rate=100)
+        dispatch_for(OutboxDispatcher(outbox, queue, interval=0.01), 0.1)
+        assert len(sent) == 2, (
+            'После перезапуска отправленные уведомления не повторяются, '
+            'а неотправленные отправляются'
+        )
+        assert 'замечания' in sent[1]
+        outbox.close()
+
+    def test_failed_notifications_are_retried(self, tmp_path):
+        outbox = Outbox(str(tmp_path / 'state.sqlite3'))
+        notify(Tenant('token', 1), outbox)
+        attempts = []
+
+        def send(chat_id, text):
+            attempts.append(text)
+            raise OSError('Telegram недоступен')
+
+        queue = OutboundQueue(send, chat_rate=100)
+        dispatch_for(OutboxDispatcher(outbox, queue, interval=0.01), 0.3)
+        assert len(attempts) == MAX_ATTEMPTS, (
+            'Неотправленное уведомление повторяется до MAX_ATTEMPTS раз'
+        )
+        assert len(outbox) == 0
+        outbox.close()
+
+    def test_delivered_notification_is_not_requeued(self, tmp_path):
+        outbox = Outbox(str(tmp_path / 'state.sqlite3'))
+        notify(Tenant('token', 1), outbox)
+        notify(Tenant('token', 2), outbox)
+        queued = []
+
+        class Queue:
+
+            def send_message(self, chat_id=None, text=None, on_done=None,
+                             tenant=None):
+                queued.append((chat_id, on_done))
+
+        dispatcher = OutboxDispatcher(outbox, Queue())
+        pending = outbox.pending
+
+        def pending_while_second_is_sent(*args):
+            result = pending(*args)
+            # Второе уведомление отправлено, пока читался журнал.
+            queued[1][1](True)
+            return result
+
+        async def runner():
+            await dispatcher.dispatch()
+            queued[0][1](False)
+            outbox.pending = pending_while_second_is_sent
+            await dispatcher.dispatch()
+            outbox.pending = pending
+            await dispatcher.dispatch()
+
+        asyncio.run(runner())
+        assert [chat_id for chat_id, _ in queued] == ['1', '2', '1'], (
+            'Отправленное уведомление не должно ставиться в очередь, '
+            'пока результат не записан в журнал'
+        )
+        assert len(outbox) == 1
+        outbox.close()
+
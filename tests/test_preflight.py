@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+from os.path import abspath, dirname
+
+ROOT = dirname(dirname(abspath(__file__)))
+TOKENS = {
+    'PRACTICUM_TOKEN': 'token', 'TELEGRAM_TOKEN': '1234:abcdefg',
+    'TELEGRAM_CHAT_ID': '1',
+}
+
+
+def run_check(**env):
+    environ = {
+        name: value for name, value in os.environ.items()
+        if name not in TOKENS and name != 'TENANTS_FILE'
+    }
+    environ.update(env)
+    return subprocess.run(
+        [sys.executable, 'homework.py', '--check'], cwd=ROOT, env=environ,
+        capture_output=True, text=True, timeout=30,
+    )
+
+
+class TestPreflight:
+
+    def test_valid_config(self):
+        completed = run_check(**TOKENS)
+        assert completed.returncode == 0, completed.stderr
+
+    def test_missing_tokens(self):
+        completed = run_check(TELEGRAM_TOKEN='1234:abcdefg')
+        assert completed.returncode == 1
+        assert 'PRACTICUM_TOKEN' in completed.stderr
+        assert 'TELEGRAM_CHAT_ID' in completed.stderr
+
+    def test_bad_tenants_file(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text('[{"chat_id": 1}]')
+        completed = run_check(
+            TELEGRAM_TOKEN='1234:abcdefg', TENANTS_FILE=str(path)
+        )
+        assert completed.returncode == 1
+        assert 'practicum_token' in completed.stderr
@@ -0,0 +1,65 @@
+import threading
+import time
+
+import profiling
+from profiling import STAGE_DURATION, SamplingProfiler, stage
+
+
+def observed(name):
+    return sum(STAGE_DURATION.labels(name).counts)
+
+
+class TestStages:
+
+    def test_stage_is_timed_only_when_enabled(self):
+        @stage('test-stage')
+        def work(value):
+            return value * 2
+
+        before = observed('test-stage')
+        assert work(2) == 4
+        assert observed('test-stage') == before, (
+            'Выключенный замер не должен учитываться'
+        )
+        profiling.enable_stages()
+        try:
+            assert work(3) == 6
+        finally:
+            profiling.enable_stages(False)
+        assert observed('test-stage') == before + 1
+        assert work.__name__ == 'work'
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestSamplingProfiler:
+
+    def test_dumps_collapsed_stacks(self, tmp_path):
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_loop, args=(stop,),
+                                  name='busy')
+        worker.start()
+        profiler = SamplingProfiler(str(tmp_path), interval=0.001)
+        try:
+            assert profiler.toggle() is None and profiler.running
+            time.sleep(0.1)
+            path = profiler.toggle()
+        finally:
+            stop.set()
+            worker.join()
+        assert not profiler.running and profiler.samples > 0
+        with open(path, encoding='utf-8') as file:
+            lines = file.read().splitlines()
+        stacks = dict(line.rsplit(' ', 1) for line in lines)
+        busy = [stack for stack in stacks if stack.startswith('busy;')]
+        assert busy and busy[0].endswith('test_profiling:busy_loop'), (
+            'Стеки должны идти от корня к вершине с именем потока в корне'
+        )
+        assert all(count.isdigit() for count in stacks.values())
+        assert not any('profiler' in stack.split(';')[0]
+                       for stack in stacks), (
+            'Поток профайлера не должен попадать в стеки'
+        )
@@ -0,0 +1,55 @@
+import pytest
+
+from render import Renderer
+
+
+class TestRenderer:
+
+    def test_render_by_locale(self):
+        renderer = Renderer()
+        assert renderer.render('hw', 'approved') == (
+            'Изменился статус проверки работы "hw". '
+            'Работа проверена: ревьюеру всё понравилось. Ура!'
+        )
+        assert renderer.render('hw', 'reviewing', 'en').startswith(
+            'Review status of "hw" has changed.'
+        )
+        assert renderer.render('hw', 'reviewing', 'de') == renderer.render(
+            'hw', 'reviewing'
+        ), 'Для неизвестного языка нужно использовать язык по умолчанию'
+        with pytest.raises(KeyError):
+            renderer.render('hw', 'unknown')
+
+    def test_repeated_renders_are_cached(self):
+        renderer = Renderer()
+        homeworks = [
+            {'homework_name': 'hw1', 'status': 'approved'},
+            {'homework_name': 'hw2', 'status': 'rejected'},
+        ]
+        first = renderer.render_many(homeworks)
+        second = renderer.render_many(homeworks)
+        assert first == second
+        assert len(first) == 2 and 'hw2' in first[1]
+        info = renderer.cache_info()
+        assert (info.hits, info.misses) == (2, 2), (
+            'Одинаковые тексты должны браться из кеша'
+        )
+
+    def test_locale_is_normalized_before_cache(self):
+        renderer = Renderer()
+        text = renderer.render('hw', 'approved')
+        assert renderer.render_many(
+            [{'homework_name': 'hw', 'status': 'approved'}], 'ru'
+        ) == [text]
+        assert renderer.render('hw', 'approved', 'de') == text
+        info = renderer.cache_info()
+        assert (info.hits, info.misses) == (2, 1), (
+            'Текст на основном языке должен кешироваться один раз'
+        )
+
+    def test_template_braces_in_name(self):
+        renderer = Renderer(
+            templates={'ru': '{homework_name}: {verdict}'},
+            verdicts={'ru': {'approved': 'ok'}},
+        )
+        assert renderer.render('{x}', 'approved') == '{x}: ok'
@@ -0,0 +1,42 @@
+import random
+
+from scheduler import PollScheduler
+from tenants import Tenant
+
+
+class TestPollScheduler:
+
+    def test_interval_depends_on_status(self):
+        scheduler = PollScheduler(jitter=0)
+        tenant = Tenant('token', 1)
+        assert scheduler.interval(tenant) == 600
+        tenant.last_status = 'reviewing'
+        reviewing = scheduler.interval(tenant)
+        tenant.last_status = 'approved'
+        approved = scheduler.interval(tenant)
+        assert reviewing < approved, (
+            'Работу на проверке нужно опрашивать чаще принятой'
+        )
+
+    def test_approved_backs_off_up_to_limit(self):
+        scheduler = PollScheduler(max_interval=3600)
+        tenant = Tenant('token', 1, last_status='approved')
+        intervals = []
+        for idle_polls in range(5):
+            tenant.idle_polls = idle_polls
+            intervals.append(scheduler.interval(tenant))
+        assert intervals == sorted(intervals), (
+            'Интервал для принятой работы должен расти без изменений'
+        )
+        assert intervals[-1] == 3600, (
+            'Интервал не должен превышать max_interval'
+        )
+
+    def test_jitter_spreads_delays(self):
+        scheduler = PollScheduler(jitter=0.1, rng=random.Random(1))
+        tenant = Tenant('token', 1)
+        delays = {scheduler.next_delay(tenant) for _ in range(50)}
+        assert len(delays) > 1, 'Задержки должны отличаться'
+        assert all(540 <= delay <= 660 for delay in delays), (
+            'Отклонение задержки не должно превышать jitter'
+        )
@@ -0,0 +1,157 @@
+import threading
+
+from sharding import HashRing, LeaseStore, ShardCoordinator
+from tenants import Tenant
+from utils import FakeClock
+
+
+def coordinator(path, worker_id, tenants, clock):
+    return ShardCoordinator(LeaseStore(path, worker_id, ttl=30, clock=clock),
+                            tenants)
+
+
+def rebalance(coordinators):
+    # Освобождённые одним процессом арендаторы другой берёт при
+    # следующем обновлении аренды.
+    for _ in range(2):
+        for item in coordinators:
+            item.rebalance()
+
+
+def assert_partitioned(coordinators, tenants):
+    owned = [item.owned for item in coordinators]
+    assert sum(len(keys) for keys in owned) == len(tenants), (
+        'Каждого арендатора должен опрашивать ровно один процесс'
+    )
+    assert set().union(*owned) == {tenant.key for tenant in tenants}
+
+
+class TestHashRing:
+
+    def test_adding_node_moves_only_its_keys(self):
+        keys = [f'tenant-{number}' for number in range(1000)]
+        before = HashRing(['a', 'b', 'c'])
+        after = HashRing(['a', 'b', 'c', 'd'])
+        moved = [key for key in keys if before.owner(key) != after.owner(key)]
+        assert all(after.owner(key) == 'd' for key in moved), (
+            'Ключи должны переходить только к новому процессу'
+        )
+        assert 150 < len(moved) < 350
+        assert HashRing().owner('tenant') is None
+
+
+class TestShardCoordinator:
+
+    def test_workers_partition_and_rebalance(self, tmp_path):
+        path = str(tmp_path / 'shards.sqlite3')
+        clock = FakeClock(1000)
+        tenants = [Tenant(f'token-{number}', number) for number in range(50)]
+        first = coordinator(path, 'worker.1', tenants, clock)
+        first.rebalance()
+        assert len(first.owned) == 50
+        second = coordinator(path, 'worker.2', tenants, clock)
+        rebalance([first, second])
+        assert_partitioned([first, second], tenants)
+        assert second.owned, 'Новый процесс должен получить арендаторов'
+        third = coordinator(path, 'worker.3', tenants, clock)
+        rebalance([first, second, third])
+        assert_partitioned([first, second, third], tenants)
+        third.close()
+        rebalance([first, second])
+        assert_partitioned([first, second], tenants)
+
+    def test_lease_of_stopped_worker_expires(self, tmp_path):
+        path = str(tmp_path / 'shards.sqlite3')
+        clock = FakeClock(1000)
+        tenants = [Tenant(f'token-{number}', number) for number in range(20)]
+        released, acquired = [], []
+        first = coordinator(path, 'worker.1', tenants, clock)
+        first.on_release = released.extend
+        second = coordinator(path, 'worker.2', tenants, clock)
+        second.on_acquire = acquired.extend
+        rebalance([first, second])
+        lost = set(first.owned)
+        released.clear()
+        clock.now += 31
+        second.rebalance()
+        assert second.owned == {tenant.key for tenant in tenants}, (
+            'Арендаторов остановившегося процесса должны забрать остальные'
+        )
+        assert lost <= {tenant.key for tenant in acquired}
+        assert not any(
+            first.owns(tenant) and second.owns(tenant) for tenant in tenants
+        ), 'Арендатора не должны опрашивать два процесса сразу'
+        first.rebalance()
+        assert not first.owned and not released, (
+            'Вернувшийся процесс не должен опрашивать перехваченных '
+            'арендаторов'
+        )
+        rebalance([second, first])
+        assert_partitioned([first, second], tenants)
+
+    def test_expired_lease_stops_polling(self, tmp_path):
+        clock = FakeClock(1000)
+        tenants = [Tenant('token-1', 1)]
+        item = coordinator(str(tmp_path / 'shards.sqlite3'), 'worker.1',
+                           tenants, clock)
+        item.rebalance()
+        assert item.owns(tenants[0])
+        clock.now += 24
+        assert item.owns(tenants[0])
+        clock.now += 2
+        assert not item.owns(tenants[0]), (
+            'Процесс без продлённой аренды не должен опрашивать арендатора'
+        )
+        assert item.owned_keys() == frozenset()
+        item.rebalance()
+        assert item.owns(tenants[0])
+
+    def test_owned_only_skips_other_tenants(self, tmp_path):
+        tenants = [Tenant('token-1', 1), Tenant('token-2', 2)]
+        item = coordinator(str(tmp_path / 'shards.sqlite3'), 'worker.1',
+                           tenants[:1], FakeClock(1000))
+        item.rebalance()
+        polled = []
+        poll = item.owned_only(polled.append)
+        for tenant in tenants:
+            poll(tenant)
+        assert polled == tenants[:1]
+
+    def test_release_waits_for_running_poll(self, tmp_path):
+        path = str(tmp_path / 'shards.sqlite3')
+        clock = FakeClock(1000)
+        tenants = [Tenant(f'token-{number}', number) for number in range(20)]
+        first = coordinator(path, 'worker.1', tenants, clock)
+        first.drain_timeout = 0
+        first.rebalance()
+        second = coordinator(path, 'worker.2', tenants, clock)
+        second.rebalance()
+        moving = next(
+            tenant for tenant in tenants
+            if HashRing(['worker.1', 'worker.2']).owner(tenant.key)
+            == 'worker.2'
+        )
+        started, finish = threading.Event(), threading.Event()
+
+        def poll(tenant):
+            started.set()
+            finish.wait(1)
+
+        thread = threading.Thread(target=first.owned_only(poll),
+                                  args=(moving,))
+        thread.start()
+        started.wait(1)
+        released = []
+        first.on_release = released.extend
+        first.rebalance()
+        assert not first.owns(moving) and moving not in released, (
+            'Арендатора нельзя освобождать посреди его опроса'
+        )
+        second.rebalance()
+        assert not second.owns(moving)
+        finish.set()
+        thread.join()
+        first.rebalance()
+        assert moving in released
+        second.rebalance()
+        assert second.owns(moving)
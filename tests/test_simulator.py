@@ -0,0 +1,57 @@
+import pytest
+import requests
+from telegram.error import RetryAfter
+
+from benchmarks.simulator import (API_PATH, PracticumHandler,
+                                  PracticumSimulator, TelegramHandler,
+                                  TelegramSimulator, serve)
+from bot_client import BotClientManager
+
+
+@pytest.fixture
+def simulators():
+    practicum = PracticumSimulator(tenants=3, history=4, seed=1)
+    telegram = TelegramSimulator(seed=1)
+    servers = [serve(PracticumHandler, practicum),
+               serve(TelegramHandler, telegram)]
+    urls = [f'http://127.0.0.1:{server.server_port}' for server in servers]
+    yield practicum, telegram, urls
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class TestSimulator:
+
+    def test_practicum_honors_token_and_from_date(self, simulators):
+        practicum, _, (api_url, _) = simulators
+        url = api_url + API_PATH
+        response = requests.get(url, params={'from_date': 0})
+        assert response.status_code == 401, (
+            'Запрос без токена OAuth должен отклоняться'
+        )
+        headers = {'Authorization': 'OAuth token-1'}
+        response = requests.get(url, headers=headers,
+                                params={'from_date': 0})
+        data = response.json()
+        assert len(data['homeworks']) == 4, (
+            'С from_date=0 возвращается вся история работ'
+        )
+        response = requests.get(url, headers=headers,
+                                params={'from_date': data['current_date']})
+        assert response.json()['homeworks'] == [], (
+            'С from_date=current_date возвращаются только изменения'
+        )
+
+    def test_telegram_stand_in_works_with_bot(self, simulators):
+        _, telegram, (_, bot_url) = simulators
+        manager = BotClientManager(base_url=bot_url + '/bot')
+        bot = manager.get_bot('1234:abcdefg')
+        bot.send_message(chat_id=42, text='Статус работы прежний.')
+        assert telegram.messages == {'42': 1}, (
+            'Имитатор Telegram должен принимать sendMessage от Bot'
+        )
+        telegram.throttle_rate = 1
+        with pytest.raises(RetryAfter):
+            bot.send_message(chat_id=42, text='ещё')
+        manager.close()
@@ -0,0 +1,75 @@
+from snapshot import SnapshotStore
+from tenants import Tenant
+
+
+def make_tenant(from_date):
+    tenant = Tenant('token', 1)
+    tenant.from_date = from_date
+    return tenant
+
+
+class TestSnapshotStore:
+
+    def test_warm_start_restores_state(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        tenant = make_tenant(100)
+        tenant.homeworks.diff([
+            {'id': 1, 'homework_name': 'hw', 'status': 'reviewing',
+             'date_updated': '2022-03-10T10:00:00Z'},
+        ])
+        tenant.last_status = 'reviewing'
+        tenant.idle_polls = 3
+        tenant.conditional.etag = '"abc"'
+        tenant.conditional.body_hash = b'\x01\x02'
+        store = SnapshotStore(path)
+        store.save([tenant])
+        store.close()
+
+        store = SnapshotStore(path)
+        restored = make_tenant(100)
+        assert store.load(restored)
+        store.close()
+        assert 1 in restored.homeworks
+        assert restored.homeworks.diff([
+            {'id': 1, 'homework_name': 'hw', 'status': 'reviewing',
+             'date_updated': '2022-03-10T10:00:00Z'},
+        ]) == [], 'Известное изменение не должно сообщаться повторно'
+        assert (restored.last_status, restored.idle_polls) == (
+            'reviewing', 3
+        )
+        assert restored.conditional.etag == '"abc"'
+        assert restored.conditional.body_hash == b'\x01\x02'
+
+    def test_error_tracker_survives_restart(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        tenant = make_tenant(100)
+        error = 'Ошибка запроса к API. Код не равен 200. Код - 500.'
+        assert tenant.errors.record('HTTPStatus', 'api', error)
+        assert tenant.errors.record('HTTPStatus', 'api', error) is None
+        store = SnapshotStore(path)
+        store.save([tenant])
+        store.close()
+
+        store = SnapshotStore(path)
+        restored = make_tenant(100)
+        assert store.load(restored)
+        store.close()
+        assert restored.errors.record('HTTPStatus', 'api', error) is None, (
+            'Ошибка, о которой сообщили до перезапуска, не должна '
+            'сообщаться снова'
+        )
+        assert restored.errors.snapshot()[0][-1] == 2, (
+            'Счётчик подавленных повторов должен сохраняться'
+        )
+
+    def test_stale_snapshot_is_ignored(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        store = SnapshotStore(path)
+        store.save([make_tenant(100)])
+        tenant = make_tenant(200)
+        assert not store.load(tenant), (
+            'Снимок, сделанный на другом курсоре, устарел'
+        )
+        assert tenant.from_date == 200
+        assert not store.load(Tenant('other', 2))
+        store.close()
@@ -0,0 +1,83 @@
+from state_store import (ChangeKind, HomeworkStateStore, fingerprint,
+                         intern_status)
+
+
+def make_homework(homework_id, status, date_updated='2022-03-10T10:00:00Z'):
+    return {
+        'id': homework_id,
+        'homework_name': f'hw{homework_id}',
+        'status': status,
+        'date_updated': date_updated,
+    }
+
+
+class TestHomeworkStateStore:
+
+    def test_diff_detects_new_and_changed(self):
+        store = HomeworkStateStore()
+        events = store.diff([make_homework(1, 'reviewing'),
+                             make_homework(2, 'reviewing')])
+        assert [event.kind for event in events] == [ChangeKind.NEW] * 2, (
+            'Неизвестные ранее работы должны давать события NEW'
+        )
+
+        events = store.diff([
+            make_homework(1, 'reviewing'),
+            make_homework(2, 'approved', '2022-03-11T10:00:00Z'),
+        ])
+        assert len(events) == 1, (
+            'Событие должно появляться только для изменившейся работы'
+        )
+        assert events[0].kind is ChangeKind.STATUS_CHANGED
+        assert events[0].homework_id == 2, (
+            'Изменение не первой работы в списке не должно теряться'
+        )
+
+    def test_removed_only_for_complete_list(self):
+        store = HomeworkStateStore()
+        store.diff([make_homework(1, 'reviewing'),
+                    make_homework(2, 'approved')])
+        assert store.diff([make_homework(1, 'reviewing')]) == [], (
+            'Инкрементальный ответ не должен давать событий удаления'
+        )
+        events = store.diff([make_homework(1, 'reviewing')], complete=True)
+        assert [(e.kind, e.homework_id) for e in events] == [
+            (ChangeKind.REMOVED, 2)
+        ]
+        assert 2 not in store
+
+    def test_newer_only_skips_older_updates(self):
+        store = HomeworkStateStore()
+        store.diff([make_homework(1, 'approved', '2022-03-11T10:00:00Z')])
+        older = make_homework(1, 'reviewing', '2022-03-10T10:00:00Z')
+        assert store.diff([older], newer_only=True) == [], (
+            'Работа со старым временем изменения не должна менять состояние'
+        )
+        newer = make_homework(1, 'rejected', '2022-03-12T10:00:00Z')
+        assert len(store.diff([newer], newer_only=True)) == 1
+        assert len(store.diff([older])) == 1
+
+    def test_compact_fingerprint(self):
+        packed = fingerprint(make_homework(1, 'approved'))
+        assert isinstance(packed, int), (
+            'Известный статус и время должны упаковываться в одно число'
+        )
+        assert packed != fingerprint(make_homework(1, 'rejected'))
+        assert packed != fingerprint(
+            make_homework(1, 'approved', '2022-03-10T10:00:01Z')
+        )
+        assert fingerprint(make_homework(1, 'on_hold', 'вчера')) == (
+            'on_hold', 'вчера'
+        )
+        store = HomeworkStateStore()
+        store.diff([make_homework(1, 'approved'),
+                    make_homework(2, 'on_hold', None)])
+        restored = HomeworkStateStore()
+        restored.restore(store.snapshot())
+        assert restored.diff([make_homework(1, 'approved'),
+                              make_homework(2, 'on_hold', None)]) == []
+
+    def test_status_is_interned(self):
+        status = ''.join(['appr', 'oved'])
+        assert intern_status(status) is intern_status('approved')
+        assert intern_status('on_hold') == 'on_hold'
@@ -0,0 +1,39 @@
+from supervisor import Supervisor
+from utils import FakeClock
+
+
+class TestSupervisor:
+
+    def test_restart_delay_backs_off_and_resets(self):
+        supervisor = Supervisor(restart_delay=1, max_restart_delay=4,
+                                backoff=2, max_restarts=10,
+                                clock=FakeClock())
+        delays = [supervisor.record_failure('tenant') for _ in range(4)]
+        assert delays == [1, 2, 4, 4], (
+            'Пауза перед перезапуском должна расти до максимума'
+        )
+        supervisor.record_success('tenant')
+        assert supervisor.record_failure('tenant') == 1, (
+            'Успешный опрос должен сбрасывать паузу'
+        )
+        assert supervisor.restarts('tenant') == 5
+        assert supervisor.restarts('other') == 0
+
+    def test_frequent_failures_quarantine_tenant(self):
+        clock = FakeClock()
+        supervisor = Supervisor(restart_delay=1, max_restarts=2, window=60,
+                                quarantine_time=600, clock=clock)
+        supervisor.record_failure('tenant')
+        clock.now = 61
+        supervisor.record_failure('tenant')
+        supervisor.record_failure('tenant')
+        assert supervisor.quarantined() == [], (
+            'Ошибки за пределами окна не должны учитываться'
+        )
+        assert supervisor.record_failure('tenant') == 600
+        assert supervisor.quarantined() == ['tenant']
+        assert supervisor.stats() == {'restarts': 3, 'quarantined': 1}
+        supervisor.record_success('tenant')
+        assert supervisor.quarantined() == [], (
+            'Успешный опрос должен выводить арендатора из карантина'
+        )
@@ -0,0 +1,60 @@
+import pytest
+
+from validators import (MISSING, UNEXPECTED, WRONG_TYPE, Field,
+                        ResponseValidator)
+
+VALIDATOR = ResponseValidator((
+    Field('homework_name', str),
+    Field('status', str, choices=('approved', 'reviewing')),
+    Field('id', int, required=False),
+))
+
+
+class TestResponseValidator:
+
+    def test_collects_errors_of_all_homeworks(self):
+        result = VALIDATOR.validate({
+            'homeworks': [
+                {'homework_name': 'hw1', 'status': 'approved'},
+                {'homework_name': 'hw2'},
+                {'homework_name': 'hw3', 'status': 'unknown', 'id': 'x'},
+                'not a dict',
+            ],
+            'current_date': 0,
+        })
+        assert [(error.index, error.field, error.kind)
+                for error in result.errors] == [
+            (1, 'status', MISSING),
+            (2, 'status', UNEXPECTED),
+            (2, 'id', WRONG_TYPE),
+            (3, None, WRONG_TYPE),
+        ], 'Ошибки всех работ должны собираться за один проход'
+        assert result.valid == [{'homework_name': 'hw1', 'status': 'approved'}]
+        assert len(result.items) == 3, (
+            'items должен содержать все работы-словари'
+        )
+
+    def test_missing_current_date_is_not_fatal(self):
+        result = VALIDATOR.validate({'homeworks': []})
+        assert [(error.field, error.kind) for error in result.errors] == [
+            ('current_date', MISSING)
+        ]
+
+    @pytest.mark.parametrize('response, exception', [
+        ([], TypeError),
+        ({'current_date': 0}, KeyError),
+        ({}, KeyError),
+        ({'homeworks': {}, 'current_date': 0}, TypeError),
+    ])
+    def test_unusable_response_raises(self, response, exception):
+        with pytest.raises(exception):
+            VALIDATOR.validate(response)
+
+    def test_error_exception_types(self):
+        missing, = VALIDATOR.validate_item({'status': 'approved'})
+        assert isinstance(missing.exception(), KeyError)
+        wrong, = VALIDATOR.validate_item(
+            {'homework_name': 1, 'status': 'approved'}
+        )
+        assert isinstance(wrong.exception(), TypeError)
+        assert 'homework_name' in str(wrong)
@@ -0,0 +1,140 @@
+import json
+import socket
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import homework
+from tenants import Tenant
+from webhook import (SIGNATURE_HEADER, TIMESTAMP_HEADER, sign,
+                     start_webhook_server)
+
+SECRET = 'secret'
+
+
+class FakeBot:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None):
+        self.sent.append((chat_id, text))
+
+
+def post(server, payload, secret=SECRET, timestamp=None):
+    body = json.dumps(payload).encode()
+    timestamp = str(int(time.time()) if timestamp is None else timestamp)
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{server.server_port}/webhook', data=body,
+        headers={SIGNATURE_HEADER: sign(secret, body, timestamp),
+                 TIMESTAMP_HEADER: timestamp},
+        method='POST',
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+def post_raw(server, headers):
+    request = (f'POST /webhook HTTP/1.1\r\nHost: 127.0.0.1\r\n{headers}'
+               '\r\n').encode()
+    with socket.create_connection(('127.0.0.1', server.server_port),
+                                  timeout=5) as connection:
+        connection.sendall(request + b'x' * 1024)
+        return int(connection.recv(1024).split()[1])
+
+
+@pytest.fixture
+def webhook():
+    tenant = Tenant('token', 42)
+    bot = FakeBot()
+    server = start_webhook_server(
+        0, [tenant], lambda tenant, update: homework.ingest_update(
+            tenant, bot, update
+        ), SECRET, host='127.0.0.1',
+    )
+    yield server, tenant, bot
+    server.shutdown()
+    server.server_close()
+
+
+def update(tenant, status, date_updated=None):
+    homework = {'id': 1, 'homework_name': 'hw', 'status': status}
+    if date_updated is not None:
+        homework['date_updated'] = date_updated
+    return {'tenant': tenant.key, 'homeworks': [homework], 'current_date': 0}
+
+
+class TestWebhook:
+
+    def test_update_is_notified_once(self, webhook):
+        server, tenant, bot = webhook
+        assert post(server, update(tenant, 'reviewing')) == 202
+        assert post(server, update(tenant, 'reviewing')) == 202
+        assert len(bot.sent) == 1, (
+            'Об изменении, присланном дважды, нужно сообщить один раз'
+        )
+        assert post(server, update(tenant, 'approved')) == 202
+        assert len(bot.sent) == 2
+        assert 'hw' in bot.sent[-1][1]
+
+    def test_out_of_order_update_is_ignored(self, webhook):
+        server, tenant, bot = webhook
+        assert post(server, update(tenant, 'approved',
+                                   '2022-03-02T10:00:00Z')) == 202
+        assert post(server, update(tenant, 'reviewing',
+                                   '2022-03-01T10:00:00Z')) == 202
+        assert len(bot.sent) == 1, (
+            'Запоздавшее уведомление не должно откатывать статус работы'
+        )
+        assert tenant.last_status == 'approved'
+
+    def test_rejects_bad_requests(self, webhook):
+        server, tenant, bot = webhook
+        assert post(server, update(tenant, 'approved'), secret='wrong') == 401
+        assert post(server, update(tenant, 'approved'),
+                    timestamp=int(time.time()) - 3600) == 401, (
+            'Запрос со старой подписью нужно отклонять'
+        )
+        payload = update(tenant, 'approved')
+        payload['tenant'] = 'unknown'
+        assert post(server, payload) == 404
+        payload = update(tenant, 'approved')
+        payload['homeworks'] = 'not a list'
+        assert post(server, payload) == 400
+        assert bot.sent == [], (
+            'Непроверенные и некорректные запросы не должны приводить к '
+            'отправке сообщений'
+        )
+
+    def test_rejects_bad_content_length(self, webhook):
+        server, tenant, bot = webhook
+        assert post_raw(server, 'Content-Length: -1\r\n') == 400, (
+            'Тело с отрицательной длиной нельзя читать до конца соединения'
+        )
+        assert post_raw(server, 'Content-Length: abc\r\n') == 400
+        assert post_raw(server, '') == 411
+
+    def test_unknown_path_closes_connection(self, webhook):
+        server, tenant, bot = webhook
+        body = b'GET /metrics HTTP/1.1\r\nHost: x\r\n\r\n'
+        request = (f'POST /other HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+                   f'Content-Length: {len(body)}\r\n\r\n').encode()
+        with socket.create_connection(('127.0.0.1', server.server_port),
+                                      timeout=5) as connection:
+            connection.sendall(request + body)
+            response = b''
+            while chunk := connection.recv(1024):
+                response += chunk
+        assert response.count(b'HTTP/1.') == 1, (
+            'Непрочитанное тело не должно разбираться как новый запрос'
+        )
+        assert response.startswith(b'HTTP/1.1 404')
+
+    def test_secret_is_required(self):
+        with pytest.raises(ValueError):
+            start_webhook_server(0, [], lambda *args: None, None)
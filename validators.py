@@ -0,0 +1,142 @@
+"""Проверка ответов API Практикума по схеме."""
+from collections import namedtuple
+
+# Виды ошибок поля и исключения, которыми они выбрасываются.
+MISSING = 'missing'
+WRONG_TYPE = 'type'
+UNEXPECTED = 'unexpected'
+EXCEPTIONS = {MISSING: KeyError, WRONG_TYPE: TypeError, UNEXPECTED: KeyError}
+
+Field = namedtuple(
+    'Field', ['name', 'types', 'required', 'choices'],
+    defaults=(True, None),
+)
+
+
+class FieldError(namedtuple('FieldError', ['index', 'field', 'kind',
+                                           'value'])):
+    """Ошибка в ответе API.
+
+    index - номер работы в списке homeworks или None для ошибок самого
+    ответа, field - имя ключа (None, если не словарь весь объект), kind -
+    MISSING, WRONG_TYPE или UNEXPECTED, value - полученное значение.
+    Текст ошибки формируется только при обращении к нему.
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        """Описание ошибки."""
+        if self.field is None:
+            subject = 'Ответ API' if self.index is None else (
+                f'Работа #{self.index}'
+            )
+            return f'{subject} не словарь, а {type(self.value).__name__}.'
+        where = 'ответе API' if self.index is None else (
+            f'работе #{self.index}'
+        )
+        if self.kind == MISSING:
+            return f'В {where} нет ключа {self.field}.'
+        if self.kind == WRONG_TYPE:
+            return (f'В {where} значение {self.field} имеет тип '
+                    f'{type(self.value).__name__}.')
+        return (f'В {where} значение {self.field} "{self.value}" не '
+                'соответствует ожидаемым.')
+
+    def exception(self):
+        """Исключение для выбрасывания этой ошибки."""
+        return EXCEPTIONS[self.kind](str(self))
+
+
+class ValidationResult(namedtuple('ValidationResult', ['homeworks',
+                                                       'errors'])):
+    """Результат проверки ответа.
+
+    homeworks - список работ из ответа как есть, errors - ошибки ответа
+    и всех работ, найденные за один проход.
+    """
+
+    __slots__ = ()
+
+    @property
+    def items(self):
+        """Работы-словари, в порядке ответа."""
+        return [
+            homework for homework in self.homeworks
+            if isinstance(homework, dict)
+        ]
+
+    @property
+    def valid(self):
+        """Работы без ошибок, в порядке ответа."""
+        invalid = {
+            error.index for error in self.errors if error.index is not None
+        }
+        if not invalid:
+            return self.homeworks
+        return [
+            homework for index, homework in enumerate(self.homeworks)
+            if index not in invalid
+        ]
+
+
+class ResponseValidator:
+    """Проверяет ответ API и список работ по схеме работы.
+
+    Схема - последовательность Field: имя ключа, допустимые типы,
+    обязательность и допустимые значения. Она один раз разворачивается
+    в кортеж проверок, и весь список работ проверяется за один проход
+    без исключений на каждую работу: ошибки собираются в список.
+    Исключение выбрасывается, только если непригоден сам ответ.
+    """
+
+    def __init__(self, schema):
+        """Компилирует схему работы."""
+        self._checks = tuple(
+            (field.name, field.types, field.required,
+             None if field.choices is None else frozenset(field.choices))
+            for field in schema
+        )
+
+    def validate_item(self, homework, index=None):
+        """Возвращает список ошибок одной работы."""
+        if not isinstance(homework, dict):
+            return [FieldError(index, None, WRONG_TYPE, homework)]
+        errors = []
+        for name, types, required, choices in self._checks:
+            if name not in homework:
+                if required:
+                    errors.append(FieldError(index, name, MISSING, None))
+                continue
+            value = homework[name]
+            if not isinstance(value, types):
+                errors.append(FieldError(index, name, WRONG_TYPE, value))
+            elif choices is not None and value not in choices:
+                errors.append(FieldError(index, name, UNEXPECTED, value))
+        return errors
+
+    def validate(self, response):
+        """Проверяет ответ API и возвращает ValidationResult.
+
+        Выбрасывает TypeError, если ответ не словарь или homeworks не
+        список, и KeyError, если в ответе нет homeworks. Ошибки работ и
+        отсутствие current_date не мешают обработать остальное и
+        попадают в errors.
+        """
+        if not isinstance(response, dict):
+            raise FieldError(None, None, WRONG_TYPE, response).exception()
+        if 'homeworks' not in response:
+            raise FieldError(None, 'homeworks', MISSING, None).exception()
+        homeworks = response['homeworks']
+        if not isinstance(homeworks, list):
+            raise FieldError(
+                None, 'homeworks', WRONG_TYPE, homeworks
+            ).exception()
+        errors = []
+        current_date = response.get('current_date')
+        if not isinstance(current_date, int):
+            kind = MISSING if 'current_date' not in response else WRONG_TYPE
+            errors.append(FieldError(None, 'current_date', kind, current_date))
+        for index, homework in enumerate(homeworks):
+            errors.extend(self.validate_item(homework, index))
+        return ValidationResult(homeworks, errors)
@@ -0,0 +1,147 @@
+"""Приём уведомлений об изменении статусов работ (webhook)."""
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PATH = '/webhook'
+SIGNATURE_HEADER = 'X-Signature-256'
+TIMESTAMP_HEADER = 'X-Signature-Timestamp'
+MAX_BODY_SIZE = 1024 * 1024
+# Подписанный запрос принимается не дольше MAX_SIGNATURE_AGE секунд
+# после подписи: перехваченный запрос нельзя повторить позже.
+MAX_SIGNATURE_AGE = 300
+
+REQUESTS = REGISTRY.counter(
+    'homework_bot_webhook_requests_total',
+    'Запросы к webhook по результату.', ['result'],
+)
+
+
+def sign(secret, body, timestamp):
+    """Подпись запроса: 'sha256=' и HMAC-SHA256 в hex.
+
+    Подписываются время подписи timestamp (секунды Unix) и тело:
+    '<timestamp>.<тело>'.
+    """
+    message = f'{timestamp}.'.encode() + body
+    digest = hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+    return f'sha256={digest}'
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Принимает POST с изменениями работ одного арендатора.
+
+    Тело запроса - JSON в формате ответа API Практикума с
+    дополнительным ключом tenant (ключ арендатора, см. Tenant.key):
+    {"tenant": "...", "homeworks": [...], "current_date": ...}. Тело
+    подписывается общим секретом вместе со временем подписи (см.
+    sign): подпись передаётся в заголовке X-Signature-256, время - в
+    заголовке X-Signature-Timestamp.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    tenants = {}
+    ingest = None
+    secret = None
+
+    def do_POST(self):
+        """Проверяет подпись и передаёт изменения обработчику."""
+        result, status = self.handle_update()
+        REQUESTS.labels(result).inc()
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def handle_update(self):
+        """Обрабатывает запрос; возвращает (результат, код ответа)."""
+        if self.path.split('?')[0] != WEBHOOK_PATH:
+            # Тело не читается, поэтому соединение не переиспользуется.
+            self.close_connection = True
+            return 'not_found', 404
+        rejected = self.check_length()
+        if rejected is not None:
+            self.close_connection = True
+            return rejected
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if not self.check_signature(body):
+            return 'unauthorized', 401
+        try:
+            update = json.loads(body)
+            tenant = self.tenants.get(update.pop('tenant', None))
+        except (ValueError, AttributeError, TypeError):
+            return 'invalid', 400
+        if tenant is None:
+            return 'unknown_tenant', 404
+        try:
+            self.ingest(tenant, update)
+        except (KeyError, TypeError):
+            logger.exception('Webhook: некорректные данные арендатора %s.',
+                             tenant.key)
+            return 'invalid', 400
+        except Exception:
+            logger.exception('Webhook: ошибка обработки арендатора %s.',
+                             tenant.key)
+            return 'error', 500
+        return 'accepted', 202
+
+    def check_length(self):
+        """Проверяет Content-Length; возвращает (результат, код) ошибки.
+
+        Тело без длины или с некорректной длиной не читается: иначе до
+        проверки подписи пришлось бы читать тело любого размера.
+        """
+        length = self.headers.get('Content-Length')
+        if length is None:
+            return 'length_required', 411
+        if not (length.isascii() and length.isdigit()):
+            return 'invalid', 400
+        if int(length) > MAX_BODY_SIZE:
+            return 'too_large', 413
+        return None
+
+    def check_signature(self, body):
+        """Проверяет подпись запроса и её время."""
+        timestamp = self.headers.get(TIMESTAMP_HEADER, '')
+        if not (timestamp.isascii() and timestamp.isdigit()):
+            logger.warning('Webhook: запрос без времени подписи.')
+            return False
+        if abs(time.time() - int(timestamp)) > MAX_SIGNATURE_AGE:
+            logger.warning('Webhook: устаревшая подпись запроса.')
+            return False
+        signature = self.headers.get(SIGNATURE_HEADER, '')
+        if not hmac.compare_digest(signature,
+                                   sign(self.secret, body, timestamp)):
+            logger.warning('Webhook: неверная подпись запроса.')
+            return False
+        return True
+
+    def log_message(self, *args):
+        """Не пишет журнал запросов."""
+
+
+def start_webhook_server(port, tenants, ingest, secret, host=''):
+    """Запускает сервер webhook в фоновом потоке и возвращает его.
+
+    ingest(tenant, update) вызывается в потоке сервера для каждого
+    принятого запроса. Остановка - server.shutdown().
+    """
+    if not secret:
+        raise ValueError('Для webhook нужен общий секрет.')
+    handler = type('WebhookHandler', (WebhookHandler,), {
+        'tenants': {tenant.key: tenant for tenant in tenants},
+        'ingest': staticmethod(ingest),
+        'secret': secret,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info('Webhook принимает запросы на порту %d.', server.server_port)
+    return server